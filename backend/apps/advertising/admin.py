@@ -8,6 +8,14 @@ from django.db.models import Count, Sum
 from .models import Advertiser, Campaign, AdCreative, AdImpression
 
 
+def track_duration(form, creative):
+    """A duration typed in the form is kept; otherwise videos get their real length"""
+    if 'duration' in form.changed_data:
+        creative.duration_auto = False
+    elif creative._state.adding:
+        creative.duration_auto = True
+
+
 class AdCreativeInline(admin.TabularInline):
     """Inline admin for ad creatives within a campaign"""
     model = AdCreative
@@ -79,6 +87,13 @@ class CampaignAdmin(admin.ModelAdmin):
 
     inlines = [AdCreativeInline]
 
+    def save_formset(self, request, form, formset, change):
+        if formset.model is AdCreative:
+            for inline_form in formset.forms:
+                if inline_form.has_changed():
+                    track_duration(inline_form, inline_form.instance)
+        super().save_formset(request, form, formset, change)
+
     fieldsets = (
         ('Informações Básicas', {
             'fields': ('advertiser', 'name', 'status')
@@ -219,6 +234,10 @@ class AdCreativeAdmin(admin.ModelAdmin):
         return obj.impressions.count()
     impressions_count.short_description = 'Impressões'
 
+    def save_model(self, request, obj, form, change):
+        track_duration(form, obj)
+        super().save_model(request, obj, form, change)
+
     actions = ['activate_creatives', 'deactivate_creatives']
 
     @admin.action(description='Ativar criativos selecionados')
@@ -3,3 +3,7 @@ class AdvertisingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.advertising"
     verbose_name = "Publicidade"
+
+    def ready(self):
+        from .signals import connect_stats_signals
+        connect_stats_signals()
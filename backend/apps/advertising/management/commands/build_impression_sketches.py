@@ -0,0 +1,44 @@
+"""
+Comando para carregar nos sketches HyperLogLog as impressões já registradas
+(para que as estatísticas diárias aproximadas cubram o histórico)
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.advertising import sketches
+from apps.advertising.models import AdImpression
+
+
+class Command(BaseCommand):
+    help = 'Alimenta os sketches de criativos/totems distintos com as impressões dos últimos dias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ADVERTISING_SKETCH_DAYS,
+                            help='Dias a carregar, contando hoje (padrão: ADVERTISING_SKETCH_DAYS)')
+
+    def handle(self, *args, **options):
+        if not 0 < options['days'] <= settings.ADVERTISING_SKETCH_DAYS:
+            raise CommandError(f'--days deve estar entre 1 e {settings.ADVERTISING_SKETCH_DAYS}')
+
+        since = timezone.localdate() - timedelta(days=options['days'] - 1)
+        rows = AdImpression.objects.filter(
+            displayed_at__gte=timezone.make_aware(datetime.combine(since, time.min))
+        ).values_list(
+            'displayed_at', 'creative_id', 'totem_id', 'totem__city_id', 'creative__campaign_id'
+        ).iterator(chunk_size=5000)
+
+        # PFADD is idempotent: impressions logged meanwhile may be counted twice safely
+        counted = 0
+
+        def counting(rows):
+            nonlocal counted
+            for row in rows:
+                counted += 1
+                yield row
+
+        sketches.add_many(counting(rows))
+        sketches.mark_covered(since)
+        self.stdout.write(self.style.SUCCESS(f'{counted} impressão(ões) carregada(s) desde {since}'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:10
+
+import apps.content.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertising', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adcreative',
+            name='file',
+            field=models.FileField(storage=apps.content.storage.get_media_storage, upload_to='ads/', verbose_name='Arquivo'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertising', '0002_adcreative_content_addressed_storage'),
+        ('totems', '0007_totemsession_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adimpression',
+            index=models.Index(fields=['displayed_at', 'id'], name='adimpression_keyset_idx'),
+        ),
+    ]
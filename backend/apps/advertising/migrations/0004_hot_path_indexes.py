@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:53
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built without locking writes on the (large) tables
+    atomic = False
+
+    dependencies = [
+        ('advertising', '0003_adimpression_keyset_index'),
+        ('totems', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='adimpression',
+            index=models.Index(fields=['creative', 'displayed_at'], name='adimpression_creative_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='adimpression',
+            index=models.Index(fields=['totem', 'displayed_at'], name='adimpression_totem_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='campaign',
+            index=models.Index(fields=['status', 'start_date', 'end_date'], name='campaign_running_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertising', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adcreative',
+            name='duration_auto',
+            field=models.BooleanField(default=False, help_text='Vídeos: a duração é preenchida com o tamanho real do vídeo após o processamento', verbose_name='Duração automática'),
+        ),
+    ]
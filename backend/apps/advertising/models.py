@@ -2,6 +2,7 @@
 from django.db import models
 from apps.tenants.models import City
 from apps.totems.models import Totem
+from apps.content.storage import get_media_storage
 
 
 class Advertiser(models.Model):
@@ -53,6 +54,10 @@ class Campaign(models.Model):
         verbose_name = 'Campanha'
         verbose_name_plural = 'Campanhas'
         ordering = ['-created_at']
+        indexes = [
+            # Running campaigns (status='active' within start/end)
+            models.Index(fields=['status', 'start_date', 'end_date'], name='campaign_running_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.advertiser.name})"
@@ -69,8 +74,12 @@ class AdCreative(models.Model):
     name = models.CharField('Nome', max_length=200)
     ad_type = models.CharField('Tipo', max_length=20, choices=TYPE_CHOICES)
     
-    file = models.FileField('Arquivo', upload_to='ads/')
+    file = models.FileField('Arquivo', upload_to='ads/', storage=get_media_storage)
     duration = models.IntegerField('Duração (s)', default=10)
+    duration_auto = models.BooleanField(
+        'Duração automática', default=False,
+        help_text='Vídeos: a duração é preenchida com o tamanho real do vídeo após o processamento'
+    )
     
     click_url = models.URLField('URL de Clique', blank=True)
     
@@ -97,3 +106,10 @@ class AdImpression(models.Model):
         verbose_name = 'Impressão'
         verbose_name_plural = 'Impressões'
         ordering = ['-displayed_at']
+        indexes = [
+            # Keyset pagination (see core/pagination.py)
+            models.Index(fields=['displayed_at', 'id'], name='adimpression_keyset_idx'),
+            # Per-campaign/creative and per-totem stats over a period
+            models.Index(fields=['creative', 'displayed_at'], name='adimpression_creative_idx'),
+            models.Index(fields=['totem', 'displayed_at'], name='adimpression_totem_idx'),
+        ]
@@ -0,0 +1,24 @@
+"""
+Advertising Signals - drop the cached per-day stats partials when deletes
+cascade to impressions of settled days
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete
+
+
+def _invalidate_stats(sender, **kwargs):
+    from . import stats
+
+    def invalidate():
+        stats.by_campaign.invalidate()
+        stats.by_creative.invalidate()
+    transaction.on_commit(invalidate)
+
+
+def connect_stats_signals():
+    from apps.totems.models import Totem
+    from .models import AdCreative, Campaign
+
+    for model in (Campaign, AdCreative, Totem):
+        uid = f'advertising_stats_{model._meta.label_lower}'
+        post_delete.connect(_invalidate_stats, sender=model, dispatch_uid=uid)
@@ -0,0 +1,120 @@
+"""
+Distinct creatives and totems per day, as HyperLogLog sketches
+
+Every logged impression is PFADDed (creative id and totem id) to the
+sketches of its local day: one for all impressions, one for its city, one
+for its campaign and one for city + campaign, which are all the filters of
+the daily stats. Counting a day is a PFCOUNT and counting a range PFCOUNT
+over the days' keys (Redis merges the sketches), both in constant time
+whatever the number of impressions.
+
+Redis HLLs have a standard error of 0.81%: about 68% of counts are within
+0.81% of the exact value and 99.7% within 2.43%. Small counts (a few
+hundred) are practically exact.
+
+Sketches only know impressions logged since they were introduced (or
+loaded with the build_impression_sketches command) and are kept for
+ADVERTISING_SKETCH_DAYS; covered_since() tells from which day they can be
+trusted, older days are counted exactly from the database.
+
+Redis keys:
+    impression_hll:<metric>:<YYYY-MM-DD>:<scope>   creatives|totems, all|c<city>|p<campaign>|c<city>p<campaign>
+    impression_hll:since                           first day fully covered
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.redis_client import get_redis
+
+KEY = 'impression_hll:{}:{}:{}'
+SINCE_KEY = 'impression_hll:since'
+METRICS = ('creatives', 'totems')
+
+# Standard error of Redis' HyperLogLog (16384 registers)
+STANDARD_ERROR = 0.0081
+
+
+def scope(city_id=None, campaign_id=None):
+    if city_id and campaign_id:
+        return f'c{city_id}p{campaign_id}'
+    if city_id:
+        return f'c{city_id}'
+    if campaign_id:
+        return f'p{campaign_id}'
+    return 'all'
+
+
+def _add(pipe, day, creative_id, totem_id, city_id, campaign_id):
+    ttl = settings.ADVERTISING_SKETCH_DAYS * 24 * 60 * 60
+    scopes = {scope(), scope(city_id=city_id), scope(campaign_id=campaign_id),
+              scope(city_id, campaign_id)}
+    for name in scopes:
+        for metric, member in zip(METRICS, (creative_id, totem_id)):
+            key = KEY.format(metric, day.isoformat(), name)
+            pipe.pfadd(key, member)
+            pipe.expire(key, ttl)
+
+
+def add_impression(displayed_at, creative_id, totem_id, city_id, campaign_id):
+    """Count an impression in its day's sketches"""
+    client = get_redis()
+    pipe = client.pipeline(transaction=False)
+    day = timezone.localdate(displayed_at)
+    # Impressions of the first day were logged partly before the sketches
+    pipe.setnx(SINCE_KEY, (day + timedelta(days=1)).isoformat())
+    _add(pipe, day, creative_id, totem_id, city_id, campaign_id)
+    pipe.execute()
+
+
+def add_many(rows):
+    """Count (displayed_at, creative, totem, city, campaign) rows, e.g. a backfill"""
+    client = get_redis()
+    pipe = client.pipeline(transaction=False)
+    for index, (displayed_at, *ids) in enumerate(rows, 1):
+        _add(pipe, timezone.localdate(displayed_at), *ids)
+        if index % 1000 == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def mark_covered(since):
+    """Record that the sketches are complete from `since` onwards"""
+    client = get_redis()
+    current = client.get(SINCE_KEY)
+    if current is None or date.fromisoformat(current.decode()) > since:
+        client.set(SINCE_KEY, since.isoformat())
+
+
+def covered_since():
+    """First day whose sketches are complete (None without sketches)"""
+    since = get_redis().get(SINCE_KEY)
+    if since is None:
+        return None
+    retained = timezone.localdate() - timedelta(days=settings.ADVERTISING_SKETCH_DAYS - 1)
+    return max(date.fromisoformat(since.decode()), retained)
+
+
+def daily_counts(days, city_id=None, campaign_id=None):
+    """{day: {'unique_creatives', 'unique_totems'}} for the given days, one round trip"""
+    name = scope(city_id, campaign_id)
+    pipe = get_redis().pipeline(transaction=False)
+    for day in days:
+        for metric in METRICS:
+            pipe.pfcount(KEY.format(metric, day.isoformat(), name))
+    counts = iter(pipe.execute())
+    return {day: {'unique_creatives': next(counts), 'unique_totems': next(counts)} for day in days}
+
+
+def range_counts(days, city_id=None, campaign_id=None):
+    """Distinct creatives and totems over all the given days (merged sketches)"""
+    name = scope(city_id, campaign_id)
+    if not days:
+        return {'unique_creatives': 0, 'unique_totems': 0}
+    client = get_redis()
+    creatives, totems = (
+        client.pfcount(*[KEY.format(metric, day.isoformat(), name) for day in days])
+        for metric in METRICS
+    )
+    return {'unique_creatives': creatives, 'unique_totems': totems}
@@ -0,0 +1,68 @@
+"""
+Per-day impression aggregates behind the advertising stats views
+
+Impressions are only ever inserted with the current time, so every day
+before today is final and its partial is cached (see core/daily_partials).
+A partial holds the day's impressions and viewed seconds, the same per
+campaign (or per creative, for a campaign's stats) and impressions per
+totem.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.core.daily_partials import DailyPartials
+from .models import AdImpression
+
+
+def _compute(first_day, last_day, group, city=None, campaign=None):
+    start = timezone.make_aware(datetime.combine(first_day, time.min))
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    impressions = AdImpression.objects.filter(displayed_at__gte=start, displayed_at__lt=end)
+    if city:
+        impressions = impressions.filter(totem__city_id=city)
+    if campaign:
+        impressions = impressions.filter(creative__campaign_id=campaign)
+    impressions = impressions.annotate(date=TruncDate('displayed_at'))
+
+    partials = {}
+    for row in impressions.values('date', group).annotate(
+        impressions=Count('id'), duration=Sum('duration_viewed')
+    ).order_by():
+        partial = partials.setdefault(row['date'], {
+            'impressions': 0, 'duration': 0, 'groups': {}, 'totems': {},
+        })
+        partial['impressions'] += row['impressions']
+        partial['duration'] += row['duration'] or 0
+        partial['groups'][row[group]] = {'impressions': row['impressions'], 'duration': row['duration'] or 0}
+
+    for row in impressions.values('date', 'totem_id').annotate(impressions=Count('id')).order_by():
+        partials[row['date']]['totems'][row['totem_id']] = row['impressions']
+    return partials
+
+
+# Scope: city (X-City-ID) or None
+by_campaign = DailyPartials(
+    'impressions_by_campaign',
+    lambda first_day, last_day, city=None: _compute(first_day, last_day, 'creative__campaign_id', city=city),
+)
+
+# Scope: campaign
+by_creative = DailyPartials(
+    'impressions_by_creative',
+    lambda first_day, last_day, campaign: _compute(first_day, last_day, 'creative_id', campaign=campaign),
+)
+
+
+def window(days):
+    """First and last day of a `days` window ending today"""
+    today = timezone.localdate()
+    return today - timedelta(days=days), today
+
+
+def top(counts, limit=None, value=lambda item: item):
+    """Keys of a {key: value} dict by decreasing value"""
+    ranked = sorted(counts, key=lambda key: value(counts[key]), reverse=True)
+    return ranked[:limit] if limit else ranked
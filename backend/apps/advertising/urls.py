@@ -3,7 +3,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     ActiveAdsView, AdvertiserViewSet, CampaignViewSet, AdCreativeViewSet,
-    AdvertisingStatsView, CampaignStatsView, DailyStatsView,
+    AdImpressionViewSet, AdvertisingStatsView, CampaignStatsView, DailyStatsView,
     ExportImpressionsView, AdUploadView
 )
 
@@ -12,6 +12,7 @@ router.register(r'active', ActiveAdsView, basename='active-ads')
 router.register(r'advertisers', AdvertiserViewSet, basename='advertisers')
 router.register(r'campaigns', CampaignViewSet, basename='campaigns')
 router.register(r'creatives', AdCreativeViewSet, basename='creatives')
+router.register(r'impressions', AdImpressionViewSet, basename='impressions')
 
 urlpatterns = [
     path('', include(router.urls)),
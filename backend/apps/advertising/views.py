@@ -1,21 +1,34 @@
 """Advertising Views"""
-import os
-import uuid
-from django.db.models import Q, Sum, Count
+import logging
+
+from django.db.models import Q, Sum, Count, Subquery
 from django.db.models.functions import TruncDate
 from django.utils import timezone
-from django.core.files.storage import default_storage
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
 from .models import Advertiser, Campaign, AdCreative, AdImpression
+from . import sketches, stats
 from apps.tenants.models import City
+from apps.totems.models import Totem
+from apps.core.daily_partials import merge
+from apps.core.pagination import DisplayedAtPagination
+from apps.content.utils import store_upload, media_videos
+from apps.content.tasks import queue_video_job
+from apps.content.serializers import MediaVariantsListSerializer, MediaVideoMixin
+from apps.content.read_serializers import FastJSONRenderer, ValuesSerializer
 from rest_framework import serializers
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 import csv
+import math
 from django.http import HttpResponse
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
 
 
 # ============================================
@@ -56,22 +69,71 @@ class CampaignSerializer(serializers.ModelSerializer):
         return AdImpression.objects.filter(creative__campaign=obj).count()
 
 
-class AdCreativeSerializer(serializers.ModelSerializer):
+class AdCreativeSerializer(MediaVideoMixin, serializers.ModelSerializer):
     campaign_name = serializers.CharField(source='campaign.name', read_only=True)
     impressions_count = serializers.SerializerMethodField()
     file = serializers.FileField(required=False)
+    video = serializers.SerializerMethodField()
 
     class Meta:
         model = AdCreative
         fields = [
             'id', 'name', 'campaign', 'campaign_name', 'ad_type',
-            'file', 'duration', 'click_url', 'order', 'is_active',
+            'file', 'video', 'duration', 'click_url', 'order', 'is_active',
             'impressions_count'
         ]
+        list_serializer_class = MediaVariantsListSerializer
+        videos_source = 'file'
 
     def get_impressions_count(self, obj):
         return obj.impressions.count()
 
+    def save(self, **kwargs):
+        # A duration sent by the client is kept; otherwise videos get their real length
+        if 'duration' in self.validated_data:
+            kwargs['duration_auto'] = False
+        elif self.instance is None:
+            kwargs['duration_auto'] = True
+        return super().save(**kwargs)
+
+
+class AdCreativeReadSerializer(ValuesSerializer):
+    """
+    Same output as AdCreativeSerializer (without request context) for the
+    active ads feed: one query for the rows, one for the video renditions
+    and one grouped count of impressions
+    """
+    model = AdCreative
+    values_fields = (
+        'id', 'name', 'campaign_id', 'campaign__name', 'ad_type',
+        'file', 'duration', 'click_url', 'order', 'is_active',
+    )
+
+    def serialize(self, rows):
+        rows = list(rows)
+        self.videos = media_videos([row['file'] for row in rows])
+        self.impressions = dict(
+            AdImpression.objects.filter(creative_id__in=[row['id'] for row in rows])
+            .values_list('creative_id').annotate(count=Count('id')).order_by()
+        )
+        return super().serialize(rows)
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'name': row['name'],
+            'campaign': row['campaign_id'],
+            'campaign_name': row['campaign__name'],
+            'ad_type': row['ad_type'],
+            'file': self.file_url('file', row['file'], absolute=False),
+            'video': self.videos.get(row['file']) if row['file'] else None,
+            'duration': row['duration'],
+            'click_url': row['click_url'],
+            'order': row['order'],
+            'is_active': row['is_active'],
+            'impressions_count': self.impressions.get(row['id'], 0),
+        }
+
 
 class AdImpressionSerializer(serializers.ModelSerializer):
     creative_name = serializers.CharField(source='creative.name', read_only=True)
@@ -139,9 +201,43 @@ class AdCreativeViewSet(viewsets.ModelViewSet):
         return queryset.order_by('campaign', 'order')
 
 
+class AdImpressionViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Impression log, newest first, paged by cursor on (displayed_at, id)
+    GET /api/v1/advertising/impressions/?campaign=&creative=&totem=&days=&count=true
+    """
+    queryset = AdImpression.objects.select_related('creative__campaign', 'totem')
+    serializer_class = AdImpressionSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = DisplayedAtPagination
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        city_id = self.request.headers.get('X-City-ID')
+        if city_id:
+            queryset = queryset.filter(totem__city_id=city_id)
+
+        params = self.request.query_params
+        if params.get('campaign'):
+            queryset = queryset.filter(creative__campaign_id=params['campaign'])
+        if params.get('creative'):
+            queryset = queryset.filter(creative_id=params['creative'])
+        if params.get('totem'):
+            queryset = queryset.filter(totem_id=params['totem'])
+        if params.get('days'):
+            try:
+                start_date = timezone.now() - timedelta(days=int(params['days']))
+            except (ValueError, OverflowError):
+                raise ValidationError({'days': 'Informe um número de dias válido'})
+            queryset = queryset.filter(displayed_at__gte=start_date)
+        return queryset
+
+
 class ActiveAdsView(viewsets.ViewSet):
     """Get active ads for a totem"""
     permission_classes = [permissions.AllowAny]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
     def list(self, request):
         totem_id = request.query_params.get('totem_id')
@@ -163,8 +259,8 @@ class ActiveAdsView(viewsets.ViewSet):
             is_active=True
         ).order_by('order')
 
-        serializer = AdCreativeSerializer(creatives, many=True)
-        return Response(serializer.data)
+        serializer = AdCreativeReadSerializer()
+        return Response(serializer.serialize(serializer.values(creatives)))
 
     @action(detail=True, methods=['post'])
     def impression(self, request, pk=None):
@@ -172,16 +268,27 @@ class ActiveAdsView(viewsets.ViewSet):
         totem_id = request.data.get('totem_id')
         duration = request.data.get('duration', 0)
 
+        # The totem's city comes with the creative, for the sketches
+        creative = AdCreative.objects.filter(id=pk).values(
+            'id', 'campaign_id',
+            city_id=Subquery(Totem.objects.filter(id=totem_id).order_by().values('city_id')[:1]),
+        ).first()
+        if creative is None:
+            return Response({'error': 'Creative not found'}, status=404)
+
+        impression = AdImpression.objects.create(
+            creative_id=creative['id'],
+            totem_id=totem_id,
+            duration_viewed=duration
+        )
+        # The impression is logged: a sketch failure must not make the totem retry it
         try:
-            creative = AdCreative.objects.get(id=pk)
-            AdImpression.objects.create(
-                creative=creative,
-                totem_id=totem_id,
-                duration_viewed=duration
+            sketches.add_impression(
+                impression.displayed_at, creative['id'], totem_id, creative['city_id'], creative['campaign_id']
             )
-            return Response({'status': 'logged'})
-        except AdCreative.DoesNotExist:
-            return Response({'error': 'Creative not found'}, status=404)
+        except RedisError:
+            logger.exception('Could not count impression %s in the daily sketches', impression.id)
+        return Response({'status': 'logged'})
 
 
 # ============================================
@@ -192,6 +299,8 @@ class AdvertisingStatsView(APIView):
     """
     General advertising statistics
     GET /api/v1/advertising/stats/
+
+    Merged from cached per-day partials (see stats.py) plus today's.
     """
     permission_classes = [permissions.AllowAny]
 
@@ -199,67 +308,51 @@ class AdvertisingStatsView(APIView):
         city_id = request.headers.get('X-City-ID')
         days = int(request.query_params.get('days', 30))
 
-        start_date = timezone.now() - timedelta(days=days)
-
-        # Base queryset
-        impressions = AdImpression.objects.filter(displayed_at__gte=start_date)
-
-        if city_id:
-            impressions = impressions.filter(totem__city_id=city_id)
+        first_day, today = stats.window(days)
+        partials = stats.by_campaign.days(first_day, today, city=city_id)
+        totals = merge(partials.values())
 
         # Total stats
-        total_impressions = impressions.count()
-        total_duration = impressions.aggregate(total=Sum('duration_viewed'))['total'] or 0
+        total_impressions = totals.get('impressions', 0)
+        total_duration = totals.get('duration', 0)
 
         # Impressions by campaign
-        by_campaign = impressions.values(
-            'creative__campaign__name',
-            'creative__campaign__id'
-        ).annotate(
-            impressions=Count('id'),
-            total_duration=Sum('duration_viewed')
-        ).order_by('-impressions')[:10]
+        by_campaign = totals.get('groups', {})
+        top_campaigns = stats.top(by_campaign, 10, value=lambda item: item['impressions'])
+        names = dict(Campaign.objects.filter(id__in=top_campaigns).values_list('id', 'name'))
 
         impressions_by_campaign = [
             {
-                'campaign_id': item['creative__campaign__id'],
-                'campaign': item['creative__campaign__name'],
-                'impressions': item['impressions'],
-                'avg_duration': round(item['total_duration'] / item['impressions'], 1) if item['impressions'] > 0 else 0
+                'campaign_id': campaign_id,
+                'campaign': names.get(campaign_id),
+                'impressions': by_campaign[campaign_id]['impressions'],
+                'avg_duration': round(by_campaign[campaign_id]['duration'] / by_campaign[campaign_id]['impressions'], 1)
             }
-            for item in by_campaign
+            for campaign_id in top_campaigns
         ]
 
         # Impressions by day
-        by_day = impressions.annotate(
-            date=TruncDate('displayed_at')
-        ).values('date').annotate(
-            count=Count('id')
-        ).order_by('-date')[:30]
-
         impressions_by_day = [
             {
-                'date': item['date'].isoformat() if item['date'] else None,
-                'count': item['count']
+                'date': day.isoformat(),
+                'count': partial['impressions']
             }
-            for item in by_day
-        ]
+            for day, partial in sorted(partials.items(), reverse=True)
+            if partial
+        ][:30]
 
         # Top totems
-        by_totem = impressions.values(
-            'totem__name',
-            'totem__id'
-        ).annotate(
-            impressions=Count('id')
-        ).order_by('-impressions')[:10]
+        by_totem = totals.get('totems', {})
+        top_totem_ids = stats.top(by_totem, 10)
+        names = dict(Totem.objects.filter(id__in=top_totem_ids).values_list('id', 'name'))
 
         top_totems = [
             {
-                'totem_id': item['totem__id'],
-                'totem': item['totem__name'],
-                'impressions': item['impressions']
+                'totem_id': totem_id,
+                'totem': names.get(totem_id),
+                'impressions': by_totem[totem_id]
             }
-            for item in by_totem
+            for totem_id in top_totem_ids
         ]
 
         return Response({
@@ -277,6 +370,8 @@ class CampaignStatsView(APIView):
     """
     Statistics for a specific campaign
     GET /api/v1/advertising/stats/campaign/{id}/
+
+    Merged from cached per-day partials (see stats.py) plus today's.
     """
     permission_classes = [permissions.AllowAny]
 
@@ -287,56 +382,42 @@ class CampaignStatsView(APIView):
             return Response({'error': 'Campaign not found'}, status=404)
 
         days = int(request.query_params.get('days', 30))
-        start_date = timezone.now() - timedelta(days=days)
+        first_day, today = stats.window(days)
+        partials = stats.by_creative.days(first_day, today, campaign=campaign.id)
+        totals = merge(partials.values())
 
-        impressions = AdImpression.objects.filter(
-            creative__campaign=campaign,
-            displayed_at__gte=start_date
-        )
-
-        total_impressions = impressions.count()
-        total_duration = impressions.aggregate(total=Sum('duration_viewed'))['total'] or 0
+        total_impressions = totals.get('impressions', 0)
+        total_duration = totals.get('duration', 0)
 
         # By creative
-        by_creative = impressions.values(
-            'creative__name',
-            'creative__id',
-            'creative__ad_type'
-        ).annotate(
-            impressions=Count('id'),
-            total_duration=Sum('duration_viewed')
-        ).order_by('-impressions')
+        by_creative = totals.get('groups', {})
+        creatives = {
+            item['id']: item
+            for item in AdCreative.objects.filter(id__in=by_creative).values('id', 'name', 'ad_type')
+        }
 
         creatives_stats = [
             {
-                'creative_id': item['creative__id'],
-                'creative': item['creative__name'],
-                'type': item['creative__ad_type'],
-                'impressions': item['impressions'],
-                'avg_duration': round(item['total_duration'] / item['impressions'], 1) if item['impressions'] > 0 else 0
+                'creative_id': creative_id,
+                'creative': creatives.get(creative_id, {}).get('name'),
+                'type': creatives.get(creative_id, {}).get('ad_type'),
+                'impressions': by_creative[creative_id]['impressions'],
+                'avg_duration': round(by_creative[creative_id]['duration'] / by_creative[creative_id]['impressions'], 1)
             }
-            for item in by_creative
+            for creative_id in stats.top(by_creative, value=lambda item: item['impressions'])
         ]
 
         # By day
-        by_day = impressions.annotate(
-            date=TruncDate('displayed_at')
-        ).values('date').annotate(
-            count=Count('id')
-        ).order_by('date')
-
         daily_stats = [
-            {'date': item['date'].isoformat(), 'count': item['count']}
-            for item in by_day
+            {'date': day.isoformat(), 'count': partial['impressions']}
+            for day, partial in sorted(partials.items())
+            if partial
         ]
 
         # By totem
-        by_totem = impressions.values(
-            'totem__name',
-            'totem__id'
-        ).annotate(
-            impressions=Count('id')
-        ).order_by('-impressions')[:10]
+        by_totem = totals.get('totems', {})
+        top_totem_ids = stats.top(by_totem, 10)
+        names = dict(Totem.objects.filter(id__in=top_totem_ids).values_list('id', 'name'))
 
         return Response({
             'campaign': {
@@ -352,7 +433,10 @@ class CampaignStatsView(APIView):
             'avg_duration_per_impression': round(total_duration / total_impressions, 1) if total_impressions > 0 else 0,
             'creatives_stats': creatives_stats,
             'daily_stats': daily_stats,
-            'totems_stats': list(by_totem),
+            'totems_stats': [
+                {'totem__name': names.get(totem_id), 'totem__id': totem_id, 'impressions': by_totem[totem_id]}
+                for totem_id in top_totem_ids
+            ],
         })
 
 
@@ -360,6 +444,10 @@ class DailyStatsView(APIView):
     """
     Daily impressions statistics
     GET /api/v1/advertising/stats/daily/
+
+    Distinct creatives/totems come from the HyperLogLog sketches (standard
+    error 0.81%, see sketches.py) for the days they cover; ?exact=true
+    counts everything from the impressions instead.
     """
     permission_classes = [permissions.AllowAny]
 
@@ -367,6 +455,7 @@ class DailyStatsView(APIView):
         city_id = request.headers.get('X-City-ID')
         days = int(request.query_params.get('days', 30))
         campaign_id = request.query_params.get('campaign_id')
+        exact = request.query_params.get('exact', '').lower() in ('1', 'true')
 
         start_date = timezone.now() - timedelta(days=days)
 
@@ -378,17 +467,46 @@ class DailyStatsView(APIView):
         if campaign_id:
             impressions = impressions.filter(creative__campaign_id=campaign_id)
 
+        distinct = {
+            'unique_creatives': Count('creative', distinct=True),
+            'unique_totems': Count('totem', distinct=True),
+        }
+        since = None if exact else sketches.covered_since()
+
         by_day = impressions.annotate(
             date=TruncDate('displayed_at')
         ).values('date').annotate(
             impressions=Count('id'),
             total_duration=Sum('duration_viewed'),
-            unique_creatives=Count('creative', distinct=True),
-            unique_totems=Count('totem', distinct=True)
+            **(distinct if since is None else {})
         ).order_by('date')
 
+        if since is None:
+            totals = impressions.aggregate(**distinct)
+        else:
+            by_day = list(by_day)
+            covered = [item['date'] for item in by_day if item['date'] >= since]
+            counts = sketches.daily_counts(covered, city_id, campaign_id)
+            if len(covered) < len(by_day):
+                # Days before the sketches: counted exactly
+                uncovered = impressions.filter(
+                    displayed_at__lt=timezone.make_aware(datetime.combine(since, time.min))
+                )
+                counts.update({
+                    item.pop('date'): item
+                    for item in uncovered.annotate(date=TruncDate('displayed_at')).values('date').annotate(**distinct)
+                })
+                totals = impressions.aggregate(**distinct)
+            else:
+                totals = sketches.range_counts(covered, city_id, campaign_id)
+            for item in by_day:
+                item.update(counts[item['date']])
+
         return Response({
             'period_days': days,
+            'approximate': since is not None,
+            'unique_creatives': totals['unique_creatives'],
+            'unique_totems': totals['unique_totems'],
             'data': [
                 {
                     'date': item['date'].isoformat(),
@@ -475,7 +593,7 @@ class AdUploadView(APIView):
         file = request.FILES.get('file')
         campaign_id = request.data.get('campaign_id')
         creative_name = request.data.get('name', '')
-        duration = int(request.data.get('duration', 10))
+        duration = request.data.get('duration')
 
         if not file:
             return Response(
@@ -497,32 +615,56 @@ class AdUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Determine ad type
-        ad_type = 'image' if file.content_type.startswith('image/') else 'video'
-
-        # Generate unique filename
-        ext = os.path.splitext(file.name)[1].lower()
-        filename = f'{uuid.uuid4().hex[:12]}{ext}'
-        upload_path = f'ads/{filename}'
+        # Save file by content hash (re-uploads reuse the stored bytes)
+        blob, created = store_upload(file)
+        return self.create_creative(
+            blob, created, file.content_type, file.name,
+            campaign_id=campaign_id, name=creative_name, duration=duration,
+        )
 
-        # Save file
-        saved_path = default_storage.save(upload_path, file)
-        file_url = default_storage.url(saved_path)
+    @staticmethod
+    def create_creative(blob, created, content_type, filename, campaign_id=None, name='', duration=None):
+        """
+        Build the upload response for a stored file and, with a campaign,
+        add it as a creative. Shared with resumable uploads.
+        """
+        # Determine ad type
+        ad_type = 'image' if content_type.startswith('image/') else 'video'
+        saved_path = blob.name
 
         result = {
             'success': True,
-            'file_url': file_url,
+            'file_url': blob.url,
             'file_path': saved_path,
             'ad_type': ad_type,
-            'filename': filename,
-            'size': file.size,
+            'filename': saved_path.rsplit('/', 1)[-1],
+            'size': blob.size,
+            'duplicate': not created,
         }
 
+        # Videos are transcoded for the totems in the background; without a
+        # duration given, the real length fills the creative's once known
+        duration_auto = duration in (None, '')
+        if ad_type == 'video':
+            job = queue_video_job(blob)
+            result['video_job_id'] = job.id
+            result['status'] = job.status
+            if duration_auto and blob.duration:
+                duration = math.ceil(blob.duration)
+        duration = int(duration or 10)
+
         # Create creative if campaign_id provided
         if campaign_id:
             try:
                 campaign = Campaign.objects.get(id=campaign_id)
 
+                # Same creative already in this campaign: return it
+                existing = AdCreative.objects.filter(campaign=campaign, file=saved_path).first()
+                if existing:
+                    result['creative_id'] = existing.id
+                    result['creative_name'] = existing.name
+                    return Response(result, status=status.HTTP_200_OK)
+
                 # Get next order
                 max_order = AdCreative.objects.filter(campaign=campaign).aggregate(
                     max_order=models.Max('order')
@@ -530,10 +672,11 @@ class AdUploadView(APIView):
 
                 creative = AdCreative.objects.create(
                     campaign=campaign,
-                    name=creative_name or file.name,
+                    name=name or filename,
                     ad_type=ad_type,
                     file=saved_path,
                     duration=duration,
+                    duration_auto=duration_auto,
                     order=max_order + 1,
                     is_active=True,
                 )
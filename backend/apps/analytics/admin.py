@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import DailyStats, PopularDestination
+from .models import DailyStats, PopularDestination, RollupWatermark
 
 @admin.register(DailyStats)
 class DailyStatsAdmin(admin.ModelAdmin):
@@ -8,5 +8,11 @@ class DailyStatsAdmin(admin.ModelAdmin):
 
 @admin.register(PopularDestination)
 class PopularDestinationAdmin(admin.ModelAdmin):
-    list_display = ['destination_name', 'city', 'search_count']
+    list_display = ['destination_name', 'city', 'search_count', 'last_searched']
     list_filter = ['city']
+    readonly_fields = ['snap_key']
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'high_water_mark', 'updated_at']
+    readonly_fields = ['updated_at']
@@ -3,3 +3,7 @@ class AnalyticsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.analytics"
     verbose_name = "Analytics"
+
+    def ready(self):
+        from .signals import connect_stats_signals
+        connect_stats_signals()
@@ -0,0 +1,248 @@
+"""
+Popular destinations
+
+Every logged route search counts for its destination, snapped to a grid
+cell of its coordinates (DESTINATION_SNAP_DECIMALS, ~110 m at 3) or, when
+there are no usable coordinates, to its normalized name. A search costs
+one Redis script call:
+
+- HINCRBY on a pending hash, flushed to PopularDestination.search_count
+  with batched UPDATE ... SET search_count = search_count + n;
+- ZINCRBY on the city's sorted set by 2^((now - epoch) / half_life), so
+  ranking by score is ranking by an exponentially decayed count and
+  trending places overtake old favourites. Every flush trims the sets to
+  DESTINATION_TOP_SIZE and, before the weights grow too large, rescales
+  them (and moves the epoch).
+
+The top N of a city is read straight from its sorted set.
+
+Redis keys:
+    destinations:pending        hash  "<city>|<key>" -> searches not flushed yet
+    destinations:info:<city>    hash  key -> {"name", "lat", "lng"}
+    destinations:score:<city>   zset  key -> decayed score
+    destinations:cities         set   cities with a sorted set
+    destinations:epoch          string  time the weights are relative to
+"""
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, When
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.core.redis_client import get_redis, pending_batches
+from .models import PopularDestination
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'destinations:pending'
+INFO_KEY = 'destinations:info:{}'
+SCORE_KEY = 'destinations:score:{}'
+CITIES_KEY = 'destinations:cities'
+EPOCH_KEY = 'destinations:epoch'
+
+FLUSH_BATCH = 500
+# Rescale once weights reach 2^RESCALE_EXPONENT
+RESCALE_EXPONENT = 32
+# Members whose decayed score drops below this are forgotten
+MIN_SCORE = 1e-3
+
+# KEYS: pending, info, scores, cities, epoch
+# ARGV: pending field, member, info json, half-life (s), city
+RECORD_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local epoch = tonumber(redis.call('GET', KEYS[5]))
+if not epoch then
+    epoch = now
+    redis.call('SET', KEYS[5], tostring(now))
+end
+redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+redis.call('HSET', KEYS[2], ARGV[2], ARGV[3])
+redis.call('ZINCRBY', KEYS[3], 2 ^ ((now - epoch) / tonumber(ARGV[4])), ARGV[2])
+redis.call('SADD', KEYS[4], ARGV[5])
+return 1
+"""
+
+# KEYS: epoch, then (scores, info) pairs; ARGV: half-life, max exponent, min score, max size
+# Every set is trimmed to its max size, dropping members whose decayed
+# score is below the min score; once weights reach 2^max exponent the sets
+# are rescaled as well and the epoch moves to now.
+TRIM_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+if not epoch then
+    return 0
+end
+local exponent = (now - epoch) / tonumber(ARGV[1])
+local rescale = exponent >= tonumber(ARGV[2])
+local floor = tonumber(ARGV[3]) * 2 ^ exponent
+if rescale then
+    floor = tonumber(ARGV[3])
+end
+local removed = 0
+for i = 2, #KEYS, 2 do
+    if rescale then
+        redis.call('ZUNIONSTORE', KEYS[i], 1, KEYS[i], 'WEIGHTS', 2 ^ -exponent)
+    end
+    local dropped = redis.call('ZRANGEBYSCORE', KEYS[i], '-inf', '(' .. floor)
+    local size = redis.call('ZCARD', KEYS[i]) - #dropped
+    if size > tonumber(ARGV[4]) then
+        local extra = redis.call('ZRANGE', KEYS[i], #dropped, #dropped + size - tonumber(ARGV[4]) - 1)
+        for _, member in ipairs(extra) do table.insert(dropped, member) end
+    end
+    for _, member in ipairs(dropped) do
+        redis.call('ZREM', KEYS[i], member)
+        redis.call('HDEL', KEYS[i + 1], member)
+    end
+    removed = removed + #dropped
+end
+if rescale then
+    redis.call('SET', KEYS[1], tostring(now))
+end
+return removed
+"""
+
+# KEYS: scores, info, epoch; ARGV: limit
+TOP_SCRIPT = """
+local ranked = redis.call('ZREVRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1, 'WITHSCORES')
+local members = {}
+for i = 1, #ranked, 2 do table.insert(members, ranked[i]) end
+local info = {}
+if #members > 0 then
+    info = redis.call('HMGET', KEYS[2], unpack(members))
+end
+local t = redis.call('TIME')
+return {ranked, info, redis.call('GET', KEYS[3]) or '', t[1] .. '.' .. t[2]}
+"""
+
+
+def _coordinate(value):
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def snap_key(latitude, longitude, name=''):
+    """Key shared by searches for the same place (grid cell, else name)"""
+    lat, lng = _coordinate(latitude), _coordinate(longitude)
+    if lat is not None and lng is not None and abs(lat) <= 90 and abs(lng) <= 180:
+        places = settings.DESTINATION_SNAP_DECIMALS
+        return f'c:{round(lat, places):.{places}f}:{round(lng, places):.{places}f}'
+    name = slugify(name or '')
+    return f'n:{name[:90]}' if name else None
+
+
+def record_search(city_id, name, latitude, longitude):
+    """Count one route search towards its destination's popularity"""
+    key = snap_key(latitude, longitude, name)
+    if not key or not city_id:
+        return False
+    info = json.dumps({'name': name or '', 'lat': str(latitude), 'lng': str(longitude)})
+    get_redis().eval(
+        RECORD_SCRIPT, 5,
+        PENDING_KEY, INFO_KEY.format(city_id), SCORE_KEY.format(city_id), CITIES_KEY, EPOCH_KEY,
+        f'{city_id}|{key}', key, info, settings.DESTINATION_HALF_LIFE, city_id,
+    )
+    return True
+
+
+def top(city_id, limit=10):
+    """
+    Most popular destinations of a city by decayed score, from Redis
+
+    Returns:
+        List of {'name', 'latitude', 'longitude', 'score'}, where score is
+        roughly the number of searches with old ones discounted by half
+        every DESTINATION_HALF_LIFE seconds
+    """
+    ranked, info, epoch, now = get_redis().eval(
+        TOP_SCRIPT, 3, SCORE_KEY.format(city_id), INFO_KEY.format(city_id), EPOCH_KEY, limit,
+    )
+    scale = 1.0
+    if epoch:
+        scale = 2 ** (-(float(now) - float(epoch)) / settings.DESTINATION_HALF_LIFE)
+
+    results = []
+    for index in range(0, len(ranked), 2):
+        details = json.loads(info[index // 2] or '{}')
+        results.append({
+            'name': details.get('name', ''),
+            'latitude': details.get('lat'),
+            'longitude': details.get('lng'),
+            'score': round(float(ranked[index + 1]) * scale, 2),
+        })
+    return results
+
+
+def trim():
+    """Keep each city's set within DESTINATION_TOP_SIZE; returns the members dropped"""
+    client = get_redis()
+    cities = sorted(int(city) for city in client.smembers(CITIES_KEY))
+    keys = [EPOCH_KEY]
+    for city_id in cities:
+        keys += [SCORE_KEY.format(city_id), INFO_KEY.format(city_id)]
+    return client.eval(
+        TRIM_SCRIPT, len(keys), *keys,
+        settings.DESTINATION_HALF_LIFE, RESCALE_EXPONENT, MIN_SCORE, settings.DESTINATION_TOP_SIZE,
+    )
+
+
+def flush():
+    """
+    Add pending search counts to PopularDestination (rows created on first
+    sight) in batched UPDATEs. Returns the number of destinations updated.
+    """
+    client = get_redis()
+    now = timezone.now()
+    updated = 0
+
+    for pairs in pending_batches(PENDING_KEY, FLUSH_BATCH):
+        batch = []
+        for field, count in pairs:
+            city_id, _, snap = field.decode().partition('|')
+            batch.append(((int(city_id), snap), int(count)))
+
+        by_city = {}
+        for (city_id, snap), _ in batch:
+            by_city.setdefault(city_id, []).append(snap)
+
+        # Rows for destinations seen for the first time
+        new_rows = []
+        for city_id, snaps in by_city.items():
+            infos = client.hmget(INFO_KEY.format(city_id), snaps)
+            for snap, raw in zip(snaps, infos):
+                details = json.loads(raw or '{}')
+                lat, lng = _coordinate(details.get('lat')), _coordinate(details.get('lng'))
+                new_rows.append(PopularDestination(
+                    city_id=city_id, snap_key=snap,
+                    destination_name=(details.get('name') or '')[:500],
+                    latitude=lat if lat is not None else 0, longitude=lng if lng is not None else 0,
+                ))
+        PopularDestination.objects.bulk_create(new_rows, ignore_conflicts=True)
+
+        ids = {}
+        for city_id, snaps in by_city.items():
+            for row_id, snap in PopularDestination.objects.filter(
+                city_id=city_id, snap_key__in=snaps
+            ).values_list('id', 'snap_key'):
+                ids[(city_id, snap)] = row_id
+
+        increments = {ids[pair]: count for pair, count in batch if pair in ids}
+        if increments:
+            updated += PopularDestination.objects.filter(id__in=increments).update(
+                search_count=F('search_count') + Case(
+                    *[When(id=row_id, then=count) for row_id, count in increments.items()],
+                    output_field=IntegerField(),
+                ),
+                last_searched=now,
+            )
+
+    trim()
+    if updated:
+        logger.info('Flushed search counts of %s popular destinations', updated)
+    return updated
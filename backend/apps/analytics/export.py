@@ -0,0 +1,217 @@
+"""
+Columnar analytics export
+
+Impressions, totem sessions, route searches and the DailyStats rollup are
+written as Parquet, one file per dataset and UTC day:
+
+    <ANALYTICS_EXPORT_ROOT>/<dataset>/date=YYYY-MM-DD/part-0.parquet
+
+(hive-style partitions, readable as one table by pyarrow, DuckDB, Spark,
+pandas...). Each day is read with a server-side cursor (QuerySet.iterator)
+and written in Arrow record batches of ANALYTICS_EXPORT_BATCH rows, so
+memory stays bounded whatever the size of the day. Timestamps are UTC
+microseconds and coordinates exact decimals.
+
+A partition is only written once its day is final: sessions keep changing
+until flushed and closed, and the rollup until it has recomputed the day.
+Incremental runs write the final days that have no partition yet; days
+without rows get an empty file so they aren't read again.
+"""
+import logging
+import os
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.advertising.models import AdImpression
+from apps.navigation.models import RouteSearch
+from apps.totems.models import TotemSession
+from .models import DailyStats
+from .rollup import settled_before
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+COORDINATE = pa.decimal128(10, 7)
+
+
+class Dataset:
+    """A model exported as daily partitions of the given (lookup, type) columns"""
+
+    def __init__(self, name, model, date_field, columns):
+        self.name = name
+        self.model = model
+        self.date_field = date_field
+        self.lookups = [lookup for lookup, _ in columns]
+        self.schema = pa.schema([
+            pa.field(lookup.replace('__', '_'), arrow_type) for lookup, arrow_type in columns
+        ])
+
+    @property
+    def is_date(self):
+        return self.date_field == 'date'
+
+    def rows(self, day):
+        if self.is_date:
+            queryset = self.model.objects.filter(date=day)
+        else:
+            start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+            queryset = self.model.objects.filter(**{
+                f'{self.date_field}__gte': start,
+                f'{self.date_field}__lt': start + timedelta(days=1),
+            })
+        return (
+            queryset.order_by(self.date_field, 'id')
+            .values_list(*self.lookups)
+            .iterator(chunk_size=settings.ANALYTICS_EXPORT_BATCH)
+        )
+
+    def first_day(self):
+        first = self.model.objects.aggregate(first=Min(self.date_field))['first']
+        if first is None or self.is_date:
+            return first
+        return first.astimezone(dt_timezone.utc).date()
+
+    def final_before(self, now):
+        """Rows before this instant no longer change"""
+        return now - timedelta(seconds=settings.ANALYTICS_EXPORT_DELAY)
+
+
+class DailyStatsDataset(Dataset):
+
+    def final_before(self, now):
+        # Local dates are final once the rollup has recomputed them for good
+        rolled_up = settled_before()
+        if rolled_up is None:
+            return None
+        return min(super().final_before(now), rolled_up)
+
+
+DATASETS = {
+    dataset.name: dataset for dataset in [
+        Dataset('impressions', AdImpression, 'displayed_at', [
+            ('id', pa.int64()),
+            ('displayed_at', TIMESTAMP),
+            ('creative_id', pa.int64()),
+            ('creative__campaign_id', pa.int64()),
+            ('creative__campaign__advertiser_id', pa.int64()),
+            ('totem_id', pa.int64()),
+            ('totem__city_id', pa.int64()),
+            ('duration_viewed', pa.int32()),
+        ]),
+        Dataset('sessions', TotemSession, 'started_at', [
+            ('id', pa.int64()),
+            ('started_at', TIMESTAMP),
+            ('ended_at', TIMESTAMP),
+            ('totem_id', pa.int64()),
+            ('totem__city_id', pa.int64()),
+            ('session_id', pa.string()),
+            ('language', pa.string()),
+            ('interactions_count', pa.int32()),
+        ]),
+        Dataset('route_searches', RouteSearch, 'searched_at', [
+            ('id', pa.int64()),
+            ('searched_at', TIMESTAMP),
+            ('totem_id', pa.int64()),
+            ('totem__city_id', pa.int64()),
+            ('origin_lat', COORDINATE),
+            ('origin_lng', COORDINATE),
+            ('destination_lat', COORDINATE),
+            ('destination_lng', COORDINATE),
+            ('destination_name', pa.string()),
+            ('transport_mode', pa.string()),
+            ('distance_meters', pa.int32()),
+            ('duration_seconds', pa.int32()),
+        ]),
+        DailyStatsDataset('daily_stats', DailyStats, 'date', [
+            ('id', pa.int64()),
+            ('date', pa.date32()),
+            ('totem_id', pa.int64()),
+            ('totem__city_id', pa.int64()),
+            ('sessions_count', pa.int32()),
+            ('interactions_count', pa.int32()),
+            ('routes_searched', pa.int32()),
+            ('avg_session_duration', pa.int32()),
+            ('peak_hour', pa.int8()),
+        ]),
+    ]
+}
+
+
+def partition_path(root, dataset, day):
+    return Path(root) / dataset.name / f'date={day.isoformat()}' / 'part-0.parquet'
+
+
+def _record_batches(dataset, rows):
+    batch_size = settings.ANALYTICS_EXPORT_BATCH
+    columns = [[] for _ in dataset.lookups]
+    for row in rows:
+        for column, value in zip(columns, row):
+            column.append(value)
+        if len(columns[0]) >= batch_size:
+            yield pa.RecordBatch.from_arrays(columns, schema=dataset.schema)
+            columns = [[] for _ in dataset.lookups]
+    if columns[0]:
+        yield pa.RecordBatch.from_arrays(columns, schema=dataset.schema)
+
+
+def write_partition(root, dataset, day):
+    """Write one day of a dataset (atomically replacing it). Returns the row count."""
+    path = partition_path(root, dataset, day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.tmp')
+    written = 0
+    with pq.ParquetWriter(tmp, dataset.schema, compression='zstd') as writer:
+        for batch in _record_batches(dataset, dataset.rows(day)):
+            writer.write_batch(batch)
+            written += batch.num_rows
+    os.replace(tmp, path)
+    return written
+
+
+def pending_days(root, dataset, start=None, end=None, now=None, overwrite=False):
+    """Final days of a dataset within start..end with no partition yet (all with overwrite)"""
+    final_before = dataset.final_before(now or timezone.now())
+    if final_before is None:
+        return []
+    last = final_before.astimezone(dt_timezone.utc).date() - timedelta(days=1)
+    if end:
+        last = min(last, end)
+    first = start or dataset.first_day()
+    if first is None:
+        return []
+
+    days = []
+    day = first
+    while day <= last:
+        if overwrite or not partition_path(root, dataset, day).exists():
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def export(names=None, root=None, start=None, end=None, overwrite=False, progress=None):
+    """
+    Write the pending partitions of the given datasets (all by default).
+    Returns {dataset: (partitions written, rows written)}.
+    """
+    root = root or settings.ANALYTICS_EXPORT_ROOT
+    summary = {}
+    for name in names or DATASETS:
+        dataset = DATASETS[name]
+        partitions = rows = 0
+        for day in pending_days(root, dataset, start, end, overwrite=overwrite):
+            written = write_partition(root, dataset, day)
+            partitions += 1
+            rows += written
+            if progress:
+                progress(dataset, day, written)
+        summary[name] = (partitions, rows)
+        if partitions:
+            logger.info('Exported %s: %s partitions, %s rows', name, partitions, rows)
+    return summary
@@ -0,0 +1,37 @@
+"""
+Comando para (re)calcular as estatísticas diárias de um período histórico
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.analytics.rollup import earliest_activity, rollup_range
+
+
+class Command(BaseCommand):
+    help = 'Recalcula DailyStats a partir de sessões e pesquisas de rota, em blocos de dias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat,
+                            help='Primeiro dia (AAAA-MM-DD; padrão: dado mais antigo)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Último dia (AAAA-MM-DD; padrão: hoje)')
+        parser.add_argument('--chunk-days', type=int, default=7,
+                            help='Dias por bloco/transação (padrão: 7)')
+
+    def handle(self, *args, **options):
+        start = options['start'] or earliest_activity()
+        end = options['end'] or timezone.localdate() + timedelta(days=1)
+        if start is None:
+            self.stdout.write('Nenhuma sessão ou pesquisa de rota registrada')
+            return
+        if start > end:
+            raise CommandError('--start deve ser anterior a --end')
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days deve ser maior que zero')
+
+        def progress(chunk_start, chunk_end, rows):
+            self.stdout.write(f'  {chunk_start} a {chunk_end}: {rows} linha(s)')
+
+        written = rollup_range(start, end, options['chunk_days'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'{written} linha(s) de DailyStats gravada(s)'))
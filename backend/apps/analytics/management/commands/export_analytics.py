@@ -0,0 +1,38 @@
+"""
+Comando para exportar impressões, sessões, pesquisas de rota e DailyStats
+em Parquet particionado por dia (veja apps/analytics/export.py)
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.export import DATASETS, export
+
+
+class Command(BaseCommand):
+    help = 'Exporta os dados de analytics em arquivos Parquet, uma partição por dia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', action='append', choices=sorted(DATASETS),
+                            help='Conjunto a exportar (repetível; padrão: todos)')
+        parser.add_argument('--start', type=date.fromisoformat,
+                            help='Primeiro dia (AAAA-MM-DD; padrão: dado mais antigo)')
+        parser.add_argument('--end', type=date.fromisoformat,
+                            help='Último dia (AAAA-MM-DD; padrão: último dia fechado)')
+        parser.add_argument('--output', help='Diretório de saída (padrão: ANALYTICS_EXPORT_ROOT)')
+        parser.add_argument('--overwrite', action='store_true',
+                            help='Regrava partições já exportadas (ex.: após um backfill)')
+
+    def handle(self, *args, **options):
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError('--start deve ser anterior a --end')
+
+        def progress(dataset, day, rows):
+            self.stdout.write(f'  {dataset.name} {day}: {rows} linha(s)')
+
+        summary = export(
+            options['dataset'], root=options['output'], start=options['start'], end=options['end'],
+            overwrite=options['overwrite'], progress=progress,
+        )
+        for name, (partitions, rows) in summary.items():
+            self.stdout.write(self.style.SUCCESS(f'{name}: {partitions} partição(ões), {rows} linha(s)'))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_rollupwatermark'),
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='populardestination',
+            name='snap_key',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Chave'),
+        ),
+        migrations.AddConstraint(
+            model_name='populardestination',
+            constraint=models.UniqueConstraint(condition=models.Q(('snap_key', ''), _negated=True), fields=('city', 'snap_key'), name='populardestination_snap_key_uniq'),
+        ),
+    ]
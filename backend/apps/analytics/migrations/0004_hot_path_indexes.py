@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:53
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built without locking writes on the (large) tables
+    atomic = False
+
+    dependencies = [
+        ('analytics', '0003_populardestination_snap_key'),
+        ('totems', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='dailystats',
+            index=models.Index(fields=['date'], name='dailystats_date_idx'),
+        ),
+    ]
@@ -22,6 +22,10 @@ class DailyStats(models.Model):
         verbose_name_plural = 'Estatísticas Diárias'
         unique_together = ['totem', 'date']
         ordering = ['-date']
+        indexes = [
+            # Dashboard windows over all totems (the unique index leads with totem)
+            models.Index(fields=['date'], name='dailystats_date_idx'),
+        ]
 
 
 class PopularDestination(models.Model):
@@ -29,6 +33,8 @@ class PopularDestination(models.Model):
     city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='popular_destinations')
     
     destination_name = models.CharField('Destino', max_length=500)
+    # Grid cell (or normalized name) searches are grouped by, see destinations.snap_key
+    snap_key = models.CharField('Chave', max_length=100, blank=True, default='')
     latitude = models.DecimalField('Latitude', max_digits=10, decimal_places=7)
     longitude = models.DecimalField('Longitude', max_digits=10, decimal_places=7)
     
@@ -39,3 +45,23 @@ class PopularDestination(models.Model):
         verbose_name = 'Destino Popular'
         verbose_name_plural = 'Destinos Populares'
         ordering = ['-search_count']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['city', 'snap_key'], condition=~models.Q(snap_key=''),
+                name='populardestination_snap_key_uniq',
+            ),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """How far an incremental aggregation job has processed its sources"""
+    name = models.CharField('Job', max_length=100, unique=True)
+    high_water_mark = models.DateTimeField('Processado até')
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Marca de Processamento'
+        verbose_name_plural = 'Marcas de Processamento'
+
+    def __str__(self):
+        return f'{self.name}: {self.high_water_mark}'
@@ -0,0 +1,188 @@
+"""
+DailyStats materialization
+
+Per-totem daily sessions, interactions, route searches, average session
+duration and peak hour are computed from TotemSession and RouteSearch in
+one INSERT ... SELECT ... ON CONFLICT DO UPDATE per range of days. Days
+are the local dates of each totem's city. A day is always recomputed as a
+whole and its row overwritten, so running a range twice gives the same
+result.
+
+The incremental job keeps a high-water mark: each run recomputes only the
+days touched since the mark (minus a settling margin that covers sessions
+closed or flushed late), then moves the mark forward. History is loaded
+with the backfill command, in chunks of days.
+"""
+import logging
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.navigation.models import RouteSearch
+from apps.tenants.models import City
+from apps.totems.models import Totem, TotemSession
+from .models import DailyStats, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = 'daily_stats'
+
+# Timestamps are filtered with this margin around the UTC day bounds so
+# every city's local day is fully covered (UTC-12 .. UTC+14)
+TZ_MARGIN = timedelta(hours=14)
+
+ROLLUP_SQL = """
+WITH sessions AS (
+    SELECT s.totem_id,
+           (s.started_at AT TIME ZONE c.timezone)::date AS day,
+           EXTRACT(HOUR FROM s.started_at AT TIME ZONE c.timezone)::int AS hour,
+           s.interactions_count,
+           EXTRACT(EPOCH FROM s.ended_at - s.started_at) AS duration
+    FROM {session} s
+    JOIN {totem} t ON t.id = s.totem_id
+    JOIN {city} c ON c.id = t.city_id
+    WHERE s.started_at >= %(start)s AND s.started_at < %(end)s
+),
+searches AS (
+    SELECT r.totem_id,
+           (r.searched_at AT TIME ZONE c.timezone)::date AS day,
+           EXTRACT(HOUR FROM r.searched_at AT TIME ZONE c.timezone)::int AS hour
+    FROM {search} r
+    JOIN {totem} t ON t.id = r.totem_id
+    JOIN {city} c ON c.id = t.city_id
+    WHERE r.searched_at >= %(start)s AND r.searched_at < %(end)s
+),
+session_days AS (
+    SELECT totem_id, day,
+           COUNT(*) AS sessions_count,
+           COALESCE(SUM(interactions_count), 0) AS interactions_count,
+           COALESCE(ROUND(AVG(duration))::int, 0) AS avg_session_duration
+    FROM sessions
+    GROUP BY totem_id, day
+),
+search_days AS (
+    SELECT totem_id, day, COUNT(*) AS routes_searched
+    FROM searches
+    GROUP BY totem_id, day
+),
+peaks AS (
+    SELECT DISTINCT ON (totem_id, day) totem_id, day, hour
+    FROM (
+        SELECT totem_id, day, hour FROM sessions
+        UNION ALL
+        SELECT totem_id, day, hour FROM searches
+    ) activity
+    WHERE day BETWEEN %(first_day)s AND %(last_day)s
+    GROUP BY totem_id, day, hour
+    ORDER BY totem_id, day, COUNT(*) DESC, hour
+)
+INSERT INTO {stats} (
+    totem_id, date, sessions_count, interactions_count,
+    routes_searched, avg_session_duration, peak_hour
+)
+SELECT p.totem_id, p.day,
+       COALESCE(sd.sessions_count, 0), COALESCE(sd.interactions_count, 0),
+       COALESCE(rd.routes_searched, 0), COALESCE(sd.avg_session_duration, 0),
+       p.hour
+FROM peaks p
+LEFT JOIN session_days sd ON sd.totem_id = p.totem_id AND sd.day = p.day
+LEFT JOIN search_days rd ON rd.totem_id = p.totem_id AND rd.day = p.day
+ON CONFLICT (totem_id, date) DO UPDATE SET
+    sessions_count = EXCLUDED.sessions_count,
+    interactions_count = EXCLUDED.interactions_count,
+    routes_searched = EXCLUDED.routes_searched,
+    avg_session_duration = EXCLUDED.avg_session_duration,
+    peak_hour = EXCLUDED.peak_hour
+"""
+
+
+def rollup_days(first_day, last_day):
+    """
+    Recompute DailyStats for every totem with activity on the local dates
+    first_day..last_day (inclusive). Returns the number of rows written.
+    """
+    sql = ROLLUP_SQL.format(
+        session=TotemSession._meta.db_table,
+        search=RouteSearch._meta.db_table,
+        totem=Totem._meta.db_table,
+        city=City._meta.db_table,
+        stats=DailyStats._meta.db_table,
+    )
+    params = {
+        'first_day': first_day,
+        'last_day': last_day,
+        'start': datetime.combine(first_day, time.min, tzinfo=dt_timezone.utc) - TZ_MARGIN,
+        'end': datetime.combine(last_day + timedelta(days=1), time.min, tzinfo=dt_timezone.utc) + TZ_MARGIN,
+    }
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def day_chunks(first_day, last_day, chunk_days):
+    """(start, end) date pairs covering first_day..last_day, chunk_days each"""
+    day = first_day
+    while day <= last_day:
+        end = min(day + timedelta(days=chunk_days - 1), last_day)
+        yield day, end
+        day = end + timedelta(days=1)
+
+
+def earliest_activity():
+    """Date of the oldest session or route search, or None without data"""
+    dates = [
+        TotemSession.objects.aggregate(first=Min('started_at'))['first'],
+        RouteSearch.objects.aggregate(first=Min('searched_at'))['first'],
+    ]
+    dates = [value for value in dates if value]
+    return min(dates).astimezone(dt_timezone.utc).date() if dates else None
+
+
+def rollup_range(first_day, last_day, chunk_days=7, progress=None):
+    """Recompute a range of days in chunks (one transaction per chunk)"""
+    written = 0
+    for start, end in day_chunks(first_day, last_day, chunk_days):
+        rows = rollup_days(start, end)
+        written += rows
+        if progress:
+            progress(start, end, rows)
+    return written
+
+
+def settled_before():
+    """
+    Instant before which DailyStats no longer change: days ending before it
+    were recomputed after their last session could be flushed. None before
+    the first rollup.
+    """
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+    if not watermark:
+        return None
+    return watermark.high_water_mark - timedelta(seconds=settings.ANALYTICS_ROLLUP_SETTLE) - TZ_MARGIN
+
+
+def run_incremental(now=None):
+    """
+    Recompute the days touched since the high-water mark and advance it.
+    Without a mark (first run) all history is processed, in chunks.
+    """
+    now = now or timezone.now()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+
+    if watermark:
+        since = watermark.high_water_mark - timedelta(seconds=settings.ANALYTICS_ROLLUP_SETTLE)
+        first_day = since.astimezone(dt_timezone.utc).date() - timedelta(days=1)
+    else:
+        first_day = earliest_activity()
+    last_day = now.astimezone(dt_timezone.utc).date() + timedelta(days=1)
+
+    written = 0
+    if first_day:
+        written = rollup_range(first_day, last_day, chunk_days=settings.ANALYTICS_ROLLUP_CHUNK_DAYS)
+
+    RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'high_water_mark': now})
+    logger.info('DailyStats rollup %s..%s: %s rows', first_day, last_day, written)
+    return written
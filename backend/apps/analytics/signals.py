@@ -0,0 +1,17 @@
+"""
+Analytics Signals - drop the cached per-day dashboard partials when a
+totem is deleted (its DailyStats rows go with it)
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete
+
+
+def _invalidate_daily_stats(sender, **kwargs):
+    from .views import daily_stats_partials
+    transaction.on_commit(daily_stats_partials.invalidate)
+
+
+def connect_stats_signals():
+    from apps.totems.models import Totem
+
+    post_delete.connect(_invalidate_daily_stats, sender=Totem, dispatch_uid='daily_stats_totems_totem')
@@ -0,0 +1,43 @@
+"""
+Analytics background tasks
+"""
+from celery import shared_task
+from django.core.cache import cache
+
+from . import destinations
+from .rollup import run_incremental
+
+
+@shared_task
+def rollup_daily_stats():
+    """Materialize DailyStats for the days touched since the last run"""
+    if not cache.add('analytics:rollup_lock', 1, 30 * 60):
+        return None
+    try:
+        return run_incremental()
+    finally:
+        cache.delete('analytics:rollup_lock')
+
+
+@shared_task
+def flush_destination_counts():
+    """Write buffered route search counts to PopularDestination"""
+    if not cache.add('analytics:destinations_lock', 1, 5 * 60):
+        return None
+    try:
+        return destinations.flush()
+    finally:
+        cache.delete('analytics:destinations_lock')
+
+
+@shared_task
+def export_analytics():
+    """Write the Parquet partitions of the days closed since the last export"""
+    from .export import export
+
+    if not cache.add('analytics:export_lock', 1, 60 * 60):
+        return None
+    try:
+        return export()
+    finally:
+        cache.delete('analytics:export_lock')
@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import DashboardView
+from .views import DashboardView, PopularDestinationsView
 urlpatterns = [
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('destinations/popular/', PopularDestinationsView.as_view(), name='popular-destinations'),
 ]
@@ -1,34 +1,93 @@
 """Analytics Views"""
-from rest_framework import viewsets, views, permissions
+from rest_framework import viewsets, views, permissions, status
 from rest_framework.response import Response
 from django.db.models import Sum, Avg, Count
 from django.db.models.functions import TruncDate
-from datetime import datetime, timedelta
+from django.utils import timezone
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from apps.core.daily_partials import DailyPartials, merge
+from . import destinations
 from .models import DailyStats, PopularDestination
+from .rollup import settled_before
 from apps.totems.models import TotemSession
 from apps.navigation.models import RouteSearch
 
+
+def _daily_stats_partials(first_day, last_day, city=None):
+    stats_qs = DailyStats.objects.filter(date__gte=first_day, date__lte=last_day)
+    if city:
+        stats_qs = stats_qs.filter(totem__city_id=city)
+    partials = {}
+    for row in stats_qs.values('date').annotate(
+        sessions=Sum('sessions_count'),
+        interactions=Sum('interactions_count'),
+        routes=Sum('routes_searched'),
+        duration=Sum('avg_session_duration'),
+        rows=Count('id'),
+    ).order_by():
+        partials[row.pop('date')] = row
+    return partials
+
+
+def _daily_stats_settled_until():
+    settled = settled_before()
+    return settled.astimezone(dt_timezone.utc).date() if settled else date.min
+
+
+daily_stats_partials = DailyPartials('daily_stats', _daily_stats_partials, _daily_stats_settled_until)
+
+
 class DashboardView(views.APIView):
-    """Dashboard summary"""
+    """Dashboard summary (merged from cached per-day partials, see core/daily_partials.py)"""
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
         city = getattr(request, 'city', None)
         days = int(request.query_params.get('days', 7))
-        start_date = datetime.now().date() - timedelta(days=days)
-        
-        stats_qs = DailyStats.objects.filter(date__gte=start_date)
-        if city:
-            stats_qs = stats_qs.filter(totem__city=city)
-        
-        totals = stats_qs.aggregate(
-            total_sessions=Sum('sessions_count'),
-            total_interactions=Sum('interactions_count'),
-            total_routes=Sum('routes_searched'),
-            avg_duration=Avg('avg_session_duration')
-        )
-        
+        today = timezone.localdate()
+        start_date = today - timedelta(days=days)
+
+        # Rollups run up to a day ahead for cities east of the server
+        partials = daily_stats_partials.days(start_date, today + timedelta(days=1), city=city.id if city else None)
+        totals = merge(partials.values())
+        rows = totals.get('rows', 0)
+
         return Response({
             'period_days': days,
-            'totals': totals,
+            'totals': {
+                'total_sessions': totals['sessions'] if rows else None,
+                'total_interactions': totals['interactions'] if rows else None,
+                'total_routes': totals['routes'] if rows else None,
+                'avg_duration': totals['duration'] / rows if rows else None,
+            },
         })
+
+
+class PopularDestinationsView(views.APIView):
+    """Trending destinations of the city (X-City-ID), most searched recently first"""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        city_id = request.headers.get('X-City-ID')
+        if not city_id or not city_id.isdigit():
+            return Response({'error': 'X-City-ID required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+
+        results = destinations.top(int(city_id), limit)
+        if not results:
+            # Ranking not built yet (or Redis was emptied): all-time counts
+            results = [
+                {
+                    'name': row['destination_name'],
+                    'latitude': str(row['latitude']),
+                    'longitude': str(row['longitude']),
+                    'score': float(row['search_count']),
+                }
+                for row in PopularDestination.objects.filter(city_id=city_id).values(
+                    'destination_name', 'latitude', 'longitude', 'search_count'
+                )[:limit]
+            ]
+        return Response({'results': results})
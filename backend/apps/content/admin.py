@@ -6,6 +6,20 @@ from django.utils.html import format_html
 from django.utils import timezone
 from django.db.models import Count
 from .models import Category, News, Event, GalleryImage, PointOfInterest
+from .response_cache import invalidate_cities
+from .visibility import WINDOWS, invalidate_visible, window_name
+
+
+def update_content(queryset, **fields):
+    """queryset.update() plus the cache invalidation its save signals would do"""
+    city_ids = set(queryset.values_list('city_id', flat=True))
+    updated = queryset.update(**fields)
+    invalidate_cities(city_ids)
+    name = window_name(queryset.model)
+    if name in WINDOWS:
+        for city_id in city_ids:
+            invalidate_visible(name, city_id)
+    return updated
 
 
 @admin.register(Category)
@@ -92,22 +106,22 @@ class NewsAdmin(admin.ModelAdmin):
 
     @admin.action(description='Publicar notícias selecionadas')
     def publish_news(self, request, queryset):
-        updated = queryset.update(is_published=True)
+        updated = update_content(queryset, is_published=True)
         self.message_user(request, f'{updated} notícia(s) publicada(s).')
 
     @admin.action(description='Despublicar notícias selecionadas')
     def unpublish_news(self, request, queryset):
-        updated = queryset.update(is_published=False)
+        updated = update_content(queryset, is_published=False)
         self.message_user(request, f'{updated} notícia(s) despublicada(s).')
 
     @admin.action(description='Marcar como destaque')
     def feature_news(self, request, queryset):
-        updated = queryset.update(is_featured=True)
+        updated = update_content(queryset, is_featured=True)
         self.message_user(request, f'{updated} notícia(s) marcada(s) como destaque.')
 
     @admin.action(description='Remover destaque')
     def unfeature_news(self, request, queryset):
-        updated = queryset.update(is_featured=False)
+        updated = update_content(queryset, is_featured=False)
         self.message_user(request, f'{updated} notícia(s) removida(s) do destaque.')
 
 
@@ -165,22 +179,22 @@ class EventAdmin(admin.ModelAdmin):
 
     @admin.action(description='Publicar eventos selecionados')
     def publish_events(self, request, queryset):
-        updated = queryset.update(is_published=True)
+        updated = update_content(queryset, is_published=True)
         self.message_user(request, f'{updated} evento(s) publicado(s).')
 
     @admin.action(description='Despublicar eventos selecionados')
     def unpublish_events(self, request, queryset):
-        updated = queryset.update(is_published=False)
+        updated = update_content(queryset, is_published=False)
         self.message_user(request, f'{updated} evento(s) despublicado(s).')
 
     @admin.action(description='Marcar como destaque')
     def feature_events(self, request, queryset):
-        updated = queryset.update(is_featured=True)
+        updated = update_content(queryset, is_featured=True)
         self.message_user(request, f'{updated} evento(s) marcado(s) como destaque.')
 
     @admin.action(description='Remover destaque')
     def unfeature_events(self, request, queryset):
-        updated = queryset.update(is_featured=False)
+        updated = update_content(queryset, is_featured=False)
         self.message_user(request, f'{updated} evento(s) removido(s) do destaque.')
 
 
@@ -227,12 +241,12 @@ class GalleryImageAdmin(admin.ModelAdmin):
 
     @admin.action(description='Ativar imagens selecionadas')
     def activate_images(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = update_content(queryset, is_active=True)
         self.message_user(request, f'{updated} imagem(ns) ativada(s).')
 
     @admin.action(description='Desativar imagens selecionadas')
     def deactivate_images(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = update_content(queryset, is_active=False)
         self.message_user(request, f'{updated} imagem(ns) desativada(s).')
 
 
@@ -324,22 +338,22 @@ class PointOfInterestAdmin(admin.ModelAdmin):
 
     @admin.action(description='Ativar POIs selecionados')
     def activate_pois(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = update_content(queryset, is_active=True)
         self.message_user(request, f'{updated} POI(s) ativado(s).')
 
     @admin.action(description='Desativar POIs selecionados')
     def deactivate_pois(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = update_content(queryset, is_active=False)
         self.message_user(request, f'{updated} POI(s) desativado(s).')
 
     @admin.action(description='Marcar como destaque')
     def feature_pois(self, request, queryset):
-        updated = queryset.update(is_featured=True)
+        updated = update_content(queryset, is_featured=True)
         self.message_user(request, f'{updated} POI(s) marcado(s) como destaque.')
 
     @admin.action(description='Remover destaque')
     def unfeature_pois(self, request, queryset):
-        updated = queryset.update(is_featured=False)
+        updated = update_content(queryset, is_featured=False)
         self.message_user(request, f'{updated} POI(s) removido(s) do destaque.')
 
 
@@ -436,10 +450,11 @@ class PlaylistItemAdmin(admin.ModelAdmin):
 
 @admin.register(RSSFeed)
 class RSSFeedAdmin(admin.ModelAdmin):
-    list_display = ['name', 'city', 'url_short', 'is_active', 'last_fetched', 'items_count']
+    list_display = ['name', 'city', 'url_short', 'is_active', 'last_fetched', 'items_count', 'error_count']
     list_filter = ['city', 'is_active']
     search_fields = ['name', 'url']
     ordering = ['city', 'name']
+    readonly_fields = ['last_fetched', 'etag', 'last_modified', 'next_fetch_at', 'error_count', 'last_error']
 
     def url_short(self, obj):
         if len(obj.url) > 50:
@@ -448,14 +463,73 @@ class RSSFeedAdmin(admin.ModelAdmin):
     url_short.short_description = 'URL'
 
     def items_count(self, obj):
-        if obj.cached_items:
-            return len(obj.cached_items)
-        return 0
+        return len(obj.cached_content or [])
     items_count.short_description = 'Itens'
 
     actions = ['refresh_feeds']
 
     @admin.action(description='Atualizar feeds selecionados')
     def refresh_feeds(self, request, queryset):
-        # Aqui poderia chamar uma task Celery para atualizar os feeds
-        self.message_user(request, f'{queryset.count()} feed(s) marcado(s) para atualização.')
+        from .tasks import fetch_feeds_now
+        feed_ids = list(queryset.values_list('id', flat=True))
+        fetch_feeds_now.delay(feed_ids)
+        self.message_user(request, f'{len(feed_ids)} feed(s) marcado(s) para atualização.')
+
+
+# Media Admin
+from .models_media import MediaBlob, ImageJob, VideoJob, UploadSession
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'content_type', 'variant', 'size_formatted', 'ref_count', 'created_at']
+    list_filter = ['content_type', 'variant']
+    search_fields = ['sha256', 'name']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'sha256', 'name', 'size', 'content_type', 'width', 'height', 'duration',
+        'source', 'variant', 'ref_count', 'created_at', 'updated_at'
+    ]
+
+    def has_add_permission(self, request):
+        return False  # Criados automaticamente no upload
+
+    def size_formatted(self, obj):
+        if obj.size >= 1024 * 1024:
+            return f'{obj.size / (1024 * 1024):.1f}MB'
+        return f'{obj.size / 1024:.0f}KB'
+    size_formatted.short_description = 'Tamanho'
+    size_formatted.admin_order_field = 'size'
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'blob', 'status', 'created_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['blob', 'status', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(VideoJob)
+class VideoJobAdmin(ImageJobAdmin):
+    pass
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'target', 'status', 'progress', 'created_at', 'updated_at']
+    list_filter = ['status', 'target']
+    search_fields = ['filename']
+    readonly_fields = [
+        'id', 'target', 'filename', 'content_type', 'size', 'offset', 'checksum',
+        'metadata', 'status', 'error', 'blob', 'result', 'created_at', 'updated_at'
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress(self, obj):
+        return f'{obj.offset * 100 // obj.size}%' if obj.size else '-'
+    progress.short_description = 'Progresso'
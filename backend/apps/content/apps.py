@@ -4,3 +4,13 @@ class ContentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.content'
     verbose_name = 'Conteúdo'
+
+    def ready(self):
+        from .signals import (
+            connect_media_signals, connect_response_cache_signals,
+            connect_schedule_signals, connect_visibility_signals,
+        )
+        connect_media_signals()
+        connect_schedule_signals()
+        connect_visibility_signals()
+        connect_response_cache_signals()
@@ -0,0 +1,162 @@
+"""
+On-demand image derivatives
+
+Resized copies are produced lazily by /media/r/<w>x<h>/<path>, kept on disk
+and evicted least-recently-used first once the cache outgrows its budget.
+"""
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.core.files import locks
+from PIL import Image
+
+from .storage import is_content_addressed, media_storage
+from .utils import (
+    IMAGE_FORMATS, MODERN_IMAGE_FORMATS, RESOLUTION_PRESETS, THUMBNAIL_SIZES,
+    encode_image, fit_size, has_alpha, normalize_mode,
+)
+
+
+# Sizes the endpoint will produce; anything else is a 404 so the cache
+# can't be filled with arbitrary dimensions
+DEFAULT_ALLOWED_SIZES = sorted(set(RESOLUTION_PRESETS.values()) | set(THUMBNAIL_SIZES.values()))
+
+SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+# Don't rewrite a derivative's mtime (its LRU position) more often than this
+TOUCH_INTERVAL = 60 * 60
+
+
+def allowed_sizes():
+    return {tuple(size) for size in getattr(settings, 'MEDIA_RESIZE_SIZES', None) or DEFAULT_ALLOWED_SIZES}
+
+
+def negotiate_format(accept, has_alpha):
+    """Best format the client accepts: AVIF, WebP, then JPEG/PNG"""
+    accept = accept or ''
+    for ext in MODERN_IMAGE_FORMATS:
+        if IMAGE_FORMATS[ext][1] in accept:
+            return ext
+    return 'png' if has_alpha else 'jpg'
+
+
+class DerivativeCache:
+    """Resized images on disk with single-flight generation and LRU eviction"""
+
+    def __init__(self, root=None, budget=None):
+        self.root = str(root or settings.MEDIA_DERIVATIVE_ROOT)
+        self.budget = budget if budget is not None else settings.MEDIA_DERIVATIVE_CACHE_BYTES
+
+    def source_path(self, path):
+        """Absolute path of the original (raises SuspiciousFileOperation on traversal)"""
+        return media_storage.path(path)
+
+    def key(self, path, size, ext):
+        """
+        Cache key for a derivative. Content-addressed sources never change;
+        for older uploads the source mtime is part of the key, so replacing
+        the file produces a new derivative.
+        """
+        version = '' if is_content_addressed(path) else str(int(os.path.getmtime(self.source_path(path))))
+        raw = f'{path}:{version}:{size[0]}x{size[1]}:{ext}'
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def path_for(self, key, ext):
+        return os.path.join(self.root, key[:2], f'{key}.{ext}')
+
+    def get(self, path, size, accept=''):
+        """
+        Return (file_path, content_type) of the derivative, generating it if
+        needed. Concurrent requests for the same derivative wait on a file
+        lock, so the original is decoded only once across all workers.
+        """
+        source = self.source_path(path)
+        with Image.open(source) as probe:
+            ext = negotiate_format(accept, has_alpha(probe))
+        key = self.key(path, size, ext)
+        target = self.path_for(key, ext)
+        content_type = IMAGE_FORMATS[ext][1]
+
+        if os.path.exists(target):
+            self._touch(target)
+            return target, content_type
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        lock_path = f'{target}.lock'
+        with open(lock_path, 'wb') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                # Another worker may have produced it while we waited
+                if not os.path.exists(target):
+                    self._render(source, size, ext, target)
+            finally:
+                locks.unlock(lock_file)
+        return target, content_type
+
+    def _render(self, source, size, ext, target):
+        with Image.open(source) as img:
+            target_size = fit_size(img.size, size)
+            if img.format == 'JPEG':
+                img.draft('RGB', target_size)
+            img = normalize_mode(img)
+            if img.size != target_size:
+                img = img.resize(target_size, Image.Resampling.LANCZOS)
+            if ext == 'jpg' and img.mode == 'RGBA':
+                img = img.convert('RGB')
+            encoded = encode_image(img, ext, 85, 'derivative')
+
+        tmp_path = f'{target}.tmp{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            for chunk in encoded.chunks():
+                f.write(chunk)
+        os.replace(tmp_path, target)
+
+    def _touch(self, target):
+        """Move a derivative to the front of the LRU (mtime is the recency)"""
+        try:
+            if time.time() - os.path.getmtime(target) > TOUCH_INTERVAL:
+                os.utime(target)
+        except OSError:
+            pass
+
+    def evict(self, target_ratio=0.9):
+        """
+        Delete least-recently-used derivatives until the cache is back under
+        target_ratio of its budget. Returns (files_removed, bytes_removed).
+        """
+        entries = []
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                if filename.endswith('.lock'):
+                    continue
+                full_path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, full_path))
+                total += stat.st_size
+
+        if total <= self.budget:
+            return 0, 0
+
+        limit = self.budget * target_ratio
+        removed = removed_bytes = 0
+        for mtime, size, full_path in sorted(entries):
+            if total <= limit:
+                break
+            try:
+                os.remove(full_path)
+            except OSError:
+                continue
+            # Lock files are kept while the derivative exists so waiters
+            # always lock the same inode
+            if os.path.exists(f'{full_path}.lock'):
+                os.remove(f'{full_path}.lock')
+            total -= size
+            removed += 1
+            removed_bytes += size
+        return removed, removed_bytes
@@ -0,0 +1,259 @@
+"""
+RSS/Atom feed ingestion
+
+Feeds are polled by Celery (never by totem requests) with conditional GETs
+(ETag / Last-Modified). Responses are parsed incrementally as they stream
+in, so a huge feed never sits in memory, and normalized items are merged
+into RSSFeed.cached_content deduplicated by GUID. Failing feeds back off
+exponentially.
+"""
+import hashlib
+import html
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from email.utils import parsedate_to_datetime
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import httpx
+from django.conf import settings
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+ITEM_TAGS = {'item', 'entry'}
+SUMMARY_LENGTH = 500
+USER_AGENT = 'SanarisTotem/1.0 (+feed fetcher)'
+
+
+class FeedError(Exception):
+    """The feed couldn't be fetched or parsed"""
+
+
+def _local(tag):
+    """Tag name without its XML namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _text(element):
+    return (element.text or '').strip() if element is not None else ''
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)  # RSS (RFC 822)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value)  # Atom (RFC 3339)
+        except ValueError:
+            return None
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed.astimezone(dt_timezone.utc).isoformat()
+
+
+def normalize_item(element):
+    """Turn an RSS <item> or Atom <entry> into a flat dict"""
+    fields = {}
+    link = image = ''
+    for child in element:
+        tag = _local(child.tag)
+        if tag == 'link':
+            # Atom links are attributes; prefer rel="alternate"
+            href = child.get('href')
+            if href and (not link or child.get('rel', 'alternate') == 'alternate'):
+                link = href
+            elif not href and not link:
+                link = _text(child)
+        elif tag == 'enclosure' and child.get('type', '').startswith('image/'):
+            image = image or child.get('url', '')
+        elif tag in ('content', 'thumbnail') and child.get('url'):
+            # media:content / media:thumbnail
+            if child.get('medium', 'image') == 'image':
+                image = image or child.get('url', '')
+        else:
+            fields.setdefault(tag, _text(child))
+
+    title = html.unescape(strip_tags(fields.get('title', '')))
+    summary = fields.get('description') or fields.get('summary') or fields.get('content') or ''
+    summary = ' '.join(html.unescape(strip_tags(summary)).split())
+    if len(summary) > SUMMARY_LENGTH:
+        summary = summary[:SUMMARY_LENGTH].rsplit(' ', 1)[0] + '…'
+    published = _parse_date(
+        fields.get('pubDate') or fields.get('published') or fields.get('updated') or fields.get('date')
+    )
+    guid = fields.get('guid') or fields.get('id') or link
+    if not guid:
+        guid = hashlib.sha1(f'{title}|{published}'.encode()).hexdigest()
+
+    return {
+        'guid': guid,
+        'title': title,
+        'link': link,
+        'summary': summary,
+        'image': image,
+        'published': published,
+    }
+
+
+def parse_feed(chunks, max_items=None):
+    """
+    Parse RSS 2.0 / Atom from an iterable of byte chunks
+
+    Each item is normalized and cleared as soon as its closing tag arrives,
+    so memory stays bounded by the largest single item.
+    """
+    max_items = max_items or settings.RSS_MAX_ITEMS
+    parser = XMLPullParser(events=('end',))
+    items = []
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                if _local(element.tag) in ITEM_TAGS:
+                    items.append(normalize_item(element))
+                    element.clear()
+                    if len(items) >= max_items:
+                        return items
+        parser.close()
+    except ParseError as e:
+        raise FeedError(f'XML inválido: {e}') from e
+    return items
+
+
+def merge_items(new_items, existing, limit=None):
+    """New items first, older ones kept, one entry per GUID"""
+    limit = limit or settings.RSS_MAX_ITEMS
+    merged, seen = [], set()
+    for item in [*new_items, *(existing or [])]:
+        guid = item.get('guid')
+        if guid in seen:
+            continue
+        seen.add(guid)
+        merged.append(item)
+    merged.sort(key=lambda item: item.get('published') or '', reverse=True)
+    return merged[:limit]
+
+
+def fixture_transport(directory):
+    """httpx transport serving <directory>/<last path segment of the URL> (for tests)"""
+    def handler(request):
+        name = os.path.basename(request.url.path.rstrip('/')) or 'index.xml'
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            return httpx.Response(404)
+        with open(path, 'rb') as f:
+            return httpx.Response(200, content=f.read(), headers={'ETag': f'"{name}"'})
+    return httpx.MockTransport(handler)
+
+
+def get_client():
+    fixtures = getattr(settings, 'RSS_FIXTURES_DIR', '')
+    return httpx.Client(
+        timeout=settings.RSS_FETCH_TIMEOUT,
+        follow_redirects=True,
+        headers={'User-Agent': USER_AGENT},
+        transport=fixture_transport(fixtures) if fixtures else None,
+    )
+
+
+def fetch(client, url, etag='', last_modified=''):
+    """
+    Conditional GET of one feed (no database access, safe in a thread)
+
+    Returns:
+        Dict with 'status' ('not_modified' | 'ok' | 'error'), 'items',
+        'etag', 'last_modified' and 'error'
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    try:
+        with client.stream('GET', url, headers=headers) as response:
+            if response.status_code == 304:
+                return {'status': 'not_modified'}
+            response.raise_for_status()
+
+            received = 0
+
+            def chunks():
+                nonlocal received
+                for chunk in response.iter_bytes():
+                    received += len(chunk)
+                    if received > settings.RSS_MAX_BYTES:
+                        raise FeedError('Feed maior que o limite')
+                    yield chunk
+
+            items = parse_feed(chunks())
+            return {
+                'status': 'ok',
+                'items': items,
+                'etag': response.headers.get('ETag', ''),
+                'last_modified': response.headers.get('Last-Modified', ''),
+            }
+    except (httpx.HTTPError, FeedError) as e:
+        return {'status': 'error', 'error': str(e) or e.__class__.__name__}
+
+
+def backoff(error_count):
+    """Delay before retrying a feed that failed error_count times in a row"""
+    interval = settings.RSS_FETCH_INTERVAL * 2 ** min(error_count, 10)
+    return timedelta(seconds=min(interval, settings.RSS_MAX_BACKOFF))
+
+
+def apply_result(feed, result):
+    """Store a fetch result on the feed and schedule its next poll"""
+    now = timezone.now()
+    if result['status'] == 'error':
+        feed.error_count += 1
+        feed.last_error = result['error'][:1000]
+        feed.next_fetch_at = now + backoff(feed.error_count)
+        logger.warning('Feed %s failed (%s): %s', feed.id, feed.error_count, feed.last_error)
+    else:
+        if result['status'] == 'ok':
+            feed.cached_content = merge_items(result['items'], feed.cached_content)
+            feed.etag = result['etag']
+            feed.last_modified = result['last_modified']
+        feed.last_fetched = now
+        feed.error_count = 0
+        feed.last_error = ''
+        feed.next_fetch_at = now + timedelta(seconds=settings.RSS_FETCH_INTERVAL)
+
+    feed.save(update_fields=[
+        'cached_content', 'etag', 'last_modified', 'last_fetched',
+        'error_count', 'last_error', 'next_fetch_at',
+    ])
+
+
+def fetch_feeds(feeds, client=None):
+    """
+    Fetch feeds concurrently (HTTP and parsing in threads, database writes
+    here). Returns the number of feeds that changed.
+    """
+    feeds = list(feeds)
+    if not feeds:
+        return 0
+
+    own_client = client is None
+    client = client or get_client()
+    try:
+        with ThreadPoolExecutor(max_workers=settings.RSS_FETCH_CONCURRENCY) as pool:
+            results = list(pool.map(
+                lambda feed: fetch(client, feed.url, feed.etag, feed.last_modified), feeds
+            ))
+    finally:
+        if own_client:
+            client.close()
+
+    changed = 0
+    for feed, result in zip(feeds, results):
+        apply_result(feed, result)
+        changed += result['status'] == 'ok'
+    return changed
@@ -0,0 +1,79 @@
+"""
+Comando para medir consultas e tempo da serialização de playlists
+
+Cria playlists temporárias com centenas de itens (descartadas ao final) e
+falha se o número de consultas crescer com a quantidade de itens.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.content.models_playlist import Playlist, PlaylistItem
+from apps.content.serializers import PlaylistSerializer
+from apps.tenants.models import City
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mede consultas SQL e tempo da serialização de playlists com muitos itens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--playlists', type=int, default=10, help='Playlists no lote (padrão: 10)')
+        parser.add_argument('--items', type=int, nargs='+', default=[10, 100, 500],
+                            help='Itens por playlist em cada rodada (padrão: 10 100 500)')
+        parser.add_argument('--max-queries', type=int, default=2,
+                            help='Máximo de consultas para listar o lote (padrão: 2)')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with transaction.atomic():
+                city = City.objects.create(
+                    name='Benchmark', slug='benchmark-playlists', state='RJ', latitude=0, longitude=0
+                )
+                for item_count in options['items']:
+                    results.append(self.run(city, options['playlists'], item_count))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f"{'itens':>8} {'consultas':>10} {'antes':>8} {'tempo (ms)':>11}")
+        for item_count, queries, legacy_queries, elapsed in results:
+            self.stdout.write(f'{item_count:>8} {queries:>10} {legacy_queries:>8} {elapsed * 1000:>11.1f}')
+
+        counts = {queries for _, queries, _, _ in results}
+        if len(counts) > 1 or max(counts) > options['max_queries']:
+            raise CommandError(f'Consultas variam com o número de itens: {sorted(counts)}')
+        self.stdout.write(self.style.SUCCESS('Número de consultas constante'))
+
+    def run(self, city, playlist_count, item_count):
+        Playlist.objects.filter(city=city).delete()
+        for p in range(playlist_count):
+            playlist = Playlist.objects.create(city=city, name=f'Playlist {p}', priority=p)
+            PlaylistItem.objects.bulk_create([
+                PlaylistItem(
+                    playlist=playlist, item_type='clock', name=f'Item {i}',
+                    duration=10 + i % 20, order=i, is_active=i % 10 != 0,
+                )
+                for i in range(item_count)
+            ])
+
+        queryset = Playlist.objects.filter(city=city)
+
+        # Unprefetched path, for comparison
+        with CaptureQueriesContext(connection) as legacy:
+            legacy_data = PlaylistSerializer(queryset.all(), many=True).data
+
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            data = PlaylistSerializer(PlaylistSerializer.prefetch(queryset.all()), many=True).data
+            elapsed = time.perf_counter() - start
+
+        if data != legacy_data:
+            raise CommandError('A saída com prefetch difere da original')
+        return item_count, len(captured), len(legacy), elapsed
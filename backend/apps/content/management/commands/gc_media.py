@@ -0,0 +1,71 @@
+"""
+Comando para remover arquivos de mídia órfãos do armazenamento por conteúdo
+"""
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.content.models_media import MediaBlob
+from apps.content.storage import CAS_PREFIX, media_storage, refresh_ref_counts
+
+
+class Command(BaseCommand):
+    help = 'Recalcula referências e remove arquivos de mídia sem uso (content-addressed storage)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=int, default=24,
+            help='Só remove arquivos sem referência há mais tempo que isso (padrão: 24h)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Apenas lista o que seria removido')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+
+        updated = refresh_ref_counts()
+        self.stdout.write(f'Contagens de referência atualizadas: {updated}')
+
+        # 1. Originals no longer referenced by any model (their resized
+        #    variants go with them)
+        orphans = MediaBlob.objects.filter(source__isnull=True, ref_count=0, updated_at__lt=cutoff)
+        removed_bytes = 0
+        removed = 0
+        for blob in orphans.prefetch_related('derivatives'):
+            for stored in [*blob.derivatives.all(), blob]:
+                self.stdout.write(f'  órfão: {stored.name} ({stored.size} bytes)')
+                if not dry_run:
+                    media_storage.delete(stored.name)
+                removed += 1
+                removed_bytes += stored.size
+            if not dry_run:
+                blob.delete()
+
+        # 2. Files on disk with no MediaBlob row (interrupted uploads, temp files)
+        known = set(MediaBlob.objects.values_list('name', flat=True))
+        for name, mtime in self._walk(CAS_PREFIX):
+            if name in known or mtime >= cutoff:
+                continue
+            self.stdout.write(f'  sem registro: {name}')
+            if not dry_run:
+                removed_bytes += media_storage.size(name)
+                media_storage.delete(name)
+            removed += 1
+
+        verb = 'seriam removidos' if dry_run else 'removidos'
+        self.stdout.write(self.style.SUCCESS(
+            f'{removed} arquivo(s) {verb} ({removed_bytes / (1024 * 1024):.1f}MB)'
+        ))
+
+    def _walk(self, path):
+        """Yield (name, modified_time) for every file below path"""
+        if not media_storage.exists(path):
+            return
+        directories, files = media_storage.listdir(path)
+        for filename in files:
+            name = f'{path}/{filename}'
+            yield name, media_storage.get_modified_time(name)
+        for directory in directories:
+            yield from self._walk(os.path.join(path, directory).replace('\\', '/'))
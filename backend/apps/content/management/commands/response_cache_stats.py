@@ -0,0 +1,34 @@
+"""
+Comando para ver a taxa de acerto do cache de respostas por endpoint
+"""
+from django.core.management.base import BaseCommand
+
+from apps.content import response_cache
+
+
+class Command(BaseCommand):
+    help = 'Mostra acertos/falhas do cache de respostas dos endpoints de conteúdo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zera os contadores depois de exibir')
+        parser.add_argument('--flush', action='store_true',
+                            help='Invalida as respostas em cache de todas as cidades')
+
+    def handle(self, *args, **options):
+        stats = response_cache.stats()
+        if not stats:
+            self.stdout.write('Nenhuma requisição registrada')
+        else:
+            self.stdout.write(f"{'endpoint':<40} {'acertos':>10} {'falhas':>10} {'taxa':>8}")
+            for endpoint, row in stats.items():
+                rate = f"{row['hit_rate'] * 100:.1f}%" if row['hit_rate'] is not None else '-'
+                self.stdout.write(f"{endpoint:<40} {row['hits']:>10} {row['misses']:>10} {rate:>8}")
+
+        if options['reset']:
+            response_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Contadores zerados'))
+
+        if options['flush']:
+            # The global generation is part of every key
+            response_cache.invalidate_content(None)
+            self.stdout.write(self.style.SUCCESS('Cache de respostas invalidado'))
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:10
+
+import apps.content.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_make_event_fields_optional'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='event',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=apps.content.storage.get_media_storage, upload_to='events/', verbose_name='Imagem'),
+        ),
+        migrations.AlterField(
+            model_name='galleryimage',
+            name='image',
+            field=models.ImageField(storage=apps.content.storage.get_media_storage, upload_to='gallery/', verbose_name='Imagem'),
+        ),
+        migrations.AlterField(
+            model_name='news',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=apps.content.storage.get_media_storage, upload_to='news/', verbose_name='Imagem'),
+        ),
+        migrations.AlterField(
+            model_name='playlistitem',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=apps.content.storage.get_media_storage, upload_to='playlist/', verbose_name='Imagem'),
+        ),
+        migrations.AlterField(
+            model_name='pointofinterest',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=apps.content.storage.get_media_storage, upload_to='pois/', verbose_name='Imagem'),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Arquivo')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Tamanho (bytes)')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Tipo')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='Referências')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Arquivo de Mídia',
+                'verbose_name_plural': 'Arquivos de Mídia',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['ref_count', 'updated_at'], name='mediablob_orphan_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0005_mediablob_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='height',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Altura'),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='source',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='content.mediablob'),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='variant',
+            field=models.CharField(blank=True, max_length=50, verbose_name='Variante'),
+        ),
+        migrations.AddField(
+            model_name='mediablob',
+            name='width',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Largura'),
+        ),
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('processing', 'Processando'), ('done', 'Concluído'), ('failed', 'Falhou')], default='pending', max_length=20, verbose_name='Status')),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finalizado em')),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='content.mediablob')),
+            ],
+            options={
+                'verbose_name': 'Processamento de Imagem',
+                'verbose_name_plural': 'Processamentos de Imagem',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0006_imagejob_mediablob_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='duration',
+            field=models.FloatField(blank=True, null=True, verbose_name='Duração (s)'),
+        ),
+        migrations.CreateModel(
+            name='VideoJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('processing', 'Processando'), ('done', 'Concluído'), ('failed', 'Falhou')], default='pending', max_length=20, verbose_name='Status')),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finalizado em')),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_jobs', to='content.mediablob')),
+            ],
+            options={
+                'verbose_name': 'Processamento de Vídeo',
+                'verbose_name_plural': 'Processamentos de Vídeo',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:24
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0007_mediablob_duration_videojob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(choices=[('file', 'Arquivo'), ('gallery', 'Galeria'), ('creative', 'Criativo')], default='file', max_length=20, verbose_name='Destino')),
+                ('filename', models.CharField(max_length=255, verbose_name='Nome do Arquivo')),
+                ('content_type', models.CharField(max_length=100, verbose_name='Tipo')),
+                ('size', models.BigIntegerField(verbose_name='Tamanho (bytes)')),
+                ('offset', models.BigIntegerField(default=0, verbose_name='Recebido (bytes)')),
+                ('checksum', models.CharField(blank=True, max_length=64, verbose_name='SHA-256 esperado')),
+                ('metadata', models.JSONField(blank=True, default=dict, help_text='Dados do destino (ex: campaign_id, city_id, title)', verbose_name='Metadados')),
+                ('status', models.CharField(choices=[('uploading', 'Enviando'), ('complete', 'Concluído'), ('failed', 'Falhou')], default='uploading', max_length=20, verbose_name='Status')),
+                ('error', models.TextField(blank=True, verbose_name='Erro')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='Resultado')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('blob', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='content.mediablob')),
+            ],
+            options={
+                'verbose_name': 'Upload Resumível',
+                'verbose_name_plural': 'Uploads Resumíveis',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='uploadsession_stale_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0008_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rssfeed',
+            name='error_count',
+            field=models.IntegerField(default=0, verbose_name='Falhas Seguidas'),
+        ),
+        migrations.AddField(
+            model_name='rssfeed',
+            name='etag',
+            field=models.CharField(blank=True, max_length=255, verbose_name='ETag'),
+        ),
+        migrations.AddField(
+            model_name='rssfeed',
+            name='last_error',
+            field=models.TextField(blank=True, verbose_name='Último Erro'),
+        ),
+        migrations.AddField(
+            model_name='rssfeed',
+            name='last_modified',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Last-Modified'),
+        ),
+        migrations.AddField(
+            model_name='rssfeed',
+            name='next_fetch_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Próxima Atualização'),
+        ),
+    ]
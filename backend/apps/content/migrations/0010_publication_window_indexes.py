@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0009_rssfeed_fetch_state'),
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['city', 'end_date'], name='event_published_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['city', 'start_date'], name='event_published_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='galleryimage',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['city', 'display_start', 'display_end'], name='gallery_display_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['city', 'publish_at'], name='news_published_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False), ('is_published', True)), fields=['city', 'expires_at'], name='news_expires_idx'),
+        ),
+    ]
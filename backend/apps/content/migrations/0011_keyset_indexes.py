@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0010_publication_window_indexes'),
+        ('tenants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='news',
+            name='news_published_window_idx',
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['city', 'publish_at', 'id'], name='news_published_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['publish_at', 'id'], name='news_keyset_idx'),
+        ),
+    ]
@@ -4,6 +4,7 @@ Content Models - News, Events, Images, POIs
 from django.db import models
 from django.contrib.gis.db import models as gis_models
 from apps.tenants.models import City
+from .storage import get_media_storage
 
 
 class Category(models.Model):
@@ -34,7 +35,7 @@ class News(models.Model):
     title = models.CharField('Título', max_length=300)
     subtitle = models.CharField('Subtítulo', max_length=500, blank=True)
     content = models.TextField('Conteúdo')
-    image = models.ImageField('Imagem', upload_to='news/', null=True, blank=True)
+    image = models.ImageField('Imagem', upload_to='news/', storage=get_media_storage, null=True, blank=True)
     
     is_featured = models.BooleanField('Destaque', default=False)
     is_published = models.BooleanField('Publicado', default=True)
@@ -49,6 +50,17 @@ class News(models.Model):
         verbose_name = 'Notícia'
         verbose_name_plural = 'Notícias'
         ordering = ['-publish_at']
+        indexes = [
+            # Publication window lookups (see visibility.py) and keyset
+            # pagination on (publish_at, id) within a city
+            models.Index(fields=['city', 'publish_at', 'id'], condition=models.Q(is_published=True),
+                         name='news_published_window_idx'),
+            models.Index(fields=['publish_at', 'id'], condition=models.Q(is_published=True),
+                         name='news_keyset_idx'),
+            models.Index(fields=['city', 'expires_at'],
+                         condition=models.Q(is_published=True, expires_at__isnull=False),
+                         name='news_expires_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -61,7 +73,7 @@ class Event(models.Model):
     
     title = models.CharField('Título', max_length=300)
     description = models.TextField('Descrição', blank=True)
-    image = models.ImageField('Imagem', upload_to='events/', null=True, blank=True)
+    image = models.ImageField('Imagem', upload_to='events/', storage=get_media_storage, null=True, blank=True)
     
     # Location
     venue = models.CharField('Local', max_length=300, blank=True)
@@ -88,6 +100,12 @@ class Event(models.Model):
         verbose_name = 'Evento'
         verbose_name_plural = 'Eventos'
         ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['city', 'end_date'], condition=models.Q(is_published=True),
+                         name='event_published_window_idx'),
+            models.Index(fields=['city', 'start_date'], condition=models.Q(is_published=True),
+                         name='event_published_start_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -99,7 +117,7 @@ class GalleryImage(models.Model):
     
     title = models.CharField('Título', max_length=200)
     description = models.TextField('Descrição', blank=True)
-    image = models.ImageField('Imagem', upload_to='gallery/')
+    image = models.ImageField('Imagem', upload_to='gallery/', storage=get_media_storage)
     
     order = models.IntegerField('Ordem', default=0)
     is_active = models.BooleanField('Ativo', default=True)
@@ -113,6 +131,10 @@ class GalleryImage(models.Model):
         verbose_name = 'Imagem da Galeria'
         verbose_name_plural = 'Imagens da Galeria'
         ordering = ['order', '-created_at']
+        indexes = [
+            models.Index(fields=['city', 'display_start', 'display_end'], condition=models.Q(is_active=True),
+                         name='gallery_display_window_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.city.name})"
@@ -139,7 +161,7 @@ class PointOfInterest(models.Model):
     name = models.CharField('Nome', max_length=200)
     poi_type = models.CharField('Tipo', max_length=20, choices=POI_TYPES)
     description = models.TextField('Descrição', blank=True)
-    image = models.ImageField('Imagem', upload_to='pois/', null=True, blank=True)
+    image = models.ImageField('Imagem', upload_to='pois/', storage=get_media_storage, null=True, blank=True)
     
     # Location
     address = models.CharField('Endereço', max_length=500)
@@ -172,3 +194,4 @@ class PointOfInterest(models.Model):
 
 # Import playlist models
 from .models_playlist import Playlist, PlaylistItem, RSSFeed
+from .models_media import MediaBlob, ImageJob, VideoJob
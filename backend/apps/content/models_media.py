@@ -0,0 +1,160 @@
+"""
+Media Blob Models - content-addressed files and their reference counts
+"""
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class MediaBlob(models.Model):
+    """A file stored by SHA-256 in the content-addressed storage"""
+    sha256 = models.CharField('SHA-256', max_length=64, unique=True)
+    name = models.CharField('Arquivo', max_length=255, unique=True)
+    size = models.BigIntegerField('Tamanho (bytes)', default=0)
+    content_type = models.CharField('Tipo', max_length=100, blank=True)
+    width = models.IntegerField('Largura', null=True, blank=True)
+    height = models.IntegerField('Altura', null=True, blank=True)
+    duration = models.FloatField('Duração (s)', null=True, blank=True)
+
+    # Resized variants point at the original they were generated from
+    source = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='derivatives')
+    variant = models.CharField('Variante', max_length=50, blank=True)
+
+    ref_count = models.IntegerField('Referências', default=0)
+
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Arquivo de Mídia'
+        verbose_name_plural = 'Arquivos de Mídia'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at'], name='mediablob_orphan_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def url(self):
+        from .storage import media_storage
+        return media_storage.url(self.name)
+
+
+class ImageJob(models.Model):
+    """Background generation of resized variants for an uploaded image"""
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('processing', 'Processando'),
+        ('done', 'Concluído'),
+        ('failed', 'Falhou'),
+    ]
+
+    blob = models.ForeignKey(MediaBlob, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField('Erro', blank=True)
+
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    started_at = models.DateTimeField('Iniciado em', null=True, blank=True)
+    finished_at = models.DateTimeField('Finalizado em', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Processamento de Imagem'
+        verbose_name_plural = 'Processamentos de Imagem'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.blob.name} ({self.get_status_display()})"
+
+    def get_variants(self):
+        """Variant map ({preset: {width, height, <ext>: url}}) for a finished job"""
+        from .utils import media_variants
+        return media_variants([self.blob.name]).get(self.blob.name, {})
+
+
+class VideoJob(models.Model):
+    """Background transcoding and poster extraction for an uploaded video"""
+    STATUS_CHOICES = ImageJob.STATUS_CHOICES
+
+    blob = models.ForeignKey(MediaBlob, on_delete=models.CASCADE, related_name='video_jobs')
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField('Erro', blank=True)
+
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    started_at = models.DateTimeField('Iniciado em', null=True, blank=True)
+    finished_at = models.DateTimeField('Finalizado em', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Processamento de Vídeo'
+        verbose_name_plural = 'Processamentos de Vídeo'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.blob.name} ({self.get_status_display()})"
+
+    def get_video(self):
+        """Poster, duration and renditions for a finished job"""
+        from .utils import media_videos
+        return media_videos([self.blob.name]).get(self.blob.name, {})
+
+
+class UploadSession(models.Model):
+    """
+    A resumable (tus-style) upload: the file is sent in chunks appended at
+    `offset` to a part file on disk, then finalized into the media storage
+    """
+    TARGET_CHOICES = [
+        ('file', 'Arquivo'),
+        ('gallery', 'Galeria'),
+        ('creative', 'Criativo'),
+    ]
+    STATUS_CHOICES = [
+        ('uploading', 'Enviando'),
+        ('complete', 'Concluído'),
+        ('failed', 'Falhou'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    target = models.CharField('Destino', max_length=20, choices=TARGET_CHOICES, default='file')
+    filename = models.CharField('Nome do Arquivo', max_length=255)
+    content_type = models.CharField('Tipo', max_length=100)
+    size = models.BigIntegerField('Tamanho (bytes)')
+    offset = models.BigIntegerField('Recebido (bytes)', default=0)
+    checksum = models.CharField('SHA-256 esperado', max_length=64, blank=True)
+    metadata = models.JSONField('Metadados', default=dict, blank=True,
+                                help_text='Dados do destino (ex: campaign_id, city_id, title)')
+
+    status = models.CharField('Status', max_length=20, choices=STATUS_CHOICES, default='uploading')
+    error = models.TextField('Erro', blank=True)
+    blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='upload_sessions')
+    result = models.JSONField('Resultado', default=dict, blank=True)
+
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Upload Resumível'
+        verbose_name_plural = 'Uploads Resumíveis'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='uploadsession_stale_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def part_path(self):
+        """Where received chunks are appended"""
+        return os.path.join(str(settings.UPLOAD_SESSION_ROOT), f'{self.id}.part')
+
+    def delete_part(self):
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
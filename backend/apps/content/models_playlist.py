@@ -4,6 +4,7 @@ Playlist/Programming Models for Digital Signage
 from django.db import models
 from apps.tenants.models import City
 from apps.totems.models import Totem
+from .storage import get_media_storage
 
 
 class Playlist(models.Model):
@@ -36,7 +37,11 @@ class Playlist(models.Model):
         return f"{self.name} ({self.city.name})"
     
     def get_total_duration(self):
-        return sum(item.duration for item in self.items.filter(is_active=True))
+        # Items prefetched for the serializer already hold everything we need
+        items = getattr(self, '_prefetched_objects_cache', {}).get('items')
+        if items is not None:
+            return sum(item.duration for item in items if item.is_active)
+        return self.items.filter(is_active=True).aggregate(total=models.Sum('duration'))['total'] or 0
 
 
 class PlaylistItem(models.Model):
@@ -56,7 +61,7 @@ class PlaylistItem(models.Model):
     item_type = models.CharField('Tipo', max_length=20, choices=ITEM_TYPES)
     name = models.CharField('Nome', max_length=200)
     
-    image = models.ImageField('Imagem', upload_to='playlist/', null=True, blank=True)
+    image = models.ImageField('Imagem', upload_to='playlist/', storage=get_media_storage, null=True, blank=True)
     video_url = models.URLField('URL do Vídeo', blank=True)
     content_url = models.URLField('URL do Conteúdo', blank=True)
     html_content = models.TextField('Conteúdo HTML', blank=True)
@@ -86,6 +91,13 @@ class RSSFeed(models.Model):
     last_fetched = models.DateTimeField(null=True, blank=True)
     cached_content = models.JSONField(default=list)
     is_active = models.BooleanField(default=True)
+
+    # Fetcher state (conditional requests and backoff)
+    etag = models.CharField('ETag', max_length=255, blank=True)
+    last_modified = models.CharField('Last-Modified', max_length=100, blank=True)
+    next_fetch_at = models.DateTimeField('Próxima Atualização', null=True, blank=True, db_index=True)
+    error_count = models.IntegerField('Falhas Seguidas', default=0)
+    last_error = models.TextField('Último Erro', blank=True)
     
     class Meta:
         verbose_name = 'Feed RSS'
@@ -0,0 +1,203 @@
+"""
+Lightweight read serializers for the hot totem feeds
+
+The event, POI and creative lists are read far more often than they are
+written. Instead of model instances and DRF fields, these serializers
+build each item straight from a values() row (related names come from the
+same query's join), with choice labels, the timezone and media URL
+prefixes resolved once per request. The output is the same, key for key
+and byte for byte, as the ModelSerializers they stand in for, which keep
+handling writes and single-object reads.
+"""
+import decimal
+
+import orjson
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer output (compact, UTF-8, U+2028/U+2029 escaped) encoded
+    with orjson. Anything orjson can't encode natively goes through DRF's
+    encoder; unsupported payloads (e.g. integers over 64 bits) fall back
+    to JSONRenderer. Floats that need an exponent are written 1e16 instead
+    of 1e+16; none of the API payloads carry such values.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def __init__(self):
+        self._default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self._default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ValuesSerializer:
+    """
+    Base of the read serializers: subclasses list the values() lookups they
+    need in `values_fields` and build one dict per row in `to_representation`,
+    using the helpers below to format values exactly like DRF does.
+    """
+    model = None
+    values_fields = ()
+
+    def __init__(self, request=None):
+        self.request = request
+        self.timezone = timezone.get_current_timezone()
+        self._url_prefixes = {}
+
+    def values(self, queryset):
+        return queryset.values(*self.values_fields)
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+    def to_representation(self, row):
+        raise NotImplementedError
+
+    # DRF-compatible formatting
+
+    def datetime(self, value):
+        """serializers.DateTimeField: current timezone, ISO 8601, Z for UTC"""
+        if not value:
+            return None
+        value = value.astimezone(self.timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    @staticmethod
+    def decimal_formatter(field_name, model):
+        """serializers.DecimalField (coerced to string) for a model field"""
+        field = model._meta.get_field(field_name)
+        exponent = decimal.Decimal('.1') ** field.decimal_places
+        context = decimal.getcontext().copy()
+        context.prec = field.max_digits
+        rounding = context.rounding
+
+        def format_decimal(value):
+            if value is None:
+                return None
+            return '{:f}'.format(value.quantize(exponent, rounding=rounding, context=context))
+        return format_decimal
+
+    @staticmethod
+    def choice_labels(field_name, model):
+        return {value: str(label) for value, label in model._meta.get_field(field_name).flatchoices}
+
+    def file_url(self, field_name, name, absolute=True):
+        """serializers.FileField/ImageField URL of a stored file name"""
+        if not name:
+            return None
+        key = (field_name, absolute)
+        prefix = self._url_prefixes.get(key)
+        if prefix is None:
+            storage = self.model._meta.get_field(field_name).storage
+            if not isinstance(storage, FileSystemStorage):
+                url = storage.url(name)
+                return self.request.build_absolute_uri(url) if absolute and self.request else url
+            prefix = storage.base_url
+            if absolute and self.request is not None:
+                prefix = self.request.build_absolute_uri(prefix)
+            self._url_prefixes[key] = prefix
+        return prefix + filepath_to_uri(name).lstrip('/')
+
+
+class EventReadSerializer(ValuesSerializer):
+    """Same output as EventSerializer"""
+    values_fields = (
+        'id', 'city_id', 'category_id', 'category__name',
+        'title', 'description', 'image',
+        'venue', 'address', 'latitude', 'longitude',
+        'start_date', 'end_date', 'is_all_day',
+        'price', 'url',
+        'is_featured', 'is_published',
+        'created_at', 'updated_at',
+    )
+
+    def __init__(self, request=None):
+        from .models import Event
+        self.model = Event
+        super().__init__(request)
+        self.coordinate = self.decimal_formatter('latitude', Event)
+
+    def to_representation(self, row):
+        data = {'id': row['id'], 'city': row['city_id'], 'category': row['category_id']}
+        if row['category__name'] is not None:
+            data['category_name'] = row['category__name']
+        data.update({
+            'title': row['title'],
+            'description': row['description'],
+            'image': self.file_url('image', row['image']),
+            'venue': row['venue'],
+            'address': row['address'],
+            'latitude': self.coordinate(row['latitude']),
+            'longitude': self.coordinate(row['longitude']),
+            'start_date': self.datetime(row['start_date']),
+            'end_date': self.datetime(row['end_date']),
+            'is_all_day': row['is_all_day'],
+            'price': row['price'],
+            'url': row['url'],
+            'is_featured': row['is_featured'],
+            'is_published': row['is_published'],
+            'created_at': self.datetime(row['created_at']),
+            'updated_at': self.datetime(row['updated_at']),
+        })
+        return data
+
+
+class PointOfInterestReadSerializer(ValuesSerializer):
+    """Same output as PointOfInterestSerializer"""
+    values_fields = (
+        'id', 'city_id', 'category_id', 'category__name',
+        'name', 'poi_type', 'description', 'image',
+        'address', 'neighborhood', 'latitude', 'longitude',
+        'phone', 'website', 'opening_hours',
+        'is_featured', 'is_active',
+        'created_at', 'updated_at',
+    )
+
+    def __init__(self, request=None):
+        from .models import PointOfInterest
+        self.model = PointOfInterest
+        super().__init__(request)
+        self.coordinate = self.decimal_formatter('latitude', PointOfInterest)
+        self.poi_types = self.choice_labels('poi_type', PointOfInterest)
+
+    def to_representation(self, row):
+        data = {'id': row['id'], 'city': row['city_id'], 'category': row['category_id']}
+        if row['category__name'] is not None:
+            data['category_name'] = row['category__name']
+        data.update({
+            'name': row['name'],
+            'poi_type': row['poi_type'],
+            'poi_type_display': self.poi_types.get(row['poi_type'], row['poi_type']),
+            'description': row['description'],
+            'image': self.file_url('image', row['image']),
+            'address': row['address'],
+            'neighborhood': row['neighborhood'],
+            'latitude': self.coordinate(row['latitude']),
+            'longitude': self.coordinate(row['longitude']),
+            'phone': row['phone'],
+            'website': row['website'],
+            'opening_hours': row['opening_hours'],
+            'is_featured': row['is_featured'],
+            'is_active': row['is_active'],
+            'created_at': self.datetime(row['created_at']),
+            'updated_at': self.datetime(row['updated_at']),
+        })
+        return data
@@ -0,0 +1,212 @@
+"""
+Dynamic playlist items
+
+Weather, news, events, RSS and clock items have no stored content: the
+backend renders them into ready-to-display payloads per city. Payloads are
+cached with a TTL per item type and shared by every totem of the city;
+once a payload goes stale the cached copy keeps being served while a Celery
+task renders the fresh one.
+"""
+import logging
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# item_type -> Renderer
+RENDERERS = {}
+
+# Stale payloads are kept this many TTLs so they can be served while refreshing
+STALE_FACTOR = 6
+
+# How long a request waits for another worker that is rendering the same payload
+RENDER_WAIT = 2.0
+
+
+class Renderer:
+    def __init__(self, item_type, func, ttl):
+        self.item_type = item_type
+        self.func = func
+        self.ttl = ttl
+
+    def render(self, city, param=''):
+        return self.func(city, param)
+
+
+def register(item_type, ttl):
+    """Register a function(city, param) -> payload as the renderer of an item type"""
+    def decorator(func):
+        RENDERERS[item_type] = Renderer(item_type, func, ttl)
+        return func
+    return decorator
+
+
+def item_param(item):
+    """Per-item parameter of a renderer (the feed URL of RSS items)"""
+    return item.content_url if item.item_type == 'rss' else ''
+
+
+def cache_key(item_type, city_id, param=''):
+    from hashlib import md5
+    suffix = md5(param.encode()).hexdigest()[:12] if param else ''
+    return f'dynamic_content:{item_type}:{city_id}:{suffix}'
+
+
+def render_payload(item_type, city_id, param=''):
+    """Render and cache one payload; returns the cache entry"""
+    from apps.tenants.models import City
+
+    renderer = RENDERERS[item_type]
+    city = City.objects.get(id=city_id)
+    entry = {
+        'payload': renderer.render(city, param),
+        'rendered_at': time.time(),
+    }
+    cache.set(cache_key(item_type, city_id, param), entry, renderer.ttl * STALE_FACTOR)
+    return entry
+
+
+def _queue_refresh(item_type, city_id, param):
+    """Queue one background render per stale payload (others just serve it)"""
+    from .tasks import refresh_dynamic_content
+
+    key = cache_key(item_type, city_id, param)
+    if cache.add(f'{key}:refreshing', 1, RENDERERS[item_type].ttl):
+        # In the request path: fail fast instead of retrying the publish, and
+        # nobody waits for the result
+        try:
+            refresh_dynamic_content.apply_async((item_type, city_id, param), retry=False, ignore_result=True)
+        except Exception:
+            # Broker down: the stale copy is served; the flag is kept so the
+            # other requests of this TTL don't try again
+            logger.warning('Could not queue refresh of %s for city %s', item_type, city_id, exc_info=True)
+
+
+def _render_once(item_type, city_id, param):
+    """Cold cache: render under a lock so concurrent requests compute it once"""
+    key = cache_key(item_type, city_id, param)
+    if cache.add(f'{key}:rendering', 1, 30):
+        try:
+            return render_payload(item_type, city_id, param)
+        finally:
+            cache.delete(f'{key}:rendering')
+
+    deadline = time.monotonic() + RENDER_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return render_payload(item_type, city_id, param)
+
+
+def get_payloads(city_id, requests):
+    """
+    Payloads for a set of (item_type, param) pairs of one city, fetched from
+    the cache in one round trip
+
+    Returns:
+        Dict of (item_type, param) -> payload
+    """
+    requests = {r for r in requests if r[0] in RENDERERS}
+    if not requests or not city_id:
+        return {}
+
+    keys = {cache_key(item_type, city_id, param): (item_type, param) for item_type, param in requests}
+    entries = cache.get_many(list(keys))
+    payloads = {}
+    now = time.time()
+    for key, (item_type, param) in keys.items():
+        entry = entries.get(key)
+        if entry is None:
+            try:
+                entry = _render_once(item_type, city_id, param)
+            except Exception:
+                logger.exception('Failed to render %s for city %s', item_type, city_id)
+                payloads[(item_type, param)] = None
+                continue
+        elif now - entry['rendered_at'] > RENDERERS[item_type].ttl:
+            _queue_refresh(item_type, city_id, param)
+        payloads[(item_type, param)] = entry['payload']
+    return payloads
+
+
+def embed_payloads(city_id, items):
+    """Add the rendered payload as `data` to serialized playlist items"""
+    wanted = {}
+    for item in items:
+        if item['item_type'] in RENDERERS:
+            param = item['content_url'] if item['item_type'] == 'rss' else ''
+            wanted[item['id']] = (item['item_type'], param)
+
+    payloads = get_payloads(city_id, set(wanted.values()))
+    for item in items:
+        item['data'] = payloads.get(wanted.get(item['id']))
+    return items
+
+
+# ============================================
+# Renderers
+# ============================================
+
+@register('weather', ttl=10 * 60)
+def render_weather(city, param=''):
+    from apps.weather.models import WeatherService
+    return WeatherService().get_current(city)
+
+
+@register('news', ttl=5 * 60)
+def render_news(city, param='', limit=5):
+    from .models import News
+    from .serializers import NewsSerializer
+    from .visibility import visible_q
+
+    # Same window as the news list endpoint
+    news = News.objects.filter(visible_q('news'), city=city).select_related(
+        'category'
+    ).order_by('-is_featured', '-publish_at')[:limit]
+    return NewsSerializer(news, many=True).data
+
+
+@register('events', ttl=5 * 60)
+def render_events(city, param='', limit=10):
+    from .models import Event
+    from .serializers import EventSerializer
+    from .visibility import visible_q
+
+    # Same window as the events list endpoint (open-ended events included)
+    events = Event.objects.filter(visible_q('event'), city=city).select_related(
+        'category'
+    ).order_by('start_date')[:limit]
+    return EventSerializer(events, many=True).data
+
+
+@register('rss', ttl=5 * 60)
+def render_rss(city, param='', limit=10):
+    """Items already fetched into RSSFeed.cached_content (never fetches)"""
+    from .models_playlist import RSSFeed
+
+    feeds = RSSFeed.objects.filter(city=city, is_active=True)
+    if param:
+        feeds = feeds.filter(url=param)
+
+    items = []
+    for feed in feeds:
+        for entry in feed.cached_content or []:
+            items.append({**entry, 'feed': feed.name})
+    items.sort(key=lambda entry: entry.get('published') or '', reverse=True)
+    return items[:limit]
+
+
+@register('clock', ttl=60 * 60)
+def render_clock(city, param=''):
+    tz = ZoneInfo(city.timezone)
+    offset = datetime.now(tz).utcoffset()
+    return {
+        'timezone': city.timezone,
+        'utc_offset': int(offset.total_seconds()) if offset else 0,
+        'city': city.name,
+    }
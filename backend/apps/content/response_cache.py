@@ -0,0 +1,137 @@
+"""
+Tenant-aware response cache for the content endpoints
+
+GET responses of the category/news/event/gallery/POI viewsets are stored as
+the rendered JSON bytes, keyed by (city, viewset, action, normalized query
+params), so a hit skips the queries and DRF serialization entirely. Every
+city has its own generation number embedded in its keys: a content change
+bumps the generation of that city (and of the city-less "all" shard), which
+orphans exactly that city's entries. City-less content (a global category,
+whose name is embedded in every city's news and events) bumps a global
+generation that is part of every key instead. Hits and misses are counted
+per endpoint.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+GENERATION_KEY = 'response_cache:generation:{}'
+STATS_KEY = 'response_cache:stats:{}:{}'
+STATS_INDEX_KEY = 'response_cache:stats:endpoints'
+
+GLOBAL_SHARD = 'global'
+
+# Query params that never change the response
+IGNORED_PARAMS = {'_', 'timestamp'}
+
+
+def _shard(city_id):
+    return str(city_id) if city_id else 'all'
+
+
+def generation(city_id):
+    """Generation part of a city's keys: the global one and the city's own"""
+    keys = [GENERATION_KEY.format(GLOBAL_SHARD), GENERATION_KEY.format(_shard(city_id))]
+    values = cache.get_many(keys)
+    return '.'.join(str(values.get(key) or cache.get_or_set(key, 1, None)) for key in keys)
+
+
+def _bump(shard):
+    try:
+        cache.incr(GENERATION_KEY.format(shard))
+    except ValueError:
+        cache.set(GENERATION_KEY.format(shard), 2, None)
+
+
+def invalidate_city(city_id):
+    """Orphan every cached response of a city (and of the city-less shard)"""
+    for shard in {_shard(city_id), 'all'}:
+        _bump(shard)
+
+
+def invalidate_content(city_id):
+    """
+    Orphan the responses a content row of city_id can appear in: a
+    city-less row (a global category) shows up in every city's responses
+    """
+    if city_id:
+        invalidate_city(city_id)
+    else:
+        _bump(GLOBAL_SHARD)
+
+
+def invalidate_cities(city_ids):
+    """invalidate_content() for the cities of some content rows"""
+    for city_id in set(city_ids):
+        invalidate_content(city_id)
+
+
+def normalize_params(query_params, extra=None):
+    """Query params (and extra key parts) in a stable order, as a string"""
+    items = []
+    for name in sorted(query_params.keys()):
+        if name in IGNORED_PARAMS:
+            continue
+        items.append((name, sorted(query_params.getlist(name))))
+    if extra:
+        items.extend(sorted((f'@{name}', value) for name, value in extra.items()))
+    return json.dumps(items, separators=(',', ':'))
+
+
+def cache_key(city_id, endpoint, params):
+    digest = hashlib.md5(params.encode()).hexdigest()
+    return f'response_cache:{_shard(city_id)}:{generation(city_id)}:{endpoint}:{digest}'
+
+
+def get(key):
+    """Cached (content, content_type) or None"""
+    return cache.get(key)
+
+
+def store(key, response):
+    cache.set(key, (response.content, response['Content-Type']), settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def as_response(entry):
+    content, content_type = entry
+    response = HttpResponse(content, content_type=content_type)
+    response['Vary'] = 'Accept'
+    return response
+
+
+def record(endpoint, hit):
+    key = STATS_KEY.format(endpoint, 'hit' if hit else 'miss')
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+        endpoints = cache.get(STATS_INDEX_KEY) or set()
+        if endpoint not in endpoints:
+            cache.set(STATS_INDEX_KEY, endpoints | {endpoint}, None)
+
+
+def stats():
+    """{endpoint: {'hits', 'misses', 'hit_rate'}} since the counters were reset"""
+    endpoints = sorted(cache.get(STATS_INDEX_KEY) or ())
+    keys = [STATS_KEY.format(endpoint, kind) for endpoint in endpoints for kind in ('hit', 'miss')]
+    values = cache.get_many(keys)
+    result = {}
+    for endpoint in endpoints:
+        hits = values.get(STATS_KEY.format(endpoint, 'hit'), 0)
+        misses = values.get(STATS_KEY.format(endpoint, 'miss'), 0)
+        total = hits + misses
+        result[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None,
+        }
+    return result
+
+
+def reset_stats():
+    endpoints = cache.get(STATS_INDEX_KEY) or ()
+    cache.delete_many([STATS_KEY.format(e, kind) for e in endpoints for kind in ('hit', 'miss')])
+    cache.delete(STATS_INDEX_KEY)
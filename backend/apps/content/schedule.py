@@ -0,0 +1,173 @@
+"""
+Playlist schedule resolver
+
+A city's playlists are compiled once into a weekly timeline per totem:
+contiguous segments of the week (in seconds since Monday 00:00, in the
+city's local time), each with the playlist that wins there. Resolving the
+current playlist is then a bisect on the segment starts, and the next
+segment start is when the programming changes.
+
+Timelines are cached and dropped (by bumping a version) whenever a
+playlist, its items or its totems change.
+"""
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+DAY = 24 * 60 * 60
+WEEK = 7 * DAY
+
+CACHE_VERSION_KEY = 'playlist_schedule:version'
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def playlist_windows(playlist):
+    """
+    Weekly windows [start, end) in seconds where the playlist is scheduled.
+    Windows crossing midnight (start_time > end_time) run into the next day.
+    """
+    days = range(7)
+    if playlist['weekdays']:
+        days = sorted({int(day) for day in playlist['weekdays'] if str(day).isdigit() and 0 <= int(day) <= 6})
+
+    if not (playlist['start_time'] and playlist['end_time']):
+        return [(day * DAY, (day + 1) * DAY) for day in days]
+
+    start, end = _seconds(playlist['start_time']), _seconds(playlist['end_time'])
+    windows = []
+    for day in days:
+        if start < end:
+            windows.append((day * DAY + start, day * DAY + end))
+        elif start > end:
+            windows.append((day * DAY + start, (day + 1) * DAY))
+            # The part after midnight belongs to the next weekday (Sunday wraps to Monday)
+            next_day = (day + 1) % 7
+            windows.append((next_day * DAY, next_day * DAY + end))
+    return windows
+
+
+def compile_timeline(playlists, default_id=None):
+    """
+    Turn playlists (dicts with id/weekdays/start_time/end_time, best
+    priority first) into (starts, playlist_ids): contiguous segments
+    covering the whole week. Gaps fall back to the default playlist (or None).
+    """
+    windows = []
+    for rank, playlist in enumerate(playlists):
+        for start, end in playlist_windows(playlist):
+            windows.append((start, end, rank, playlist['id']))
+
+    boundaries = sorted({0, WEEK} | {w[0] for w in windows} | {w[1] for w in windows})
+    starts, playlist_ids = [], []
+    for start, end in zip(boundaries, boundaries[1:]):
+        covering = [w for w in windows if w[0] <= start and end <= w[1]]
+        winner = min(covering, key=lambda w: w[2])[3] if covering else default_id
+        if playlist_ids and playlist_ids[-1] == winner:
+            continue  # same playlist keeps playing, not a transition
+        starts.append(start)
+        playlist_ids.append(winner)
+    return starts, playlist_ids
+
+
+def resolve(timeline, week_seconds):
+    """
+    Playlist id at `week_seconds` and seconds until the next transition
+    (None when the same playlist runs all week)
+    """
+    starts, playlist_ids = timeline
+    index = bisect_right(starts, week_seconds) - 1
+    if len(starts) == 1:
+        return playlist_ids[0], None
+    if index + 1 < len(starts):
+        return playlist_ids[index], starts[index + 1] - week_seconds
+    # Last segment: the week wraps around to the first one
+    if playlist_ids[0] == playlist_ids[-1]:
+        return playlist_ids[index], WEEK - week_seconds + starts[1]
+    return playlist_ids[index], WEEK - week_seconds
+
+
+def build_timeline(city_id, totem_id=None):
+    """Compile the timeline of a city (or of every city) for a totem"""
+    from .models_playlist import Playlist
+
+    playlists = Playlist.objects.filter(is_active=True)
+    if city_id:
+        playlists = playlists.filter(city_id=city_id)
+    playlists = list(playlists.order_by('-priority', 'name', 'id').values(
+        'id', 'weekdays', 'start_time', 'end_time', 'all_totems', 'is_default'
+    ))
+
+    # Playlists restricted to some totems only apply to those totems
+    if totem_id:
+        restricted = [p['id'] for p in playlists if not p['all_totems']]
+        assigned = set(
+            Playlist.totems.through.objects
+            .filter(playlist_id__in=restricted, totem_id=totem_id)
+            .values_list('playlist_id', flat=True)
+        ) if restricted else set()
+        candidates = [p for p in playlists if p['all_totems'] or p['id'] in assigned]
+    else:
+        candidates = playlists
+
+    default_id = next((p['id'] for p in playlists if p['is_default']), None)
+    return compile_timeline(candidates, default_id)
+
+
+def get_timeline(city_id, totem_id=None):
+    """Cached build_timeline"""
+    version = cache.get_or_set(CACHE_VERSION_KEY, 1, None)
+    key = f'playlist_schedule:{version}:{city_id or "all"}:{totem_id or "any"}'
+    timeline = cache.get(key)
+    if timeline is None:
+        timeline = build_timeline(city_id, totem_id)
+        cache.set(key, timeline, CACHE_TIMEOUT)
+    return timeline
+
+
+def invalidate_schedules():
+    """Drop every compiled timeline (playlists rarely change)"""
+    try:
+        cache.incr(CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(CACHE_VERSION_KEY, 2, None)
+
+
+def city_timezone(city_id):
+    from apps.tenants.models import City
+
+    name = None
+    if city_id:
+        name = City.objects.filter(id=city_id).values_list('timezone', flat=True).first()
+    try:
+        return ZoneInfo(name or settings.TIME_ZONE)
+    except (ValueError, KeyError):
+        return ZoneInfo(settings.TIME_ZONE)
+
+
+def current_playlist(city_id, totem_id=None, now=None):
+    """
+    Resolve the playlist playing now for a city/totem
+
+    Returns:
+        Tuple of (playlist_id or None, next transition as an aware datetime or None)
+    """
+    local_now = (now or timezone.now()).astimezone(city_timezone(city_id))
+    week_start = datetime.combine(
+        local_now.date() - timedelta(days=local_now.weekday()), datetime.min.time()
+    )
+    week_seconds = int((local_now.replace(tzinfo=None) - week_start).total_seconds())
+
+    playlist_id, remaining = resolve(get_timeline(city_id, totem_id), week_seconds)
+    next_transition = None
+    if remaining is not None:
+        naive = local_now.replace(tzinfo=None, microsecond=0) + timedelta(seconds=remaining)
+        next_transition = naive.replace(tzinfo=local_now.tzinfo)
+    return playlist_id, next_transition
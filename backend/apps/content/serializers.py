@@ -1,9 +1,95 @@
 """Content Serializers"""
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Category, News, Event, GalleryImage, PointOfInterest
+from .utils import media_variants, media_videos, build_srcset, pick_variant, ORIENTATION_BOXES
 from apps.tenants.models import City
 
 
+class MediaVariantsListSerializer(serializers.ListSerializer):
+    """Loads the resized variants (and video renditions) of every row in one query each"""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        field_name = getattr(self.child.Meta, 'variants_source', None)
+        if field_name:
+            self.child._media_variants = media_variants(
+                [getattr(item, field_name).name for item in items]
+            )
+        field_name = getattr(self.child.Meta, 'videos_source', None)
+        if field_name:
+            self.child._media_videos = media_videos(
+                [getattr(item, field_name).name for item in items]
+            )
+        return super().to_representation(items)
+
+
+class MediaVariantsMixin:
+    """
+    Responsive image fields for the image field named in Meta.variants_source:
+
+    - variants: {preset: {width, height, avif/webp/jpg: url}}
+    - srcset: {format: "url 150w, url 960w, ..."}
+    - best: the smallest variant that fills the requesting totem's screen
+      (orientation from ?orientation=, ?totem_id= or the X-Totem-ID header)
+    """
+
+    def _variants_for(self, obj):
+        name = getattr(obj, self.Meta.variants_source).name
+        if not name:
+            return {}
+        cached = getattr(self, '_media_variants', None)
+        if cached is None:
+            # Single object: variants, srcset and best share one lookup
+            if not hasattr(self, '_object_variants'):
+                self._object_variants = {}
+            cached = self._object_variants
+            if name not in cached:
+                cached[name] = media_variants([name]).get(name, {})
+        return cached.get(name, {})
+
+    def _screen_box(self):
+        if not hasattr(self, '_cached_screen_box'):
+            request = self.context.get('request')
+            orientation = None
+            if request is not None:
+                orientation = request.query_params.get('orientation')
+                totem_id = request.query_params.get('totem_id') or request.headers.get('X-Totem-ID')
+                if not orientation and totem_id and str(totem_id).isdigit():
+                    from apps.totems.models import Totem
+                    orientation = Totem.objects.filter(id=totem_id).values_list(
+                        'screen_orientation', flat=True
+                    ).first()
+            self._cached_screen_box = ORIENTATION_BOXES.get(orientation or 'portrait', ORIENTATION_BOXES['portrait'])
+        return self._cached_screen_box
+
+    def get_variants(self, obj):
+        return self._variants_for(obj)
+
+    def get_srcset(self, obj):
+        return build_srcset(self._variants_for(obj))
+
+    def get_best(self, obj):
+        return pick_variant(self._variants_for(obj), self._screen_box())
+
+
+class MediaVideoMixin:
+    """
+    get_video for the file field named in Meta.videos_source:
+    {duration, poster, renditions: {profile: {width, height, url}}}, or None
+    until the video has been processed
+    """
+
+    def get_video(self, obj):
+        name = getattr(obj, self.Meta.videos_source).name
+        if not name:
+            return None
+        cached = getattr(self, '_media_videos', None)
+        if cached is None:
+            cached = media_videos([name])
+        return cached.get(name)
+
+
 class CategorySerializer(serializers.ModelSerializer):
     city = serializers.PrimaryKeyRelatedField(queryset=City.objects.all(), required=False)
 
@@ -61,16 +147,21 @@ class EventSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class GalleryImageSerializer(serializers.ModelSerializer):
+class GalleryImageSerializer(MediaVariantsMixin, serializers.ModelSerializer):
     city = serializers.PrimaryKeyRelatedField(queryset=City.objects.all(), required=False)
     image = serializers.ImageField(required=False)
+    variants = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+    best = serializers.SerializerMethodField()
 
     class Meta:
         model = GalleryImage
         fields = [
-            'id', 'city', 'title', 'description', 'image',
+            'id', 'city', 'title', 'description', 'image', 'variants', 'srcset', 'best',
             'order', 'is_active', 'display_start', 'display_end', 'created_at'
         ]
+        list_serializer_class = MediaVariantsListSerializer
+        variants_source = 'image'
 
     def create(self, validated_data):
         if 'city' not in validated_data:
@@ -130,6 +221,11 @@ class PlaylistSerializer(serializers.ModelSerializer):
             'items', 'total_duration'
         ]
     
+    @staticmethod
+    def prefetch(queryset):
+        """Load the items of every playlist in one query (used for items and total_duration)"""
+        return queryset.prefetch_related(Prefetch('items', queryset=PlaylistItem.objects.all()))
+
     def get_total_duration(self, obj):
         return obj.get_total_duration()
 
@@ -140,40 +236,56 @@ class RSSFeedSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'url', 'cached_content', 'is_active', 'last_fetched']
 
 
-# Playlist Serializers
-from .models_playlist import Playlist, PlaylistItem, RSSFeed
+# Media Serializers
+from .models_media import ImageJob, VideoJob, UploadSession
+
+class ImageJobSerializer(serializers.ModelSerializer):
+    source_url = serializers.CharField(source='blob.url', read_only=True)
+    variants = serializers.SerializerMethodField()
 
-class PlaylistItemSerializer(serializers.ModelSerializer):
-    item_type_display = serializers.CharField(source='get_item_type_display', read_only=True)
-    
     class Meta:
-        model = PlaylistItem
-        fields = [
-            'id', 'item_type', 'item_type_display', 'name',
-            'image', 'video_url', 'content_url', 'html_content',
-            'duration', 'transition', 'background_color', 'text_color',
-            'order', 'is_active'
-        ]
+        model = ImageJob
+        fields = ['id', 'status', 'error', 'source_url', 'variants', 'created_at', 'started_at', 'finished_at']
 
+    def get_variants(self, obj):
+        return obj.get_variants() if obj.status == 'done' else {}
+
+
+class VideoJobSerializer(serializers.ModelSerializer):
+    source_url = serializers.CharField(source='blob.url', read_only=True)
+    video = serializers.SerializerMethodField()
 
-class PlaylistSerializer(serializers.ModelSerializer):
-    items = PlaylistItemSerializer(many=True, read_only=True)
-    total_duration = serializers.SerializerMethodField()
-    
     class Meta:
-        model = Playlist
-        fields = [
-            'id', 'name', 'description',
-            'start_time', 'end_time', 'weekdays',
-            'is_active', 'is_default', 'priority',
-            'items', 'total_duration'
-        ]
-    
-    def get_total_duration(self, obj):
-        return obj.get_total_duration()
+        model = VideoJob
+        fields = ['id', 'status', 'error', 'source_url', 'video', 'created_at', 'started_at', 'finished_at']
 
+    def get_video(self, obj):
+        return obj.get_video() if obj.status == 'done' else None
 
-class RSSFeedSerializer(serializers.ModelSerializer):
+
+class UploadSessionSerializer(serializers.ModelSerializer):
     class Meta:
-        model = RSSFeed
-        fields = ['id', 'name', 'url', 'cached_content', 'is_active', 'last_fetched']
+        model = UploadSession
+        fields = [
+            'id', 'target', 'filename', 'content_type', 'size', 'offset', 'checksum',
+            'metadata', 'status', 'error', 'result', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'offset', 'status', 'error', 'result', 'created_at', 'updated_at']
+
+    def validate_checksum(self, value):
+        value = value.lower()
+        if value and (len(value) != 64 or any(c not in '0123456789abcdef' for c in value)):
+            raise serializers.ValidationError('Informe o SHA-256 em hexadecimal')
+        return value
+
+    def validate(self, attrs):
+        allowed_types, max_size = self.context['target_limits'][attrs.get('target', 'file')]
+        if attrs['content_type'] not in allowed_types:
+            raise serializers.ValidationError({'content_type': f"Tipo de arquivo não permitido: {attrs['content_type']}"})
+        if attrs['size'] <= 0:
+            raise serializers.ValidationError({'size': 'Tamanho inválido'})
+        if attrs['size'] > max_size:
+            raise serializers.ValidationError({'size': f'Arquivo muito grande. Máximo: {max_size // (1024 * 1024)}MB'})
+        if attrs.get('target') == 'gallery' and not (attrs.get('metadata') or {}).get('city_id'):
+            raise serializers.ValidationError({'metadata': 'city_id é obrigatório'})
+        return attrs
@@ -0,0 +1,114 @@
+"""
+Content Signals - keep MediaBlob rows and reference counts in sync with the
+models that point at content-addressed files, and drop cached playlist
+schedules, visible-content sets and API responses when their sources change
+"""
+from django.db import models, transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+
+from .storage import is_content_addressed, media_storage, reference_models, refresh_ref_counts
+
+
+def _media_names(instance, field_names):
+    return {getattr(instance, name).name for name in field_names if getattr(instance, name)}
+
+
+def _sync_media(current, image_names, previous):
+    """Register new files, queue image variants/transcoding and recount references"""
+    from .tasks import queue_image_variants, queue_video_variants
+    from .utils import register_blob
+
+    for name in current - image_names:
+        if is_content_addressed(name) and media_storage.exists(name):
+            register_blob(name)
+    queue_image_variants(image_names)
+    queue_video_variants(current - image_names)
+    refresh_ref_counts(current | previous)
+
+
+def _connect(model, field_names):
+    image_fields = [
+        name for name in field_names
+        if isinstance(model._meta.get_field(name), models.ImageField)
+    ]
+
+    def remember_previous(sender, instance, **kwargs):
+        previous = set()
+        if instance.pk:
+            row = sender._default_manager.filter(pk=instance.pk).values(*field_names).first()
+            if row:
+                previous = {value for value in row.values() if value}
+        instance._previous_media_names = previous
+
+    def on_save(sender, instance, **kwargs):
+        # Files saved through the field (admin, serializers) get their blob
+        # registered here; upload views register theirs before saving
+        current = _media_names(instance, field_names)
+        previous = getattr(instance, '_previous_media_names', set())
+        if current or previous:
+            image_names = _media_names(instance, image_fields)
+            transaction.on_commit(lambda: _sync_media(current, image_names, previous))
+
+    def on_delete(sender, instance, **kwargs):
+        names = _media_names(instance, field_names)
+        if names:
+            transaction.on_commit(lambda: refresh_ref_counts(names))
+
+    uid = f'media_refcount_{model._meta.label_lower}'
+    pre_save.connect(remember_previous, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(on_save, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=uid)
+
+
+def connect_media_signals():
+    fields_by_model = {}
+    for model, field_name in reference_models():
+        fields_by_model.setdefault(model, []).append(field_name)
+    for model, field_names in fields_by_model.items():
+        _connect(model, field_names)
+
+
+def _invalidate_schedules(sender, **kwargs):
+    from .schedule import invalidate_schedules
+    transaction.on_commit(invalidate_schedules)
+
+
+def connect_schedule_signals():
+    from .models_playlist import Playlist, PlaylistItem
+
+    for model in (Playlist, PlaylistItem):
+        uid = f'playlist_schedule_{model._meta.label_lower}'
+        post_save.connect(_invalidate_schedules, sender=model, dispatch_uid=uid)
+        post_delete.connect(_invalidate_schedules, sender=model, dispatch_uid=uid)
+    m2m_changed.connect(_invalidate_schedules, sender=Playlist.totems.through,
+                        dispatch_uid='playlist_schedule_totems')
+
+
+def _invalidate_visible(sender, instance, **kwargs):
+    from .visibility import invalidate_visible, window_name
+    name, city_id = window_name(sender), instance.city_id
+    transaction.on_commit(lambda: invalidate_visible(name, city_id))
+
+
+def connect_visibility_signals():
+    from .models import News, Event, GalleryImage
+
+    for model in (News, Event, GalleryImage):
+        uid = f'visible_ids_{model._meta.label_lower}'
+        post_save.connect(_invalidate_visible, sender=model, dispatch_uid=uid)
+        post_delete.connect(_invalidate_visible, sender=model, dispatch_uid=uid)
+
+
+def _invalidate_responses(sender, instance, **kwargs):
+    from .response_cache import invalidate_content
+    city_id = instance.city_id
+    transaction.on_commit(lambda: invalidate_content(city_id))
+
+
+def connect_response_cache_signals():
+    from .models import Category, News, Event, GalleryImage, PointOfInterest
+
+    for model in (Category, News, Event, GalleryImage, PointOfInterest):
+        uid = f'response_cache_{model._meta.label_lower}'
+        post_save.connect(_invalidate_responses, sender=model, dispatch_uid=uid)
+        post_delete.connect(_invalidate_responses, sender=model, dispatch_uid=uid)
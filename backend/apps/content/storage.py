@@ -0,0 +1,219 @@
+"""
+Content-addressed media storage
+
+Files are named by the SHA-256 of their bytes, so re-uploading the same
+photo or creative reuses the file already on disk and its URL never changes.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+# Directory (inside MEDIA_ROOT) that holds content-addressed files
+CAS_PREFIX = 'cas'
+
+# Model fields whose files live in the content-addressed storage.
+# Used to count references to each MediaBlob.
+MEDIA_REFERENCE_FIELDS = [
+    ('content.News', 'image'),
+    ('content.Event', 'image'),
+    ('content.GalleryImage', 'image'),
+    ('content.PointOfInterest', 'image'),
+    ('content.PlaylistItem', 'image'),
+    ('advertising.AdCreative', 'file'),
+    ('totems.ContentBlock', 'image'),
+    ('totems.ContentBlock', 'video'),
+]
+
+# Text/URL fields that may embed a media URL (files sent through the generic
+# upload endpoints are only referenced this way)
+MEDIA_TEXT_REFERENCE_FIELDS = [
+    ('content.PlaylistItem', 'video_url'),
+    ('content.PlaylistItem', 'content_url'),
+    ('content.PlaylistItem', 'html_content'),
+    ('totems.ContentBlock', 'link_url'),
+    ('totems.ContentBlock', 'content_html'),
+]
+
+DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+def hash_file(file, chunk_size=64 * 1024):
+    """Return the SHA-256 hex digest of a file, leaving it rewound"""
+    sha = hashlib.sha256()
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    if hasattr(file, 'chunks'):
+        for chunk in file.chunks(chunk_size):
+            sha.update(chunk)
+    else:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            sha.update(chunk)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return sha.hexdigest()
+
+
+def content_name(digest, filename=''):
+    """Build the storage name for a digest, keeping the original extension"""
+    ext = os.path.splitext(filename)[1].lower()
+    return f'{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+def digest_from_name(name):
+    """Extract the SHA-256 digest from a content-addressed name (or None)"""
+    if not name or not is_content_addressed(name):
+        return None
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def is_content_addressed(name):
+    return bool(name) and str(name).startswith(f'{CAS_PREFIX}/')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that ignores the requested name and stores each file
+    under cas/ab/cd/<sha256><ext>. Saving bytes that already exist is a no-op
+    and returns the existing name. A caller that already hashed the bytes
+    passes digest= so they aren't read twice.
+    """
+
+    def save(self, name, content, max_length=None, digest=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if digest is None:
+            digest = hash_file(content)
+        name = content_name(digest, name)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # Same name means same bytes, so never suffix it
+        return name
+
+    def _save(self, name, content):
+        """Write to a temp file and rename, so concurrent saves of the same
+        bytes can't leave a partial file behind"""
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                fd = None
+                content.seek(0)
+                for chunk in content.chunks():
+                    f.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if fd is not None:
+                os.close(fd)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name.replace('\\', '/')
+
+
+media_storage = ContentAddressedStorage()
+
+
+def get_media_storage():
+    """Storage callable for model fields (keeps migrations free of settings)"""
+    return media_storage
+
+
+def reference_models(fields=MEDIA_REFERENCE_FIELDS):
+    """Yield (model, field_name) for every field stored in the CAS"""
+    from django.apps import apps
+    for label, field_name in fields:
+        yield apps.get_model(label), field_name
+
+
+def count_text_references(name):
+    """Count text/URL fields that embed the file's digest"""
+    digest = digest_from_name(name)
+    return sum(
+        model._default_manager.filter(**{f'{field_name}__contains': digest}).count()
+        for model, field_name in reference_models(MEDIA_TEXT_REFERENCE_FIELDS)
+    )
+
+
+def text_reference_counts():
+    """
+    {digest: rows} for every digest embedded in the text fields: what
+    count_text_references() returns for each blob, in one scan per field
+    """
+    counts = Counter()
+    for model, field_name in reference_models(MEDIA_TEXT_REFERENCE_FIELDS):
+        values = (
+            model._default_manager
+            .filter(**{f'{field_name}__contains': f'{CAS_PREFIX}/'})
+            .values_list(field_name, flat=True)
+        )
+        for value in values.iterator():
+            counts.update(set(DIGEST_PATTERN.findall(value)))
+    return counts
+
+
+def count_references(name):
+    """Count model rows pointing at a content-addressed file"""
+    count = sum(
+        model._default_manager.filter(**{field_name: name}).count()
+        for model, field_name in reference_models()
+    )
+    return count or count_text_references(name)
+
+
+def refresh_ref_counts(names=None):
+    """
+    Recompute MediaBlob.ref_count from the referencing models.
+
+    With names, only those blobs are recounted (used by signals). Without,
+    every blob is recounted with one grouped query per referencing field
+    and one scan per text field. Returns the number of blobs updated.
+    """
+    from .models_media import MediaBlob
+
+    if names is not None:
+        updated = 0
+        for name in {n for n in names if is_content_addressed(n)}:
+            updated += MediaBlob.objects.filter(name=name).update(
+                ref_count=count_references(name), updated_at=timezone.now()
+            )
+        return updated
+
+    counts = Counter()
+    for model, field_name in reference_models():
+        rows = (
+            model._default_manager
+            .filter(**{f'{field_name}__startswith': f'{CAS_PREFIX}/'})
+            .values(field_name)
+            .annotate(n=models.Count('pk'))
+        )
+        for row in rows:
+            counts[row[field_name]] += row['n']
+    text_counts = text_reference_counts()
+
+    updated = 0
+    for blob in MediaBlob.objects.only('id', 'name', 'ref_count').iterator():
+        ref_count = counts.get(blob.name) or text_counts.get(digest_from_name(blob.name), 0)
+        if blob.ref_count != ref_count:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=ref_count, updated_at=timezone.now())
+            updated += 1
+    return updated
@@ -0,0 +1,328 @@
+"""
+Content Tasks - background media processing
+"""
+import logging
+import math
+import os
+import tempfile
+
+from celery import shared_task
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models_media import MediaBlob, ImageJob, VideoJob, UploadSession
+from .storage import media_storage, digest_from_name
+from .utils import render_variants
+
+logger = logging.getLogger(__name__)
+
+
+def queue_image_job(blob):
+    """
+    Queue variant generation for an image blob
+
+    A duplicate upload of an image that is already processed (or queued)
+    reuses the existing job instead of starting another one.
+    """
+    job = blob.jobs.exclude(status='failed').order_by('-created_at').first()
+    if job:
+        return job
+
+    job = ImageJob.objects.create(blob=blob)
+    transaction.on_commit(lambda: process_image_job.delay(job.id))
+    return job
+
+
+def queue_image_variants(names):
+    """Register and queue variant generation for images saved through model fields"""
+    from .storage import is_content_addressed
+    from .utils import register_blob
+
+    for name in names:
+        if is_content_addressed(name) and media_storage.exists(name):
+            blob, _ = register_blob(name)
+            queue_image_job(blob)
+
+
+def queue_video_job(blob):
+    """Queue transcoding for a video blob (duplicates reuse the existing job)"""
+    job = blob.video_jobs.exclude(status='failed').order_by('-created_at').first()
+    if job:
+        # Already probed: creatives added since then get the length now
+        if job.status == 'done' and blob.duration:
+            fill_creative_durations(blob)
+        return job
+
+    job = VideoJob.objects.create(blob=blob)
+    transaction.on_commit(lambda: process_video_job.delay(job.id))
+    return job
+
+
+def queue_video_variants(names):
+    """Register and queue transcoding for videos saved through model fields"""
+    import mimetypes
+    from .storage import is_content_addressed
+    from .utils import register_blob
+
+    for name in names:
+        content_type = mimetypes.guess_type(name)[0] or ''
+        if content_type.startswith('video/') and is_content_addressed(name) and media_storage.exists(name):
+            blob, _ = register_blob(name)
+            queue_video_job(blob)
+
+
+def store_variant(source, name, variant_file, size, content_type=None):
+    """Save a generated variant and link it to its source blob"""
+    stored_name = media_storage.save(variant_file.name, variant_file)
+    blob, _ = MediaBlob.objects.update_or_create(
+        sha256=digest_from_name(stored_name),
+        defaults={
+            'name': stored_name,
+            'size': media_storage.size(stored_name),
+            'content_type': content_type or variant_file.content_type,
+            'width': size[0],
+            'height': size[1],
+            'source': source,
+            'variant': name,
+        }
+    )
+    return blob
+
+
+@shared_task(bind=True, acks_late=True, max_retries=2, default_retry_delay=30)
+def process_image_job(self, job_id):
+    """Decode the original once and write all of its resized variants"""
+    try:
+        job = ImageJob.objects.select_related('blob').get(id=job_id)
+    except ImageJob.DoesNotExist:
+        return
+
+    if job.status == 'done':
+        return
+
+    ImageJob.objects.filter(id=job.id).update(status='processing', started_at=timezone.now())
+    blob = job.blob
+
+    try:
+        with media_storage.open(blob.name, 'rb') as original:
+            original_size, variants = render_variants(original)
+
+        for name, (size, files) in variants.items():
+            for ext, variant_file in files.items():
+                store_variant(blob, f'{name}.{ext}', variant_file, size)
+
+        MediaBlob.objects.filter(id=blob.id).update(width=original_size[0], height=original_size[1])
+        ImageJob.objects.filter(id=job.id).update(status='done', error='', finished_at=timezone.now())
+
+        # Gallery responses embed the variants, drop the cached ones
+        from .models import GalleryImage
+        from .response_cache import invalidate_cities
+        invalidate_cities(GalleryImage.objects.filter(image=blob.name).values_list('city_id', flat=True))
+
+    except (OSError, ValueError) as e:
+        # Corrupt or unsupported image - retrying won't help
+        logger.warning('Image job %s failed: %s', job.id, e)
+        ImageJob.objects.filter(id=job.id).update(status='failed', error=str(e), finished_at=timezone.now())
+
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            ImageJob.objects.filter(id=job.id).update(status='failed', error=str(e), finished_at=timezone.now())
+            raise
+        ImageJob.objects.filter(id=job.id).update(status='pending')
+        raise self.retry(exc=e)
+
+
+def fill_creative_durations(blob):
+    """
+    Use the real video length as the display duration of its creatives,
+    except those whose duration was set by hand
+    """
+    from apps.advertising.models import AdCreative
+
+    duration = max(1, math.ceil(blob.duration))
+    AdCreative.objects.filter(file=blob.name, ad_type='video', duration_auto=True).exclude(
+        duration=duration
+    ).update(duration=duration)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=1, default_retry_delay=60)
+def process_video_job(self, job_id):
+    """
+    Probe the video, extract a poster frame and transcode it to the totem
+    playback profiles (see video.VIDEO_PROFILES)
+    """
+    from . import video
+
+    try:
+        job = VideoJob.objects.select_related('blob').get(id=job_id)
+    except VideoJob.DoesNotExist:
+        return
+
+    if job.status == 'done':
+        return
+
+    VideoJob.objects.filter(id=job.id).update(status='processing', started_at=timezone.now())
+    blob = job.blob
+    source = media_storage.path(blob.name)
+
+    try:
+        info = video.probe(source)
+        size = (info['width'], info['height'])
+
+        with tempfile.TemporaryDirectory(prefix='video-') as workdir:
+            poster_path = os.path.join(workdir, 'poster.jpg')
+            video.extract_poster(source, poster_path, info['duration'], video.fit_even(size, size))
+            with open(poster_path, 'rb') as f:
+                store_variant(blob, 'poster.jpg', File(f, 'poster.jpg'), size, 'image/jpeg')
+
+            for profile in video.video_profiles(size):
+                rendition_size = video.fit_even(size, video.profile_box(profile, size))
+                target = os.path.join(workdir, f'{profile}.mp4')
+                video.transcode(source, target, rendition_size, profile)
+                with open(target, 'rb') as f:
+                    store_variant(blob, f'{profile}.mp4', File(f, f'{profile}.mp4'), rendition_size, 'video/mp4')
+
+        MediaBlob.objects.filter(id=blob.id).update(
+            width=size[0], height=size[1], duration=info['duration']
+        )
+        blob.duration = info['duration']
+        if blob.duration:
+            fill_creative_durations(blob)
+        VideoJob.objects.filter(id=job.id).update(status='done', error='', finished_at=timezone.now())
+
+    except video.VideoError as e:
+        # Unreadable file or ffmpeg missing - retrying won't help
+        logger.warning('Video job %s failed: %s', job.id, e)
+        VideoJob.objects.filter(id=job.id).update(status='failed', error=str(e), finished_at=timezone.now())
+
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            VideoJob.objects.filter(id=job.id).update(status='failed', error=str(e), finished_at=timezone.now())
+            raise
+        VideoJob.objects.filter(id=job.id).update(status='pending')
+        raise self.retry(exc=e)
+
+
+@shared_task
+def evict_media_derivatives():
+    """Keep the on-demand resize cache under MEDIA_DERIVATIVE_CACHE_BYTES"""
+    from .derivatives import DerivativeCache
+
+    removed, removed_bytes = DerivativeCache().evict()
+    if removed:
+        logger.info('Evicted %s resized images (%s bytes)', removed, removed_bytes)
+    return removed
+
+
+@shared_task
+def expire_upload_sessions():
+    """Drop resumable uploads (and their part files) idle for UPLOAD_SESSION_TTL_HOURS"""
+    from datetime import timedelta
+    from django.conf import settings
+
+    cutoff = timezone.now() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    expired = missing = 0
+    for session in UploadSession.objects.filter(updated_at__lt=cutoff).iterator():
+        # An upload still receiving chunks has a part file; if this worker
+        # can't see it, keep the row rather than orphan the file
+        if session.status == 'uploading' and session.offset and not os.path.exists(session.part_path):
+            missing += 1
+            continue
+        try:
+            session.delete_part()
+        except OSError as e:
+            logger.warning('Could not remove part file of upload %s: %s', session.id, e)
+            continue
+        session.delete()
+        expired += 1
+    if missing:
+        logger.warning('%s expired uploads kept: part files not found under %s', missing, settings.UPLOAD_SESSION_ROOT)
+    return expired
+
+
+@shared_task
+def refresh_dynamic_content(item_type, city_id, param=''):
+    """Re-render a stale dynamic playlist payload (see renderers.py)"""
+    from django.core.cache import cache
+    from .renderers import cache_key, render_payload
+
+    try:
+        render_payload(item_type, city_id, param)
+    finally:
+        cache.delete(f'{cache_key(item_type, city_id, param)}:refreshing')
+
+
+@shared_task
+def prewarm_dynamic_content():
+    """
+    Render the payloads used by active playlists before they go stale, so
+    totem requests are always served from the cache
+    """
+    import time as _time
+    from django.core.cache import cache
+    from .models_playlist import PlaylistItem
+    from .renderers import RENDERERS, cache_key, item_param, render_payload
+
+    items = PlaylistItem.objects.filter(
+        is_active=True, playlist__is_active=True, item_type__in=list(RENDERERS)
+    ).values('item_type', 'content_url', 'playlist__city_id').distinct()
+
+    rendered = 0
+    for row in items:
+        item = PlaylistItem(item_type=row['item_type'], content_url=row['content_url'])
+        item_type, city_id, param = row['item_type'], row['playlist__city_id'], item_param(item)
+        entry = cache.get(cache_key(item_type, city_id, param))
+        # Refresh a bit before the TTL runs out
+        if entry is None or _time.time() - entry['rendered_at'] > RENDERERS[item_type].ttl * 0.8:
+            try:
+                render_payload(item_type, city_id, param)
+                rendered += 1
+            except Exception:
+                logger.exception('Failed to render %s for city %s', item_type, city_id)
+    return rendered
+
+
+@shared_task
+def fetch_due_feeds(limit=200):
+    """Poll the RSS feeds whose next fetch time has come"""
+    from django.db.models import Q
+    from .feeds import fetch_feeds
+    from .models_playlist import RSSFeed
+
+    due = RSSFeed.objects.filter(is_active=True).filter(
+        Q(next_fetch_at__isnull=True) | Q(next_fetch_at__lte=timezone.now())
+    ).order_by('next_fetch_at')[:limit]
+    return fetch_feeds(due)
+
+
+@shared_task
+def fetch_feeds_now(feed_ids):
+    """Poll specific feeds right away (admin action)"""
+    from .feeds import fetch_feeds
+    from .models_playlist import RSSFeed
+
+    return fetch_feeds(RSSFeed.objects.filter(id__in=feed_ids))
+
+
+@shared_task
+def refresh_visible_content():
+    """
+    Recompute the visible news/event/gallery IDs of every city whose next
+    publication window boundary has passed (or is about to)
+    """
+    from datetime import timedelta
+    from django.core.cache import cache
+    from apps.tenants.models import City
+    from .visibility import WINDOWS, cache_key, refresh_visible
+
+    now = timezone.now()
+    soon = now + timedelta(minutes=1)
+    refreshed = 0
+    for city_id in [None, *City.objects.filter(is_active=True).values_list('id', flat=True)]:
+        for name in WINDOWS:
+            entry = cache.get(cache_key(name, city_id))
+            if entry is None or (entry['valid_until'] and entry['valid_until'] <= soon):
+                refresh_visible(name, city_id, now)
+                refreshed += 1
+    return refreshed
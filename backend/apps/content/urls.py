@@ -4,7 +4,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     CategoryViewSet, NewsViewSet, EventViewSet,
     GalleryImageViewSet, PointOfInterestViewSet,
-    PlaylistViewSet, PlaylistItemViewSet, RSSFeedViewSet,
+    PlaylistViewSet, PlaylistItemViewSet, RSSFeedViewSet, ImageJobViewSet, VideoJobViewSet, UploadSessionViewSet,
     FileUploadView, GalleryUploadView, BulkUploadView
 )
 
@@ -17,6 +17,9 @@ router.register(r'pois', PointOfInterestViewSet)
 router.register(r'playlists', PlaylistViewSet)
 router.register(r'playlist-items', PlaylistItemViewSet)
 router.register(r'rss-feeds', RSSFeedViewSet)
+router.register(r'image-jobs', ImageJobViewSet)
+router.register(r'video-jobs', VideoJobViewSet)
+router.register(r'uploads', UploadSessionViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -7,6 +7,11 @@ from io import BytesIO
 from PIL import Image
 from django.core.files.uploadedfile import InMemoryUploadedFile
 
+try:
+    import pillow_avif  # noqa: F401 - registers the AVIF codec on Pillow < 11.2
+except ImportError:
+    pass
+
 
 # Maximum file size in bytes (10MB)
 MAX_FILE_SIZE = 10 * 1024 * 1024
@@ -32,6 +37,31 @@ RESOLUTION_PRESETS = {
     'totem': (1080, 1920),  # Portrait orientation for totems
 }
 
+# Variants generated in the background for every uploaded image
+IMAGE_VARIANTS = ['thumbnail', 'preview', 'standard', 'fullhd', 'totem']
+ALWAYS_GENERATED_VARIANTS = {'thumbnail', 'standard'}
+
+# JPEG quality per variant (WebP/AVIF get an offset for similar visual quality)
+VARIANT_QUALITY = {
+    'thumbnail': 70,
+    'preview': 75,
+    'standard': 85,
+    'fullhd': 90,
+    'totem': 90,
+}
+
+# Encoders for variant files: extension -> (Pillow format, MIME type, quality offset, options)
+IMAGE_FORMATS = {
+    'avif': ('AVIF', 'image/avif', -30, {'speed': 6}),
+    'webp': ('WEBP', 'image/webp', -5, {'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', 0, {'optimize': True, 'progressive': True}),
+    'png': ('PNG', 'image/png', 0, {'optimize': True}),
+}
+
+# Modern formats this Pillow build can encode, best first
+Image.init()
+MODERN_IMAGE_FORMATS = [ext for ext in ('avif', 'webp') if IMAGE_FORMATS[ext][0] in Image.SAVE]
+
 
 def validate_file_size(file):
     """Validate file size is within limit"""
@@ -58,46 +88,71 @@ def generate_unique_filename(filename):
     return f'{unique_id}{ext}'
 
 
+def has_alpha(img):
+    """Check if an image has (or may have) transparency"""
+    return img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+
+
+def normalize_mode(img):
+    """Convert to RGB, or RGBA when the image has transparency"""
+    if has_alpha(img):
+        return img if img.mode == 'RGBA' else img.convert('RGBA')
+    return img if img.mode in ('RGB', 'L') else img.convert('RGB')
+
+
+def encode_image(img, ext, quality, base_name):
+    """
+    Encode a Pillow image to one of IMAGE_FORMATS
+
+    Returns:
+        InMemoryUploadedFile named <base_name>.<ext>
+    """
+    pil_format, content_type, quality_offset, options = IMAGE_FORMATS[ext]
+    buffer = BytesIO()
+    if pil_format == 'PNG':
+        img.save(buffer, format=pil_format, **options)
+    else:
+        img.save(buffer, format=pil_format, quality=max(1, quality + quality_offset), **options)
+    buffer.seek(0)
+    return InMemoryUploadedFile(
+        buffer, 'ImageField', f'{base_name}.{ext}', content_type,
+        buffer.getbuffer().nbytes, None
+    )
+
+
+def fallback_format(img):
+    """Format every browser can show: JPEG, or PNG when there's transparency"""
+    return 'png' if img.mode == 'RGBA' else 'jpg'
+
+
 def resize_image(image_file, max_size, quality=85):
     """
     Resize an image to fit within max_size while maintaining aspect ratio
 
+    JPEG, PNG and WebP sources keep their format (and transparency); other
+    formats are saved as JPEG, or PNG when they have transparency.
+
     Args:
         image_file: Django uploaded file or file-like object
         max_size: Tuple of (max_width, max_height)
-        quality: JPEG quality (1-100)
+        quality: JPEG/WebP quality (1-100)
 
     Returns:
         InMemoryUploadedFile with resized image
     """
     img = Image.open(image_file)
-
-    # Convert to RGB if necessary (for PNG with transparency)
-    if img.mode in ('RGBA', 'P'):
-        img = img.convert('RGB')
+    source_format = img.format
 
     # Calculate new size maintaining aspect ratio
     img.thumbnail(max_size, Image.Resampling.LANCZOS)
+    img = normalize_mode(img)
 
-    # Save to buffer
-    buffer = BytesIO()
-    img.save(buffer, format='JPEG', quality=quality, optimize=True)
-    buffer.seek(0)
-
-    # Get original filename and create new one
-    if hasattr(image_file, 'name'):
-        name = os.path.splitext(image_file.name)[0] + '.jpg'
-    else:
-        name = 'resized.jpg'
+    ext = {'PNG': 'png', 'WEBP': 'webp'}.get(source_format)
+    if ext is None or (ext == 'webp' and ext not in MODERN_IMAGE_FORMATS):
+        ext = fallback_format(img)
 
-    return InMemoryUploadedFile(
-        buffer,
-        'ImageField',
-        name,
-        'image/jpeg',
-        buffer.getbuffer().nbytes,
-        None
-    )
+    base_name = os.path.splitext(getattr(image_file, 'name', None) or 'resized')[0]
+    return encode_image(img, ext, quality, base_name)
 
 
 def create_thumbnail(image_file, size_name='medium'):
@@ -115,6 +170,87 @@ def create_thumbnail(image_file, size_name='medium'):
     return resize_image(image_file, size, quality=75)
 
 
+def fit_size(size, max_size):
+    """Size an image of `size` gets when fitted into `max_size` (never upscaled)"""
+    width, height = size
+    ratio = min(max_size[0] / width, max_size[1] / height, 1)
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+def variant_presets(original_size, presets=None):
+    """
+    Pick which variants to generate for an image
+
+    Larger presets are only produced when the original is big enough to
+    fill them, so small uploads aren't re-encoded at their own size twice.
+    """
+    presets = presets or IMAGE_VARIANTS
+    return [
+        name for name in presets
+        if name in ALWAYS_GENERATED_VARIANTS
+        or original_size[0] >= RESOLUTION_PRESETS[name][0]
+        or original_size[1] >= RESOLUTION_PRESETS[name][1]
+    ]
+
+
+def render_variants(image_file, presets=None):
+    """
+    Decode an image once and produce every resized variant from it
+
+    JPEGs are decoded with draft() straight to the smallest scale that still
+    covers the largest variant, and each smaller variant is resized from the
+    smallest already-produced variant that covers it instead of the original.
+    Each variant is encoded in every MODERN_IMAGE_FORMATS entry plus a
+    JPEG/PNG fallback; transparency is preserved.
+
+    Args:
+        image_file: Django uploaded file or file-like object
+        presets: List of RESOLUTION_PRESETS names (default: IMAGE_VARIANTS)
+
+    Returns:
+        Tuple of (original_size, {preset: ((width, height), {ext: InMemoryUploadedFile})})
+    """
+    if hasattr(image_file, 'seek'):
+        image_file.seek(0)
+
+    img = Image.open(image_file)
+    original_size = img.size
+    names = variant_presets(original_size, presets)
+    targets = {name: fit_size(original_size, RESOLUTION_PRESETS[name]) for name in names}
+    if not targets:
+        return original_size, {}
+
+    # Downscale-on-decode: JPEG decoder skips detail we'd throw away anyway
+    largest = (max(w for w, h in targets.values()), max(h for w, h in targets.values()))
+    if img.format == 'JPEG':
+        img.draft('RGB', largest)
+    img.load()
+
+    img = normalize_mode(img)
+    formats = MODERN_IMAGE_FORMATS + [fallback_format(img)]
+
+    base_name = os.path.splitext(getattr(image_file, 'name', None) or 'image')[0]
+    sources = [img]
+    results = {}
+    for name, target in sorted(targets.items(), key=lambda item: item[1][0] * item[1][1], reverse=True):
+        # Cascade: resize from the smallest image that still covers the target
+        source = min(
+            (s for s in sources if s.size[0] >= target[0] and s.size[1] >= target[1]),
+            key=lambda s: s.size[0] * s.size[1],
+            default=img,
+        )
+        variant = source if source.size == target else source.resize(target, Image.Resampling.LANCZOS)
+        sources.append(variant)
+
+        quality = VARIANT_QUALITY.get(name, 85)
+        results[name] = (
+            variant.size,
+            {ext: encode_image(variant, ext, quality, f'{base_name}_{name}') for ext in formats},
+        )
+
+    return original_size, results
+
+
 def process_image_for_resolution(image_file, preset='standard'):
     """
     Process image for a specific resolution preset
@@ -126,29 +262,154 @@ def process_image_for_resolution(image_file, preset='standard'):
     Returns:
         Dict with processed images at different resolutions
     """
-    results = {}
+    original_size, variants = render_variants(image_file)
+    return {
+        name: files.get('jpg') or files.get('png')
+        for name, (size, files) in variants.items()
+    }
 
-    # Rewind file if needed
-    if hasattr(image_file, 'seek'):
-        image_file.seek(0)
 
-    img = Image.open(image_file)
-    original_size = img.size
+def register_blob(name, content_type=''):
+    """
+    Get or create the MediaBlob for a file already in the content-addressed
+    storage (e.g. saved through a model field by the admin or a serializer)
 
-    # Always create thumbnail
-    image_file.seek(0)
-    results['thumbnail'] = resize_image(image_file, RESOLUTION_PRESETS['thumbnail'], quality=70)
+    Returns:
+        Tuple of (MediaBlob, created)
+    """
+    import mimetypes
+    from .models_media import MediaBlob
+    from .storage import media_storage, digest_from_name
+
+    return MediaBlob.objects.get_or_create(
+        sha256=digest_from_name(name),
+        defaults={
+            'name': name,
+            'size': media_storage.size(name),
+            'content_type': content_type or mimetypes.guess_type(name)[0] or '',
+        }
+    )
 
-    # Create standard size
-    image_file.seek(0)
-    results['standard'] = resize_image(image_file, RESOLUTION_PRESETS['standard'], quality=85)
 
-    # If image is large enough, create full HD
-    if original_size[0] >= 1920 or original_size[1] >= 1080:
-        image_file.seek(0)
-        results['fullhd'] = resize_image(image_file, RESOLUTION_PRESETS['fullhd'], quality=90)
+def store_upload(file, content_type=None, digest=None):
+    """
+    Save a file through the content-addressed storage and register its blob
+
+    Args:
+        file: Django uploaded file or file-like object
+        content_type: MIME type to record (defaults to file.content_type)
+        digest: SHA-256 of the file when the caller already computed it
 
-    return results
+    Returns:
+        Tuple of (MediaBlob, created) - created is False when the same bytes
+        were already stored
+    """
+    from .storage import media_storage
+
+    name = media_storage.save(getattr(file, 'name', None) or 'upload', file, digest=digest)
+    return register_blob(name, content_type or getattr(file, 'content_type', '') or '')
+
+
+def media_variants(names):
+    """
+    Resized variants for a batch of stored files (one query)
+
+    Returns:
+        Dict of file name -> {preset: {'width', 'height', <ext>: url, ...}};
+        files without variants are omitted
+    """
+    from .models_media import MediaBlob
+    from .storage import media_storage
+
+    names = [name for name in names if name]
+    if not names:
+        return {}
+
+    variants = {}
+    rows = MediaBlob.objects.filter(source__name__in=names).values(
+        'source__name', 'variant', 'name', 'width', 'height'
+    )
+    for row in rows:
+        preset, _, ext = row['variant'].partition('.')
+        entry = variants.setdefault(row['source__name'], {}).setdefault(
+            preset, {'width': row['width'], 'height': row['height']}
+        )
+        entry[ext or 'jpg'] = media_storage.url(row['name'])
+    return variants
+
+
+def media_videos(names):
+    """
+    Poster, duration and transcoded renditions for a batch of stored videos
+    (one query)
+
+    Returns:
+        Dict of file name -> {'duration', 'poster', 'renditions':
+        {profile: {'width', 'height', 'url'}}}; unprocessed files are omitted
+    """
+    from django.db.models import Q
+    from .models_media import MediaBlob
+    from .storage import media_storage
+
+    names = [name for name in names if name]
+    if not names:
+        return {}
+
+    videos = {}
+    rows = MediaBlob.objects.filter(
+        Q(name__in=names, duration__isnull=False) | Q(source__name__in=names)
+    ).values('name', 'source__name', 'variant', 'width', 'height', 'duration')
+    for row in rows:
+        source = row['source__name'] or row['name']
+        entry = videos.setdefault(source, {'duration': None, 'poster': None, 'renditions': {}})
+        if not row['source__name']:
+            entry['duration'] = row['duration']
+        elif row['variant'] == 'poster.jpg':
+            entry['poster'] = media_storage.url(row['name'])
+        else:
+            profile = row['variant'].partition('.')[0]
+            entry['renditions'][profile] = {
+                'width': row['width'],
+                'height': row['height'],
+                'url': media_storage.url(row['name']),
+            }
+    return videos
+
+
+def build_srcset(variants):
+    """srcset strings per format, e.g. {'webp': 'a.webp 150w, b.webp 960w'}"""
+    ordered = sorted(variants.values(), key=lambda v: v['width'] or 0)
+    formats = [ext for ext in IMAGE_FORMATS if any(ext in v for v in ordered)]
+    return {
+        ext: ', '.join(f"{v[ext]} {v['width']}w" for v in ordered if ext in v)
+        for ext in formats
+    }
+
+
+def pick_variant(variants, box):
+    """
+    Smallest variant that still fills `box` (width, height) at the image's
+    aspect ratio; the largest one if none does
+    """
+    if not variants:
+        return None
+    ordered = sorted(variants.values(), key=lambda v: (v['width'] or 0) * (v['height'] or 0))
+    largest = ordered[-1]
+    if not largest['width'] or not largest['height']:
+        return largest
+    ratio = min(box[0] / largest['width'], box[1] / largest['height'])
+    needed_width = largest['width'] * ratio
+    for variant in ordered:
+        if variant['width'] >= needed_width - 1:  # allow for rounding
+            return variant
+    return largest
+
+
+# Screen box used to pick a variant for each totem orientation
+ORIENTATION_BOXES = {
+    'portrait': RESOLUTION_PRESETS['totem'],
+    'landscape': RESOLUTION_PRESETS['fullhd'],
+}
 
 
 def get_image_dimensions(image_file):
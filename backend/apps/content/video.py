@@ -0,0 +1,120 @@
+"""
+Video processing with the local ffmpeg/ffprobe binaries
+
+Creatives and content-block videos are normalized to the renditions totems
+play back (H.264/AAC MP4 with faststart), and a poster frame is extracted
+so the player has something to show while the video buffers.
+"""
+import json
+import subprocess
+
+from django.conf import settings
+
+
+# Renditions for totem screens: name -> (max box, video bitrate, max bitrate).
+# The box is matched to the video's orientation, so a portrait creative is
+# fitted into 1080x1920 instead of 1920x1080.
+VIDEO_PROFILES = {
+    '1080p': ((1920, 1080), '5000k', '6000k'),
+    '720p': ((1280, 720), '2500k', '3000k'),
+}
+ALWAYS_GENERATED_PROFILES = {'720p'}
+
+AUDIO_BITRATE = '128k'
+
+# Poster frame: this many seconds in (or the middle of shorter videos)
+POSTER_OFFSET = 1.0
+
+
+class VideoError(Exception):
+    """ffmpeg/ffprobe failed or the file isn't a readable video"""
+
+
+def _run(args, timeout):
+    try:
+        result = subprocess.run(args, capture_output=True, timeout=timeout, check=False)
+    except FileNotFoundError as e:
+        raise VideoError(f'{args[0]} não encontrado') from e
+    except subprocess.TimeoutExpired as e:
+        raise VideoError(f'{args[0]} excedeu {timeout}s') from e
+    if result.returncode != 0:
+        raise VideoError(result.stderr.decode(errors='replace').strip()[-500:])
+    return result.stdout
+
+
+def probe(path):
+    """
+    Read duration and dimensions of a video
+
+    Returns:
+        Dict with 'duration' (seconds, float), 'width', 'height'
+    """
+    output = _run([
+        settings.FFPROBE_BINARY, '-v', 'error', '-print_format', 'json',
+        '-show_format', '-show_streams', '-select_streams', 'v:0', path,
+    ], timeout=60)
+    info = json.loads(output or b'{}')
+    streams = info.get('streams') or []
+    if not streams:
+        raise VideoError('Nenhuma faixa de vídeo encontrada')
+
+    stream = streams[0]
+    width, height = int(stream.get('width') or 0), int(stream.get('height') or 0)
+    # Phones record portrait video as landscape frames plus a rotation tag
+    rotation = abs(int((stream.get('tags') or {}).get('rotate', 0) or 0))
+    for side_data in stream.get('side_data_list') or []:
+        rotation = abs(int(side_data.get('rotation', rotation) or 0))
+    if rotation in (90, 270):
+        width, height = height, width
+
+    duration = float((info.get('format') or {}).get('duration') or stream.get('duration') or 0)
+    return {'duration': duration, 'width': width, 'height': height}
+
+
+def profile_box(profile, size):
+    """Profile box rotated to the video's orientation"""
+    box = VIDEO_PROFILES[profile][0]
+    if size[1] > size[0]:
+        return box[1], box[0]
+    return box
+
+
+def video_profiles(size):
+    """Profiles worth generating for a video of `size` (never upscaled)"""
+    names = []
+    for name in VIDEO_PROFILES:
+        box = profile_box(name, size)
+        if name in ALWAYS_GENERATED_PROFILES or (size[0] >= box[0] or size[1] >= box[1]):
+            names.append(name)
+    return names
+
+
+def fit_even(size, box):
+    """Fit size into box without upscaling, rounded to even dimensions (H.264)"""
+    width, height = size
+    ratio = min(box[0] / width, box[1] / height, 1)
+    return max(2, int(width * ratio) // 2 * 2), max(2, int(height * ratio) // 2 * 2)
+
+
+def transcode(source, target, size, profile):
+    """Encode `source` into an MP4 rendition at `size` for `profile`"""
+    _, bitrate, maxrate = VIDEO_PROFILES[profile]
+    _run([
+        settings.FFMPEG_BINARY, '-y', '-v', 'error', '-i', source,
+        '-vf', f'scale={size[0]}:{size[1]}',
+        '-c:v', 'libx264', '-preset', 'medium', '-profile:v', 'high', '-pix_fmt', 'yuv420p',
+        '-b:v', bitrate, '-maxrate', maxrate, '-bufsize', maxrate,
+        '-c:a', 'aac', '-b:a', AUDIO_BITRATE,
+        '-movflags', '+faststart',
+        target,
+    ], timeout=settings.VIDEO_TRANSCODE_TIMEOUT)
+
+
+def extract_poster(source, target, duration, size):
+    """Write a JPEG poster frame of `size` taken early in the video"""
+    offset = min(POSTER_OFFSET, duration / 2) if duration else 0
+    _run([
+        settings.FFMPEG_BINARY, '-y', '-v', 'error', '-ss', f'{offset:.3f}', '-i', source,
+        '-frames:v', '1', '-vf', f'scale={size[0]}:{size[1]}', '-q:v', '3',
+        target,
+    ], timeout=120)
@@ -1,14 +1,14 @@
 """Content Views"""
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
-from django.core.files.storage import default_storage
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from datetime import datetime
 
 from .models import Category, News, Event, GalleryImage, PointOfInterest
 from .serializers import (
@@ -16,10 +16,14 @@ from .serializers import (
     GalleryImageSerializer, PointOfInterestSerializer
 )
 from .utils import (
-    validate_file_size, validate_file_type, generate_unique_filename,
-    resize_image, create_thumbnail, process_image_for_resolution,
-    is_image, is_video, ALLOWED_IMAGE_TYPES, RESOLUTION_PRESETS
+    validate_file_size, validate_file_type, store_upload,
+    resize_image, is_image, is_video, ALLOWED_IMAGE_TYPES, RESOLUTION_PRESETS
 )
+from .tasks import queue_image_job, queue_video_job
+from .visibility import visible_ids, window_name
+from . import response_cache
+from .read_serializers import EventReadSerializer, FastJSONRenderer, PointOfInterestReadSerializer
+from apps.core.pagination import PublishAtPagination
 
 
 class TenantFilterMixin:
@@ -31,7 +35,91 @@ class TenantFilterMixin:
         return queryset
 
 
-class CategoryViewSet(TenantFilterMixin, viewsets.ModelViewSet):
+class VisibleWindowMixin:
+    """
+    Restrict read actions to content inside its publication window, using
+    the precomputed visible IDs of the city (see visibility.py).
+    ?include_hidden=true lists everything (admin panel).
+    """
+    visibility_actions = {'list', 'featured', 'upcoming', 'active'}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        include_hidden = self.request.query_params.get('include_hidden', '').lower() in ('1', 'true')
+        if self.action in self.visibility_actions and not include_hidden:
+            city_id = self.request.headers.get('X-City-ID')
+            ids = visible_ids(window_name(queryset.model), city_id)
+            queryset = queryset.filter(id__in=ids)
+        return queryset
+
+
+class CachedResponseMixin:
+    """
+    Serve GET requests from the per-city response cache (see
+    response_cache.py). response_cache_vary lists the request headers that
+    change the output besides X-City-ID.
+    """
+    response_cache_vary = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if (
+            not settings.RESPONSE_CACHE_ENABLED
+            or request.method != 'GET'
+            or 'format' in request.GET
+            or 'text/html' in request.headers.get('Accept', '')
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        endpoint = f'{type(self).__name__}.{self.action_map.get("get")}'
+        city_id = request.headers.get('X-City-ID')
+        extra = {'base': request.build_absolute_uri('/'), **kwargs}
+        for header in self.response_cache_vary:
+            extra[header] = request.headers.get(header, '')
+        # Key (and city generation) taken before computing, so a change
+        # made meanwhile can't be stored under the new generation
+        key = response_cache.cache_key(city_id, endpoint, response_cache.normalize_params(request.GET, extra))
+
+        entry = response_cache.get(key)
+        if entry is not None:
+            response_cache.record(endpoint, hit=True)
+            response = response_cache.as_response(entry)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response_cache.record(endpoint, hit=False)
+        response = super().dispatch(request, *args, **kwargs)
+        renderer = getattr(response, 'accepted_renderer', None)
+        if response.status_code == 200 and renderer is not None and renderer.format == 'json':
+            response.render()
+            response_cache.store(key, response)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ReadSerializerMixin:
+    """
+    List-style GET actions answered by read_serializer_class (values() rows,
+    see read_serializers.py) instead of the ModelSerializer, which still
+    handles retrieve and writes with the same output.
+    """
+    read_serializer_class = None
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def list(self, request, *args, **kwargs):
+        return self.read_response(self.filter_queryset(self.get_queryset()))
+
+    def read_response(self, queryset, limit=None):
+        serializer = self.read_serializer_class(self.request)
+        rows = serializer.values(queryset)
+        if limit is not None:
+            return Response(serializer.serialize(rows[:limit]))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
+
+
+class CategoryViewSet(CachedResponseMixin, TenantFilterMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
@@ -39,10 +127,11 @@ class CategoryViewSet(TenantFilterMixin, viewsets.ModelViewSet):
     filterset_fields = ['city', 'slug']
 
 
-class NewsViewSet(TenantFilterMixin, viewsets.ModelViewSet):
+class NewsViewSet(CachedResponseMixin, VisibleWindowMixin, TenantFilterMixin, viewsets.ModelViewSet):
     queryset = News.objects.filter(is_published=True).order_by('-publish_at')
     serializer_class = NewsSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = PublishAtPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['city', 'category', 'is_featured']
 
@@ -53,32 +142,34 @@ class NewsViewSet(TenantFilterMixin, viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class EventViewSet(TenantFilterMixin, viewsets.ModelViewSet):
+class EventViewSet(CachedResponseMixin, ReadSerializerMixin, VisibleWindowMixin, TenantFilterMixin,
+                   viewsets.ModelViewSet):
     queryset = Event.objects.filter(is_published=True).order_by('start_date')
     serializer_class = EventSerializer
+    read_serializer_class = EventReadSerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['city', 'category', 'is_featured']
 
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
-        upcoming = self.get_queryset().filter(end_date__gte=timezone.now())[:10]
-        serializer = self.get_serializer(upcoming, many=True)
-        return Response(serializer.data)
+        return self.read_response(self.get_queryset().filter(end_date__gte=timezone.now()), limit=10)
 
     @action(detail=False, methods=['get'])
     def featured(self, request):
-        featured = self.get_queryset().filter(is_featured=True, end_date__gte=timezone.now())[:5]
-        serializer = self.get_serializer(featured, many=True)
-        return Response(serializer.data)
+        return self.read_response(
+            self.get_queryset().filter(is_featured=True, end_date__gte=timezone.now()), limit=5
+        )
 
 
-class GalleryImageViewSet(TenantFilterMixin, viewsets.ModelViewSet):
+class GalleryImageViewSet(CachedResponseMixin, VisibleWindowMixin, TenantFilterMixin, viewsets.ModelViewSet):
     queryset = GalleryImage.objects.filter(is_active=True).order_by('order')
     serializer_class = GalleryImageSerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['city', 'is_active']
+    # The "best" variant depends on the requesting totem's screen
+    response_cache_vary = ('X-Totem-ID',)
 
     @action(detail=False, methods=['get'])
     def active(self, request):
@@ -87,9 +178,10 @@ class GalleryImageViewSet(TenantFilterMixin, viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class PointOfInterestViewSet(TenantFilterMixin, viewsets.ModelViewSet):
+class PointOfInterestViewSet(CachedResponseMixin, ReadSerializerMixin, TenantFilterMixin, viewsets.ModelViewSet):
     queryset = PointOfInterest.objects.filter(is_active=True)
     serializer_class = PointOfInterestSerializer
+    read_serializer_class = PointOfInterestReadSerializer
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['city', 'category', 'poi_type']
@@ -102,14 +194,14 @@ class PointOfInterestViewSet(TenantFilterMixin, viewsets.ModelViewSet):
         if not lat or not lng:
             return Response({'error': 'lat and lng required'}, status=400)
         
-        pois = self.get_queryset()[:20]
-        serializer = self.get_serializer(pois, many=True)
-        return Response(serializer.data)
+        return self.read_response(self.get_queryset(), limit=20)
 
 
 # Playlist Views
 from .models_playlist import Playlist, PlaylistItem, RSSFeed
 from .serializers import PlaylistSerializer, PlaylistItemSerializer, RSSFeedSerializer
+from .schedule import current_playlist
+from .renderers import embed_payloads
 
 
 class PlaylistViewSet(TenantFilterMixin, viewsets.ModelViewSet):
@@ -118,42 +210,38 @@ class PlaylistViewSet(TenantFilterMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['city', 'is_active', 'is_default']
+
+    def get_queryset(self):
+        return PlaylistSerializer.prefetch(super().get_queryset())
     
     @action(detail=False, methods=['get'])
     def current(self, request):
+        """
+        Playlist playing now for the city/totem, from the precomputed weekly
+        schedule (in the city's timezone). next_transition is when the
+        programming changes next, so totems know when to poll again.
+        """
         city_id = request.headers.get('X-City-ID')
         totem_id = request.query_params.get('totem_id')
-        
-        now = datetime.now()
-        current_time = now.time()
-        current_weekday = now.weekday()
-        
-        playlists = Playlist.objects.filter(is_active=True)
-        
-        if city_id:
-            playlists = playlists.filter(city_id=city_id)
-        
-        for playlist in playlists.order_by('-priority'):
-            if playlist.weekdays and current_weekday not in playlist.weekdays:
-                continue
-            
-            if playlist.start_time and playlist.end_time:
-                if not (playlist.start_time <= current_time <= playlist.end_time):
-                    continue
-            
-            if not playlist.all_totems and totem_id:
-                if not playlist.totems.filter(id=totem_id).exists():
-                    continue
-            
-            serializer = PlaylistSerializer(playlist)
-            return Response(serializer.data)
-        
-        default_playlist = playlists.filter(is_default=True).first()
-        if default_playlist:
-            serializer = PlaylistSerializer(default_playlist)
-            return Response(serializer.data)
-        
-        return Response({'detail': 'No playlist available'}, status=404)
+        if totem_id and not str(totem_id).isdigit():
+            totem_id = None
+
+        if totem_id and not city_id:
+            from apps.totems.models import Totem
+            city_id = Totem.objects.filter(id=totem_id).values_list('city_id', flat=True).first()
+
+        playlist_id, next_transition = current_playlist(city_id, totem_id)
+        playlist = None
+        if playlist_id:
+            playlist = PlaylistSerializer.prefetch(Playlist.objects.filter(id=playlist_id, is_active=True)).first()
+        if playlist is None:
+            return Response({'detail': 'No playlist available'}, status=404)
+
+        data = PlaylistSerializer(playlist).data
+        # Weather/news/events/rss/clock items come with their rendered payload
+        embed_payloads(playlist.city_id, data['items'])
+        data['next_transition'] = next_transition.isoformat() if next_transition else None
+        return Response(data)
 
 
 class PlaylistItemViewSet(viewsets.ModelViewSet):
@@ -172,6 +260,41 @@ class RSSFeedViewSet(TenantFilterMixin, viewsets.ModelViewSet):
     filterset_fields = ['city', 'is_active']
 
 
+# Media processing status
+from .models_media import ImageJob, VideoJob
+from .serializers import ImageJobSerializer, VideoJobSerializer
+
+
+class ImageJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status of background image processing
+    GET /api/v1/content/image-jobs/{id}/
+    GET /api/v1/content/image-jobs/?ids=1,2,3
+    """
+    queryset = ImageJob.objects.select_related('blob')
+    serializer_class = ImageJobSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        ids = self.request.query_params.get('ids')
+        if ids:
+            queryset = queryset.filter(id__in=[i for i in ids.split(',') if i.strip().isdigit()])
+        return queryset
+
+
+class VideoJobViewSet(ImageJobViewSet):
+    """
+    Status of background video transcoding
+    GET /api/v1/content/video-jobs/{id}/
+    GET /api/v1/content/video-jobs/?ids=1,2,3
+    """
+    queryset = VideoJob.objects.select_related('blob')
+    serializer_class = VideoJobSerializer
+
+
 # ============================================
 # Upload Views
 # ============================================
@@ -199,32 +322,27 @@ class FileUploadView(APIView):
         if not is_valid:
             return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Generate unique filename
-        filename = generate_unique_filename(file.name)
-
-        # Determine upload path
-        upload_type = request.data.get('type', 'general')
-        upload_path = f'uploads/{upload_type}/{filename}'
-
         # Process image if applicable
         resize_to = request.data.get('resize')
         if is_image(file) and resize_to:
             preset = RESOLUTION_PRESETS.get(resize_to, RESOLUTION_PRESETS['standard'])
             file = resize_image(file, preset)
-            upload_path = upload_path.replace('.', '_resized.')
 
-        # Save file
-        saved_path = default_storage.save(upload_path, file)
-        file_url = default_storage.url(saved_path)
+        # Save file (same bytes -> same name, nothing written twice)
+        blob, created = store_upload(file)
+        return self.upload_response(blob, created, file.content_type)
 
+    @staticmethod
+    def upload_response(blob, created, content_type):
         return Response({
             'success': True,
-            'file_url': file_url,
-            'file_path': saved_path,
-            'filename': filename,
-            'size': file.size,
-            'content_type': file.content_type,
-        }, status=status.HTTP_201_CREATED)
+            'file_url': blob.url,
+            'file_path': blob.name,
+            'filename': blob.name.rsplit('/', 1)[-1],
+            'size': blob.size,
+            'content_type': content_type,
+            'duplicate': not created,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 
 class GalleryUploadView(APIView):
@@ -248,6 +366,11 @@ class GalleryUploadView(APIView):
         uploaded = []
         errors = []
 
+        # Next order number (computed once, not per file)
+        next_order = (GalleryImage.objects.filter(city_id=city_id).aggregate(
+            max_order=models.Max('order')
+        )['max_order'] or 0) + 1
+
         for file in files:
             # Validate file
             is_valid, error = validate_file_size(file)
@@ -261,38 +384,17 @@ class GalleryUploadView(APIView):
                 continue
 
             try:
-                # Resize image for gallery
-                file.seek(0)
-                resized = resize_image(file, RESOLUTION_PRESETS['fullhd'])
-
-                # Create thumbnail
-                file.seek(0)
-                thumbnail = create_thumbnail(file, 'medium')
-
-                # Generate filename
-                filename = generate_unique_filename(file.name)
-
-                # Get next order number
-                max_order = GalleryImage.objects.filter(city_id=city_id).aggregate(
-                    max_order=models.Max('order')
-                )['max_order'] or 0
-
-                # Create gallery image
-                gallery_image = GalleryImage.objects.create(
-                    city_id=city_id,
+                # Store the original by content hash; resized variants are
+                # generated in the background
+                blob, created = store_upload(file)
+                entry = self.add_image(
+                    blob, city_id, next_order,
                     title=request.data.get('title', file.name),
                     description=request.data.get('description', ''),
-                    image=resized,
-                    order=max_order + 1,
-                    is_active=True,
                 )
-
-                uploaded.append({
-                    'id': gallery_image.id,
-                    'title': gallery_image.title,
-                    'image_url': gallery_image.image.url if gallery_image.image else None,
-                    'order': gallery_image.order,
-                })
+                if not entry['duplicate']:
+                    next_order += 1
+                uploaded.append(entry)
 
             except Exception as e:
                 errors.append({'file': file.name, 'error': str(e)})
@@ -305,6 +407,46 @@ class GalleryUploadView(APIView):
             'error_count': len(errors),
         }, status=status.HTTP_201_CREATED if uploaded else status.HTTP_400_BAD_REQUEST)
 
+    @staticmethod
+    def add_image(blob, city_id, order, title='', description=''):
+        """
+        Add a stored image to the city's gallery and queue its variants.
+        An identical image already in the gallery is returned instead of
+        being added again. Shared with resumable uploads.
+        """
+        job = queue_image_job(blob)
+
+        existing = GalleryImage.objects.filter(city_id=city_id, image=blob.name).first()
+        if existing:
+            return {
+                'id': existing.id,
+                'title': existing.title,
+                'image_url': existing.image.url,
+                'order': existing.order,
+                'duplicate': True,
+                'job_id': job.id,
+                'status': job.status,
+            }
+
+        # Create gallery image
+        gallery_image = GalleryImage.objects.create(
+            city_id=city_id,
+            title=title,
+            description=description,
+            image=blob.name,
+            order=order,
+            is_active=True,
+        )
+        return {
+            'id': gallery_image.id,
+            'title': gallery_image.title,
+            'image_url': gallery_image.image.url if gallery_image.image else None,
+            'order': gallery_image.order,
+            'duplicate': False,
+            'job_id': job.id,
+            'status': job.status,
+        }
+
 
 class BulkUploadView(APIView):
     """
@@ -349,35 +491,38 @@ class BulkUploadView(APIView):
                     # Get title from filename (without extension)
                     title = file.name.rsplit('.', 1)[0].replace('_', ' ').replace('-', ' ').title()
 
-                    gallery_image = GalleryImage.objects.create(
-                        city=city,
-                        title=title,
-                        image=file,
-                        is_active=True
-                    )
+                    blob, created = store_upload(file)
+                    gallery_image = GalleryImage.objects.filter(city=city, image=blob.name).first()
+                    result['duplicate'] = gallery_image is not None
+                    if gallery_image is None:
+                        gallery_image = GalleryImage.objects.create(
+                            city=city,
+                            title=title,
+                            image=blob.name,
+                            is_active=True
+                        )
                     result['id'] = gallery_image.id
                     result['original'] = request.build_absolute_uri(gallery_image.image.url)
+                    if generate_thumbnails:
+                        job = queue_image_job(blob)
+                        result['job_id'] = job.id
+                        result['status'] = job.status
                     result['success'] = True
                 else:
                     # Generic file upload
-                    filename = generate_unique_filename(file.name)
-                    base_path = f'uploads/{upload_type}'
+                    blob, created = store_upload(file)
+                    result['original'] = blob.url
+                    result['duplicate'] = not created
 
-                    # Save original
-                    original_path = f'{base_path}/original/{filename}'
-                    saved_path = default_storage.save(original_path, file)
-                    result['original'] = default_storage.url(saved_path)
-
-                    # Process image
+                    # Variants are generated in the background; poll the job
                     if is_image(file) and generate_thumbnails:
-                        file.seek(0)
-                        processed = process_image_for_resolution(file)
-
-                        result['variants'] = {}
-                        for variant_name, variant_file in processed.items():
-                            variant_path = f'{base_path}/{variant_name}/{filename}'
-                            variant_saved = default_storage.save(variant_path, variant_file)
-                            result['variants'][variant_name] = default_storage.url(variant_saved)
+                        job = queue_image_job(blob)
+                        result['job_id'] = job.id
+                        result['status'] = job.status
+                    elif is_video(file):
+                        job = queue_video_job(blob)
+                        result['video_job_id'] = job.id
+                        result['status'] = job.status
 
                     result['success'] = True
 
@@ -395,3 +540,218 @@ class BulkUploadView(APIView):
             'error_count': len(files) - success_count,
             'results': results,
         }, status=status.HTTP_201_CREATED if success_count else status.HTTP_400_BAD_REQUEST)
+
+
+# ============================================
+# Resumable Uploads
+# ============================================
+
+import os
+from django.core.files import File, locks
+from django.http import UnreadablePostError
+from rest_framework import mixins
+from .models_media import UploadSession
+from .serializers import UploadSessionSerializer
+from .storage import hash_file
+from .utils import ALLOWED_MEDIA_TYPES, MAX_FILE_SIZE
+
+# Received chunks are streamed to disk this many bytes at a time
+UPLOAD_READ_SIZE = 64 * 1024
+
+
+def upload_target_limits():
+    """Allowed types and max size per target, same as the one-shot upload views"""
+    from apps.advertising.views import AdUploadView
+    return {
+        'file': (ALLOWED_MEDIA_TYPES, MAX_FILE_SIZE),
+        'gallery': (ALLOWED_IMAGE_TYPES, MAX_FILE_SIZE),
+        'creative': (AdUploadView.ALLOWED_TYPES, AdUploadView.MAX_SIZE),
+    }
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads (tus-style)
+
+    POST   /api/v1/content/uploads/                  {target, filename, content_type, size, checksum?, metadata}
+    HEAD   /api/v1/content/uploads/{id}/             -> Upload-Offset header (where to resume)
+    PATCH  /api/v1/content/uploads/{id}/             Upload-Offset header + raw bytes of the next chunk
+    POST   /api/v1/content/uploads/{id}/finalize/    verify checksum and create the gallery image/creative/file
+    DELETE /api/v1/content/uploads/{id}/             abort
+
+    Targets and metadata:
+    - file: like /upload/
+    - gallery: metadata.city_id, title, description (like /gallery/upload/)
+    - creative: metadata.campaign_id, name, duration (like /advertising/upload/)
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['target_limits'] = upload_target_limits()
+        return context
+
+    def _offset_headers(self, response, session):
+        response['Upload-Offset'] = str(session.offset)
+        response['Upload-Length'] = str(session.size)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response['Location'] = request.build_absolute_uri(f"{response.data['id']}/")
+        response['Upload-Offset'] = '0'
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        session = self.get_object()
+        return self._offset_headers(Response(self.get_serializer(session).data), session)
+
+    def partial_update(self, request, *args, **kwargs):
+        """Append a chunk; its Upload-Offset must match the bytes already received"""
+        session = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            return Response({'error': 'Cabeçalho Upload-Offset obrigatório'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if session.status != 'uploading':
+            return Response({'error': 'Upload já finalizado'}, status=status.HTTP_409_CONFLICT)
+
+        os.makedirs(os.path.dirname(session.part_path), exist_ok=True)
+        with open(session.part_path, 'ab') as part:
+            # One writer per upload; a concurrent PATCH is rejected, not queued
+            if not locks.lock(part, locks.LOCK_EX | locks.LOCK_NB):
+                return self._offset_headers(
+                    Response({'error': 'Outro envio deste upload está em andamento'}, status=status.HTTP_409_CONFLICT),
+                    session,
+                )
+            try:
+                # Re-read under the lock: another request may have just written
+                session.refresh_from_db(fields=['offset', 'status'])
+                if offset != session.offset:
+                    return self._offset_headers(
+                        Response({'error': 'Upload-Offset não confere'}, status=status.HTTP_409_CONFLICT),
+                        session,
+                    )
+
+                # Drop bytes of an interrupted write that was never recorded
+                part.truncate(session.offset)
+
+                received, error = self._receive(request, part, session.size - session.offset)
+                part.flush()
+                os.fsync(part.fileno())
+            finally:
+                locks.unlock(part)
+
+        # Keep whatever arrived, even if the connection dropped mid-chunk
+        session.offset += received
+        UploadSession.objects.filter(pk=session.pk).update(offset=session.offset, updated_at=timezone.now())
+
+        if error:
+            return self._offset_headers(Response({'error': error}, status=status.HTTP_400_BAD_REQUEST), session)
+        return self._offset_headers(Response(status=status.HTTP_204_NO_CONTENT), session)
+
+    def _receive(self, request, part, remaining):
+        """Stream the request body into the part file without buffering it"""
+        stream = request.stream
+        received = 0
+        if stream is None:
+            return 0, None
+        try:
+            while True:
+                chunk = stream.read(UPLOAD_READ_SIZE)
+                if not chunk:
+                    break
+                if received + len(chunk) > remaining:
+                    part.write(chunk[:remaining - received])
+                    return remaining, 'Dados além do tamanho declarado foram descartados'
+                part.write(chunk)
+                received += len(chunk)
+        except (UnreadablePostError, OSError):
+            return received, 'Conexão interrompida'
+        return received, None
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """Verify the received file and hand it to the gallery/creative/file logic"""
+        session = self.get_object()
+        if session.status == 'complete':
+            return Response(session.result)
+        if session.status != 'uploading':
+            return Response({'error': session.error}, status=status.HTTP_409_CONFLICT)
+        if session.offset != session.size or not os.path.exists(session.part_path):
+            return self._offset_headers(
+                Response({'error': 'Upload incompleto'}, status=status.HTTP_409_CONFLICT), session
+            )
+
+        with open(session.part_path, 'rb') as part:
+            if not locks.lock(part, locks.LOCK_EX | locks.LOCK_NB):
+                return Response({'error': 'Upload em andamento'}, status=status.HTTP_409_CONFLICT)
+            try:
+                # A concurrent finalize may have completed it while we waited
+                session.refresh_from_db()
+                if session.status == 'complete':
+                    return Response(session.result)
+
+                digest = hash_file(part)
+                if session.checksum and digest != session.checksum:
+                    # Corrupt upload: the client has to start over
+                    session.status = 'failed'
+                    session.error = 'Checksum SHA-256 não confere'
+                    session.save(update_fields=['status', 'error', 'updated_at'])
+                    session.delete_part()
+                    return Response({'error': session.error}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+                blob, created = store_upload(File(part, session.filename), session.content_type, digest=digest)
+                response = self._hand_off(session, blob, created)
+                session.status = 'complete'
+                session.blob = blob
+                session.result = response.data
+                session.save(update_fields=['status', 'blob', 'result', 'updated_at'])
+            finally:
+                locks.unlock(part)
+
+        session.delete_part()
+        return response
+
+    def _hand_off(self, session, blob, created):
+        metadata = session.metadata or {}
+        if session.target == 'creative':
+            from apps.advertising.views import AdUploadView
+            return AdUploadView.create_creative(
+                blob, created, session.content_type, session.filename,
+                campaign_id=metadata.get('campaign_id'),
+                name=metadata.get('name', ''),
+                duration=metadata.get('duration'),
+            )
+
+        if session.target == 'gallery':
+            city_id = metadata['city_id']
+            next_order = (GalleryImage.objects.filter(city_id=city_id).aggregate(
+                max_order=models.Max('order')
+            )['max_order'] or 0) + 1
+            entry = GalleryUploadView.add_image(
+                blob, city_id, next_order,
+                title=metadata.get('title', session.filename),
+                description=metadata.get('description', ''),
+            )
+            return Response(
+                {'success': True, **entry},
+                status=status.HTTP_200_OK if entry['duplicate'] else status.HTTP_201_CREATED,
+            )
+
+        response = FileUploadView.upload_response(blob, created, session.content_type)
+        if is_video(session):
+            job = queue_video_job(blob)
+            response.data['video_job_id'] = job.id
+        return response
+
+    def perform_destroy(self, instance):
+        instance.delete_part()
+        instance.delete()
@@ -0,0 +1,133 @@
+"""
+Published-content windows
+
+News (publish_at/expires_at), events (until they end) and gallery images
+(display_start/display_end) are only listed to totems inside their window.
+The IDs visible in each city are precomputed together with the next window
+boundary, so list endpoints filter by primary key instead of re-evaluating
+date ranges on every request. The sets are recomputed when a boundary
+passes (by the scheduler, or lazily on read) or when content changes.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+CACHE_TIMEOUT = 60 * 60
+
+# Events without an end date stay visible this long after they start
+EVENT_DEFAULT_DURATION = timedelta(days=1)
+
+
+def _news(now):
+    from .models import News
+    visible = Q(is_published=True, publish_at__lte=now) & (Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+    boundaries = [('publish_at', Q(is_published=True)), ('expires_at', Q(is_published=True))]
+    return News, visible, boundaries
+
+
+def _events(now):
+    from .models import Event
+    visible = Q(is_published=True) & (
+        Q(end_date__gte=now) | Q(end_date__isnull=True, start_date__gt=now - EVENT_DEFAULT_DURATION)
+    )
+    boundaries = [('end_date', Q(is_published=True))]
+    return Event, visible, boundaries
+
+
+def _gallery(now):
+    from .models import GalleryImage
+    visible = Q(is_active=True) & (
+        Q(display_start__isnull=True) | Q(display_start__lte=now)
+    ) & (
+        Q(display_end__isnull=True) | Q(display_end__gt=now)
+    )
+    boundaries = [('display_start', Q(is_active=True)), ('display_end', Q(is_active=True))]
+    return GalleryImage, visible, boundaries
+
+
+WINDOWS = {
+    'news': _news,
+    'event': _events,
+    'galleryimage': _gallery,
+}
+
+
+def window_name(model):
+    return model._meta.model_name
+
+
+def visible_q(name, now=None):
+    """Q object for the rows of `name` visible at `now`"""
+    return WINDOWS[name](now or timezone.now())[1]
+
+
+def compute_visible(name, city_id, now=None):
+    """
+    Visible IDs of a city and when that set next changes
+
+    Returns:
+        Tuple of (sorted id list, next boundary datetime or None)
+    """
+    now = now or timezone.now()
+    model, visible, boundaries = WINDOWS[name](now)
+    queryset = model.objects.all()
+    if city_id:
+        queryset = queryset.filter(city_id=city_id)
+
+    ids = sorted(queryset.filter(visible).values_list('id', flat=True))
+
+    next_boundary = None
+    for field, condition in boundaries:
+        upcoming = queryset.filter(condition, **{f'{field}__gt': now}).aggregate(next=Min(field))['next']
+        if upcoming and (next_boundary is None or upcoming < next_boundary):
+            next_boundary = upcoming
+
+    if name == 'event':
+        # Open-ended events drop out EVENT_DEFAULT_DURATION after they start
+        upcoming = queryset.filter(
+            is_published=True, end_date__isnull=True, start_date__gt=now - EVENT_DEFAULT_DURATION
+        ).aggregate(next=Min(F('start_date') + EVENT_DEFAULT_DURATION))['next']
+        if upcoming and (next_boundary is None or upcoming < next_boundary):
+            next_boundary = upcoming
+
+    return ids, next_boundary
+
+
+def cache_key(name, city_id):
+    return f'visible_ids:{name}:{city_id or "all"}'
+
+
+def refresh_visible(name, city_id, now=None):
+    """
+    Recompute and cache one visible set; returns its cache entry. Cached
+    API responses of the city are dropped when the set changed (or is
+    unknown because the previous entry expired at its boundary).
+    """
+    from .response_cache import invalidate_city
+
+    now = now or timezone.now()
+    previous = cache.get(cache_key(name, city_id))
+    ids, next_boundary = compute_visible(name, city_id, now)
+    entry = {'ids': ids, 'valid_until': next_boundary}
+    timeout = CACHE_TIMEOUT
+    if next_boundary:
+        timeout = max(1, min(CACHE_TIMEOUT, int((next_boundary - now).total_seconds()) + 1))
+    cache.set(cache_key(name, city_id), entry, timeout)
+    if previous is None or previous['ids'] != ids:
+        invalidate_city(city_id)
+    return entry
+
+
+def visible_ids(name, city_id):
+    """Cached visible IDs of a city (recomputed once its next boundary passes)"""
+    now = timezone.now()
+    entry = cache.get(cache_key(name, city_id))
+    if entry is None or (entry['valid_until'] and entry['valid_until'] <= now):
+        entry = refresh_visible(name, city_id, now)
+    return entry['ids']
+
+
+def invalidate_visible(name, city_id):
+    cache.delete_many([cache_key(name, city_id), cache_key(name, None)])
@@ -0,0 +1,26 @@
+"""
+Redis cache backend that counts hits and misses for the request metrics
+(see core/metrics.py)
+"""
+from django.core.cache.backends.redis import RedisCache
+
+from . import metrics
+
+_MISSING = object()
+
+
+class InstrumentedRedisCache(RedisCache):
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            metrics.cache_access(0, 1)
+            return default
+        metrics.cache_access(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        metrics.cache_access(len(values), len(keys) - len(values))
+        return values
@@ -0,0 +1,97 @@
+"""
+Rolling-window aggregates from per-day partials
+
+Stats over "the last N days" are sums of per-day aggregates, and the
+aggregates of a day no longer change once the day is settled (closed, and
+for derived tables processed). Each settled day's partial is computed once
+and cached; a window is then one cache get_many, at most one query for
+the days not cached yet, and one live query for the unsettled days
+(normally just today), merged in Python. Loading 90 days costs the same
+queries as loading 7.
+
+A partial is a dict of numbers and nested dicts of numbers (e.g. counts
+per campaign id), so partials merge by summing key by key.
+
+Settled days only change when rows are deleted (e.g. a campaign and its
+impressions); invalidate() bumps the generation number embedded in the
+keys, which orphans every cached partial of that aggregation.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+GENERATION_KEY = 'daily_partials:{}:generation'
+
+
+class DailyPartials:
+    """
+    Cached per-day partials of one aggregation.
+
+    compute(first_day, last_day, **scope) returns {day: partial} for the
+    days with data in first_day..last_day; settled_until() returns the
+    first day whose partial may still change (default: today).
+    """
+
+    def __init__(self, name, compute, settled_until=None):
+        self.name = name
+        self.compute = compute
+        self.settled_until = settled_until or timezone.localdate
+
+    def generation(self):
+        return cache.get_or_set(GENERATION_KEY.format(self.name), 1, None)
+
+    def invalidate(self):
+        """Orphan every cached partial (rows of settled days were deleted)"""
+        try:
+            cache.incr(GENERATION_KEY.format(self.name))
+        except ValueError:
+            cache.set(GENERATION_KEY.format(self.name), 2, None)
+
+    def key(self, day, scope, generation):
+        parts = ':'.join(f'{name}={scope[name]}' for name in sorted(scope))
+        return f'daily_partials:{self.name}:{generation}:{parts}:{day.isoformat()}'
+
+    def days(self, first_day, last_day, **scope):
+        """{day: partial} for first_day..last_day (days without data get {})"""
+        days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+        settled = self.settled_until()
+        closed = [day for day in days if day < settled]
+        live = [day for day in days if day >= settled]
+
+        generation = self.generation()
+        keys = {self.key(day, scope, generation): day for day in closed}
+        partials = {keys[key]: partial for key, partial in cache.get_many(keys).items()}
+
+        missing = [day for day in closed if day not in partials]
+        if missing:
+            computed = self.compute(missing[0], missing[-1], **scope)
+            fresh = {day: computed.get(day, {}) for day in missing}
+            cache.set_many(
+                {self.key(day, scope, generation): partial for day, partial in fresh.items()},
+                settings.DAILY_PARTIALS_TIMEOUT,
+            )
+            partials.update(fresh)
+
+        if live:
+            computed = self.compute(live[0], live[-1], **scope)
+            partials.update({day: computed.get(day, {}) for day in live})
+
+        return {day: partials[day] for day in days}
+
+
+def merge(partials):
+    """Sum partials key by key (nested dicts included)"""
+    total = {}
+    for partial in partials:
+        _add(total, partial)
+    return total
+
+
+def _add(total, partial):
+    for key, value in partial.items():
+        if isinstance(value, dict):
+            _add(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
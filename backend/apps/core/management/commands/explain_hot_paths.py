@@ -0,0 +1,232 @@
+"""
+Comando para auditar os índices dos endpoints mais acessados
+
+Popula (dentro de uma transação descartada ao final) um volume grande de
+impressões, sessões, pesquisas de rota, estatísticas diárias, notícias e
+eventos, roda ANALYZE, chama cada endpoint quente capturando as consultas
+e executa EXPLAIN em cada uma. Falha se alguma delas fizer Seq Scan numa
+das tabelas grandes.
+"""
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from apps.advertising.models import AdCreative, AdImpression, Advertiser, Campaign
+from apps.analytics.models import DailyStats
+from apps.content.models import Event, News
+from apps.navigation.models import RouteSearch
+from apps.tenants.models import City
+from apps.totems.models import ContentBlock, Totem, TotemSession
+
+# Tables that must never be read sequentially by a hot endpoint
+LARGE_MODELS = [AdImpression, TotemSession, RouteSearch, DailyStats, News, Event]
+
+SEED_SQL = {
+    AdImpression: """
+        INSERT INTO {table} (creative_id, totem_id, displayed_at, duration_viewed)
+        SELECT (%(creatives)s::int[])[1 + (g * 7919) %% cardinality(%(creatives)s::int[])],
+               (%(totems)s::int[])[1 + (g * 104729) %% cardinality(%(totems)s::int[])],
+               now() - (g %% %(days)s) * interval '1 day' - ((g * 7919) %% 86400) * interval '1 second',
+               g %% 30
+        FROM generate_series(1, %(rows)s) g
+    """,
+    TotemSession: """
+        INSERT INTO {table} (totem_id, session_id, started_at, ended_at, language, interactions_count)
+        SELECT (%(totems)s::int[])[1 + (g * 104729) %% cardinality(%(totems)s::int[])],
+               'seed-' || g,
+               now() - (g %% %(days)s) * interval '1 day' - ((g * 7919) %% 86400) * interval '1 second',
+               now() - (g %% %(days)s) * interval '1 day' - ((g * 7919) %% 86400 - 120) * interval '1 second',
+               'pt-BR', g %% 20
+        FROM generate_series(1, %(rows)s) g
+    """,
+    RouteSearch: """
+        INSERT INTO {table} (totem_id, origin_lat, origin_lng, destination_lat, destination_lng,
+                             destination_name, transport_mode, distance_meters, duration_seconds, searched_at)
+        SELECT (%(totems)s::int[])[1 + (g * 104729) %% cardinality(%(totems)s::int[])],
+               -22.9, -43.1, -22.9 + (g %% 500) / 10000.0, -43.1 + (g %% 700) / 10000.0,
+               'Destino ' || (g %% 500), 'foot-walking', g %% 5000, g %% 3600,
+               now() - (g %% %(days)s) * interval '1 day' - ((g * 7919) %% 86400) * interval '1 second'
+        FROM generate_series(1, %(rows)s) g
+    """,
+    DailyStats: """
+        INSERT INTO {table} (totem_id, date, sessions_count, interactions_count,
+                             routes_searched, avg_session_duration, peak_hour)
+        SELECT t, current_date - d, d %% 50, d %% 300, d %% 20, 60 + d %% 120, d %% 24
+        FROM unnest(%(totems)s::int[]) t, generate_series(0, %(days)s - 1) d
+    """,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Roda EXPLAIN nas consultas dos endpoints quentes e falha se houver Seq Scan em tabela grande'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000,
+                            help='Impressões a gerar; sessões e pesquisas proporcionais (padrão: 200000)')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Dias de histórico gerado (padrão: 365)')
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Usa os dados já existentes no banco (ex.: generate_load_fixture)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('O EXPLAIN deste comando requer PostgreSQL')
+
+        violations, checked = [], 0
+        try:
+            with transaction.atomic():
+                if options['no_seed']:
+                    targets = self.existing_targets()
+                else:
+                    targets = self.seed(options['rows'], options['days'])
+                with connection.cursor() as cursor:
+                    for model in LARGE_MODELS:
+                        cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+                for name, url, queries in self.run_endpoints(targets):
+                    for sql, params in queries:
+                        checked += 1
+                        scans = self.seq_scans(sql, params)
+                        status = self.style.ERROR('Seq Scan: ' + ', '.join(scans)) if scans else 'ok'
+                        self.stdout.write(f'  {name:<22} {status}')
+                        if scans:
+                            violations.append((name, url, scans, sql))
+                raise Rollback
+        except Rollback:
+            pass
+
+        if violations:
+            for name, url, scans, sql in violations:
+                self.stderr.write(f'\n{name} ({url}) faz Seq Scan em {", ".join(scans)}:\n{sql}')
+            raise CommandError(f'{len(violations)} de {checked} consulta(s) com Seq Scan em tabela grande')
+        self.stdout.write(self.style.SUCCESS(f'{checked} consulta(s) sem Seq Scan em tabela grande'))
+
+    def seed(self, rows, days):
+        self.stdout.write(f'Gerando {rows} impressões em {days} dias...')
+        now = timezone.now()
+        cities = [
+            City.objects.create(name=f'Auditoria {i}', slug=f'auditoria-indices-{i}', state='RJ',
+                                latitude=Decimal('-22.9'), longitude=Decimal('-43.1'))
+            for i in range(5)
+        ]
+        totems = Totem.objects.bulk_create([
+            Totem(city=city, name=f'Totem {city.pk}-{i}', identifier=f'AUDIT-{city.pk}-{i}',
+                  address='Rua', neighborhood='Centro', latitude=Decimal('-22.9'), longitude=Decimal('-43.1'))
+            for city in cities for i in range(40)
+        ])
+        ContentBlock.objects.bulk_create([
+            ContentBlock(totem=totem, position=position, block_type='news', is_active=position != 4)
+            for totem in totems for position in (1, 2, 3, 4)
+        ])
+        campaigns = []
+        for city in cities:
+            advertiser = Advertiser.objects.create(city=city, name=f'Anunciante {city.pk}')
+            campaigns += Campaign.objects.bulk_create([
+                Campaign(advertiser=advertiser, name=f'Campanha {i}', status=('active', 'ended', 'draft')[i % 3],
+                         start_date=now - timedelta(days=30 * (i % 12) + 30), end_date=now + timedelta(days=30 - 10 * (i % 6)))
+                for i in range(20)
+            ])
+        creatives = AdCreative.objects.bulk_create([
+            AdCreative(campaign=campaign, name=f'Criativo {i}', ad_type='image', file='ads/audit.jpg', order=i)
+            for campaign in campaigns for i in range(5)
+        ])
+        for city in cities:
+            News.objects.bulk_create([
+                News(city=city, title=f'Notícia {i}', content='Texto', publish_at=now - timedelta(hours=i),
+                     is_published=i % 10 != 0, expires_at=now + timedelta(days=1) if i % 7 == 0 else None)
+                for i in range(rows // 100)
+            ], batch_size=1000)
+            Event.objects.bulk_create([
+                Event(city=city, title=f'Evento {i}', start_date=now + timedelta(hours=i - rows // 200),
+                      end_date=now + timedelta(hours=i + 2 - rows // 200), is_published=i % 10 != 0)
+                for i in range(rows // 100)
+            ], batch_size=1000)
+
+        params = {
+            'totems': [totem.pk for totem in totems],
+            'creatives': [creative.pk for creative in creatives],
+            'days': days,
+        }
+        with connection.cursor() as cursor:
+            for model, rows_factor in ((AdImpression, 1), (TotemSession, 0.5), (RouteSearch, 0.25), (DailyStats, 0)):
+                sql = SEED_SQL[model].format(table=connection.ops.quote_name(model._meta.db_table))
+                cursor.execute(sql, {**params, 'rows': int(rows * rows_factor)})
+
+        campaign = next(campaign for campaign in campaigns if campaign.advertiser.city_id == cities[0].pk)
+        return {'city': cities[0].pk, 'totem': totems[0].pk, 'campaign': campaign.pk}
+
+    def existing_targets(self):
+        impression = AdImpression.objects.select_related('totem', 'creative').order_by('-id').first()
+        if impression is None:
+            raise CommandError('Nenhuma impressão no banco; rode sem --no-seed')
+        return {
+            'city': impression.totem.city_id,
+            'totem': impression.totem_id,
+            'campaign': impression.creative.campaign_id,
+        }
+
+    def endpoints(self, city, totem, campaign):
+        return [
+            ('eventos', '/api/v1/content/events/'),
+            ('eventos próximos', '/api/v1/content/events/upcoming/'),
+            ('notícias', '/api/v1/content/news/'),
+            ('anúncios ativos', f'/api/v1/advertising/active/?totem_id={totem}'),
+            ('impressões', f'/api/v1/advertising/impressions/?totem={totem}'),
+            ('impressões criativo', f'/api/v1/advertising/impressions/?campaign={campaign}&days=30'),
+            ('stats anúncios', '/api/v1/advertising/stats/?days=30'),
+            ('stats campanha', f'/api/v1/advertising/stats/campaign/{campaign}/?days=30'),
+            ('stats diárias', '/api/v1/advertising/stats/daily/?days=30&exact=true'),
+            ('sessões', f'/api/v1/totems/sessions/?totem={totem}'),
+            ('pesquisas de rota', f'/api/v1/navigation/searches/?totem={totem}'),
+            ('blocos do totem', f'/api/v1/totems/blocks/by_totem/?totem_id={totem}'),
+            ('dashboard', '/api/v1/analytics/dashboard/?days=30'),
+        ]
+
+    def run_endpoints(self, targets):
+        user = get_user_model().objects.create_user(username='auditoria-indices', password=None)
+        client = Client(HTTP_X_CITY_ID=str(targets['city']))
+        client.force_login(user)
+
+        # No cache: every request must reach the database
+        no_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=no_cache, RESPONSE_CACHE_ENABLED=False, ALLOWED_HOSTS=['*']):
+            for name, url in self.endpoints(**targets):
+                queries = []
+
+                def capture(execute, sql, params, many, context):
+                    if sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                        queries.append((sql, params))
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(capture):
+                    response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'{name} ({url}) respondeu {response.status_code}')
+                yield name, url, queries
+
+    def seq_scans(self, sql, params):
+        watched = {model._meta.db_table for model in LARGE_MODELS}
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        found = []
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in watched:
+                found.append(node['Relation Name'])
+            nodes.extend(node.get('Plans', []))
+        return found
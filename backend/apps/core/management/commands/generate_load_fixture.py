@@ -0,0 +1,341 @@
+"""
+Comando para gerar uma massa de dados sintética para testes de carga
+
+Cria N cidades com milhares de totems, anunciantes, campanhas, criativos,
+conteúdo (notícias, eventos, POIs) e dezenas de milhões de impressões,
+sessões e pesquisas de rota. Os dados são reprodutíveis: a mesma --seed e
+a mesma --end-date geram exatamente os mesmos registros.
+
+Distribuições:
+- horários seguem a curva diária de uso (madrugada vazia, picos no almoço
+  e no fim da tarde) no fuso da cidade;
+- totems, criativos e destinos têm popularidade de cauda longa (Zipf), como
+  numa frota real;
+- sessões duram em média ~90 s, com mais interações nas longas.
+
+As tabelas grandes são carregadas com COPY em blocos; cidades, totems,
+campanhas e conteúdo com bulk_create. Tudo que o comando cria usa slugs e
+identificadores com o prefixo "carga-", removidos com --reset.
+"""
+import csv
+import io
+import random
+import time
+from bisect import bisect
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import accumulate
+from zoneinfo import ZoneInfo
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.advertising.models import AdCreative, AdImpression, Advertiser, Campaign
+from apps.analytics.models import DailyStats, PopularDestination
+from apps.content.models import Category, Event, News, PointOfInterest
+from apps.navigation.models import RouteSearch
+from apps.tenants.models import City
+from apps.totems.models import Totem, TotemSession
+
+PREFIX = 'carga-'
+
+CITIES = [
+    ('Niterói', 'RJ', -22.8833, -43.1033), ('Rio de Janeiro', 'RJ', -22.9068, -43.1729),
+    ('São Gonçalo', 'RJ', -22.8268, -43.0634), ('Maricá', 'RJ', -22.9194, -42.8186),
+    ('Petrópolis', 'RJ', -22.5050, -43.1786), ('São Paulo', 'SP', -23.5505, -46.6333),
+    ('Campinas', 'SP', -22.9099, -47.0626), ('Belo Horizonte', 'MG', -19.9167, -43.9345),
+    ('Curitiba', 'PR', -25.4284, -49.2733), ('Salvador', 'BA', -12.9777, -38.5016),
+    ('Recife', 'PE', -8.0476, -34.8770), ('Porto Alegre', 'RS', -30.0346, -51.2177),
+]
+NEIGHBORHOODS = ['Centro', 'Icaraí', 'Ingá', 'São Francisco', 'Charitas', 'Santa Rosa', 'Fonseca', 'Barreto']
+
+# Relative use of the totems per local hour (0h..23h)
+HOURLY = [1, 1, 1, 1, 1, 2, 4, 8, 12, 14, 15, 17, 20, 19, 16, 15, 16, 19, 21, 17, 12, 8, 4, 2]
+
+LANGUAGES = (['pt-BR', 'en', 'es'], list(accumulate([85, 10, 5])))
+TRANSPORT_MODES = (['foot-walking', 'driving-car', 'cycling-regular', 'public-transport'],
+                   list(accumulate([55, 25, 8, 12])))
+# Meters per second by transport mode
+SPEEDS = {'foot-walking': 1.3, 'driving-car': 8.0, 'cycling-regular': 4.2, 'public-transport': 5.5}
+
+
+def zipf_weights(count, exponent=1.1):
+    """Cumulative weights of a long-tail popularity over `count` items"""
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = 'Gera dados sintéticos reprodutíveis em escala (cidades, totems, campanhas, impressões, sessões, rotas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador (padrão: 42)')
+        parser.add_argument('--end-date', type=date.fromisoformat, default=date.today() - timedelta(days=1),
+                            help='Último dia dos dados (AAAA-MM-DD; padrão: ontem)')
+        parser.add_argument('--days', type=int, default=90, help='Dias de histórico (padrão: 90)')
+        parser.add_argument('--cities', type=int, default=5, help='Cidades (padrão: 5)')
+        parser.add_argument('--totems', type=int, default=2000, help='Totems no total (padrão: 2000)')
+        parser.add_argument('--campaigns', type=int, default=300, help='Campanhas no total (padrão: 300)')
+        parser.add_argument('--content', type=int, default=500,
+                            help='Notícias, eventos e POIs por cidade, de cada (padrão: 500)')
+        parser.add_argument('--impressions', type=int, default=10_000_000, help='Impressões (padrão: 10 milhões)')
+        parser.add_argument('--sessions', type=int, default=5_000_000, help='Sessões (padrão: 5 milhões)')
+        parser.add_argument('--route-searches', type=int, default=2_000_000,
+                            help='Pesquisas de rota (padrão: 2 milhões)')
+        parser.add_argument('--chunk', type=int, default=100_000, help='Linhas por COPY (padrão: 100000)')
+        parser.add_argument('--rollup', action='store_true',
+                            help='Calcula DailyStats do período ao final')
+        parser.add_argument('--reset', action='store_true',
+                            help=f'Remove os dados gerados anteriormente (prefixo "{PREFIX}") antes de gerar')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('O carregamento via COPY requer PostgreSQL')
+        for name in ('days', 'cities', 'totems', 'campaigns'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} deve ser maior que zero')
+
+        self.rng = random.Random(options['seed'])
+        self.chunk = options['chunk']
+        self.end = datetime.combine(options['end_date'] + timedelta(days=1), datetime.min.time(), tzinfo=dt_timezone.utc)
+        self.days = options['days']
+        self.hourly = list(accumulate(HOURLY))
+
+        if options['reset']:
+            self.reset()
+
+        started = time.monotonic()
+        with transaction.atomic():
+            cities = self.create_cities(options['cities'])
+            totems = self.create_totems(cities, options['totems'])
+            creatives = self.create_campaigns(cities, options['campaigns'])
+            destinations = self.create_content(cities, options['content'])
+
+            self.copy(AdImpression, ['creative_id', 'totem_id', 'displayed_at', 'duration_viewed'],
+                      self.impressions(totems, creatives), options['impressions'])
+            self.copy(TotemSession, ['totem_id', 'session_id', 'started_at', 'ended_at', 'language', 'interactions_count'],
+                      self.sessions(totems), options['sessions'])
+            self.copy(RouteSearch, ['totem_id', 'origin_lat', 'origin_lng', 'destination_lat', 'destination_lng',
+                                    'destination_name', 'transport_mode', 'distance_meters', 'duration_seconds',
+                                    'searched_at'],
+                      self.route_searches(totems, destinations), options['route_searches'])
+
+        with connection.cursor() as cursor:
+            for model in (AdImpression, TotemSession, RouteSearch):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+        if options['rollup']:
+            from apps.analytics.rollup import rollup_range
+
+            self.stdout.write('Calculando DailyStats...')
+            first_day = options['end_date'] - timedelta(days=self.days)
+            rollup_range(first_day, options['end_date'] + timedelta(days=1), chunk_days=7)
+
+        self.stdout.write(self.style.SUCCESS(f'Massa de dados gerada em {time.monotonic() - started:.0f} s'))
+
+    # Dimensions
+
+    def reset(self):
+        self.stdout.write('Removendo dados gerados anteriormente...')
+        cities = list(City.objects.filter(slug__startswith=PREFIX).values_list('id', flat=True))
+        if not cities:
+            return
+        # Fact tables first, in SQL: a cascading ORM delete would load every row
+        totems = f'SELECT id FROM {Totem._meta.db_table} WHERE city_id = ANY(%s)'
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in (AdImpression, TotemSession, RouteSearch, DailyStats):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f'DELETE FROM {table} WHERE totem_id IN ({totems})', [cities])
+            PopularDestination.objects.filter(city_id__in=cities).delete()
+            City.objects.filter(id__in=cities).delete()
+
+    def create_cities(self, count):
+        cities = []
+        for index in range(count):
+            name, state, lat, lng = CITIES[index % len(CITIES)]
+            if index >= len(CITIES):
+                name = f'{name} {index // len(CITIES) + 1}'
+            cities.append(City(
+                name=name, slug=f'{PREFIX}{index}', state=state,
+                latitude=Decimal(str(lat)), longitude=Decimal(str(lng)),
+                timezone='America/Sao_Paulo', available_languages=['pt-BR', 'en', 'es'],
+            ))
+        cities = City.objects.bulk_create(cities)
+        self.stdout.write(f'{len(cities)} cidade(s)')
+        return cities
+
+    def create_totems(self, cities, count):
+        rng = self.rng
+        totems = []
+        for index in range(count):
+            city = cities[index % len(cities)]
+            totems.append(Totem(
+                city=city, name=f'Totem {index + 1:05d}', identifier=f'{PREFIX}{index + 1:06d}',
+                address=f'Rua {rng.randint(1, 300)}, {rng.randint(1, 2000)}',
+                neighborhood=rng.choice(NEIGHBORHOODS),
+                latitude=self.jitter(city.latitude, 0.05), longitude=self.jitter(city.longitude, 0.05),
+            ))
+        totems = Totem.objects.bulk_create(totems, batch_size=1000)
+        self.stdout.write(f'{len(totems)} totem(s)')
+        return totems
+
+    def create_campaigns(self, cities, count):
+        """Campaigns spread over the period; returns {city id: (creatives, cumulative weights)}"""
+        rng = self.rng
+        advertisers = Advertiser.objects.bulk_create([
+            Advertiser(city=city, name=f'Anunciante {city.pk}-{index}', contact_email=f'anunciante{index}@example.com')
+            for city in cities for index in range(max(1, count // len(cities) // 5))
+        ])
+        start = self.end - timedelta(days=self.days)
+        campaigns = []
+        for index in range(count):
+            begins = start + timedelta(days=rng.uniform(-30, self.days))
+            ends = begins + timedelta(days=rng.choice([7, 14, 30, 60, 90]))
+            status = 'active' if begins <= self.end <= ends else ('ended' if ends < self.end else 'scheduled')
+            if rng.random() < 0.05:
+                status = rng.choice(['draft', 'paused'])
+            campaigns.append(Campaign(
+                advertiser=advertisers[index % len(advertisers)], name=f'Campanha {index + 1}',
+                status=status, start_date=begins, end_date=ends,
+            ))
+        campaigns = Campaign.objects.bulk_create(campaigns, batch_size=1000)
+
+        creatives = AdCreative.objects.bulk_create([
+            AdCreative(
+                campaign=campaign, name=f'{campaign.name} - {number + 1}',
+                ad_type='video' if rng.random() < 0.3 else 'image',
+                file=f'ads/carga/{campaign.pk}-{number + 1}.jpg', duration=rng.choice([5, 10, 15, 30]), order=number,
+            )
+            for campaign in campaigns for number in range(rng.randint(1, 6))
+        ], batch_size=1000)
+        self.stdout.write(f'{len(campaigns)} campanha(s), {len(creatives)} criativo(s)')
+
+        by_city = {}
+        for creative in creatives:
+            by_city.setdefault(creative.campaign.advertiser.city_id, []).append(creative)
+        for city_id, items in by_city.items():
+            self.rng.shuffle(items)
+            by_city[city_id] = (items, zipf_weights(len(items), 0.8))
+        return by_city
+
+    def create_content(self, cities, count):
+        """News, events and POIs; returns {city id: (POIs, cumulative weights)} as route destinations"""
+        rng = self.rng
+        destinations = {}
+        for city in cities:
+            categories = Category.objects.bulk_create([
+                Category(city=city, name=name, slug=slugname, order=order)
+                for order, (name, slugname) in enumerate([('Cultura', 'cultura'), ('Lazer', 'lazer'),
+                                                          ('Gastronomia', 'gastronomia'), ('Esporte', 'esporte')])
+            ])
+            News.objects.bulk_create([
+                News(city=city, category=rng.choice(categories), title=f'Notícia {index + 1}',
+                     content='Conteúdo da notícia. ' * rng.randint(5, 40),
+                     publish_at=self.end - timedelta(hours=rng.uniform(0, 24 * self.days)),
+                     is_published=rng.random() < 0.95)
+                for index in range(count)
+            ], batch_size=1000)
+            events = []
+            for index in range(count):
+                begins = self.end + timedelta(hours=rng.uniform(-24 * 30, 24 * 60))
+                events.append(Event(
+                    city=city, category=rng.choice(categories), title=f'Evento {index + 1}', venue='Teatro Municipal',
+                    start_date=begins, end_date=begins + timedelta(hours=rng.choice([2, 3, 4, 24])),
+                    is_published=rng.random() < 0.95,
+                ))
+            Event.objects.bulk_create(events, batch_size=1000)
+            pois = PointOfInterest.objects.bulk_create([
+                PointOfInterest(city=city, category=rng.choice(categories), name=f'Ponto {index + 1}',
+                                poi_type=rng.choice(PointOfInterest.POI_TYPES)[0], address='Endereço',
+                                latitude=self.jitter(city.latitude, 0.08), longitude=self.jitter(city.longitude, 0.08))
+                for index in range(count)
+            ], batch_size=1000)
+            destinations[city.pk] = (pois, zipf_weights(len(pois)))
+        self.stdout.write(f'{count * len(cities)} notícia(s), evento(s) e POI(s) de cada')
+        return destinations
+
+    def jitter(self, value, spread):
+        return (Decimal(value) + Decimal(str(round(self.rng.uniform(-spread, spread), 7)))).quantize(Decimal('1e-7'))
+
+    # Facts (generators of CSV rows)
+
+    def moment(self, offset):
+        """Random instant in the period following the daily usage curve (UTC)"""
+        rng = self.rng
+        day = rng.randrange(self.days)
+        hour = bisect(self.hourly, rng.random() * self.hourly[-1])
+        seconds = hour * 3600 + rng.randrange(3600)
+        return self.end - timedelta(days=day + 1, seconds=-seconds) - offset
+
+    def prepare(self, totems):
+        order = list(totems)
+        self.rng.shuffle(order)
+        anchor = self.end.replace(tzinfo=None)
+        offsets = {
+            city_id: ZoneInfo(timezone_name).utcoffset(anchor)
+            for city_id, timezone_name in City.objects.filter(
+                id__in={totem.city_id for totem in totems}
+            ).values_list('id', 'timezone')
+        }
+        return order, zipf_weights(len(order), 0.7), offsets
+
+    def impressions(self, totems, creatives):
+        rng = self.rng
+        order, weights, offsets = self.prepare(totems)
+        while True:
+            for totem in rng.choices(order, cum_weights=weights, k=self.chunk):
+                items, item_weights = creatives.get(totem.city_id, ((), ()))
+                if not items:
+                    continue
+                creative = items[bisect(item_weights, rng.random() * item_weights[-1])]
+                displayed_at = self.moment(offsets[totem.city_id])
+                viewed = min(creative.duration, max(1, int(rng.gauss(creative.duration * 0.8, 3))))
+                yield creative.pk, totem.pk, displayed_at.isoformat(), viewed
+
+    def sessions(self, totems):
+        rng = self.rng
+        order, weights, offsets = self.prepare(totems)
+        number = 0
+        while True:
+            for totem in rng.choices(order, cum_weights=weights, k=self.chunk):
+                number += 1
+                started_at = self.moment(offsets[totem.city_id])
+                duration = min(1800, int(rng.expovariate(1 / 90)) + 5)
+                language = rng.choices(LANGUAGES[0], cum_weights=LANGUAGES[1])[0]
+                interactions = max(1, int(duration / rng.uniform(8, 20)))
+                yield (totem.pk, f'{PREFIX}{totem.pk}-{number}', started_at.isoformat(),
+                       (started_at + timedelta(seconds=duration)).isoformat(), language, interactions)
+
+    def route_searches(self, totems, destinations):
+        rng = self.rng
+        order, weights, offsets = self.prepare(totems)
+        while True:
+            for totem in rng.choices(order, cum_weights=weights, k=self.chunk):
+                pois, poi_weights = destinations[totem.city_id]
+                poi = pois[bisect(poi_weights, rng.random() * poi_weights[-1])]
+                mode = rng.choices(TRANSPORT_MODES[0], cum_weights=TRANSPORT_MODES[1])[0]
+                # Straight line distance (~111 km per degree) plus detours
+                distance = int(111_000 * float(abs(poi.latitude - totem.latitude) + abs(poi.longitude - totem.longitude))
+                               * rng.uniform(1.1, 1.4)) + 50
+                searched_at = self.moment(offsets[totem.city_id])
+                yield (totem.pk, totem.latitude, totem.longitude, poi.latitude, poi.longitude, poi.name,
+                       mode, distance, int(distance / SPEEDS[mode]), searched_at.isoformat())
+
+    def copy(self, model, columns, rows, total):
+        """COPY `total` rows from the generator into the model's table, a chunk at a time"""
+        table = connection.ops.quote_name(model._meta.db_table)
+        sql = f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)'
+        written = 0
+        started = time.monotonic()
+        with connection.cursor() as cursor:
+            while written < total:
+                size = min(self.chunk, total - written)
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for _ in range(size):
+                    writer.writerow(next(rows))
+                buffer.seek(0)
+                cursor.copy_expert(sql, buffer)
+                written += size
+                if written % (self.chunk * 10) == 0 or written == total:
+                    rate = written / max(time.monotonic() - started, 1e-6)
+                    self.stdout.write(f'  {model._meta.verbose_name_plural}: {written}/{total} ({rate:,.0f} linhas/s)')
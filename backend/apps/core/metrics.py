@@ -0,0 +1,244 @@
+"""
+Request-level performance metrics (Prometheus)
+
+MetricsMiddleware measures every request and, once it is answered, records
+under its route (URL name) and city (X-City-ID):
+
+- latency, response size, and a request count by method and status class;
+- SQL statements and time (connection.execute_wrapper);
+- cache hits and misses (InstrumentedRedisCache, see core/cache.py);
+- time waiting on OpenRouteService and OpenWeather (the services wrap
+  their calls in upstream()).
+
+While a request runs, its numbers are summed in a RequestStats held in a
+context variable; they become metric observations when it ends, a handful
+per request, so the middleware can stay on in production. Requests slower
+than SLOW_REQUEST_THRESHOLD seconds are logged with their statements
+grouped and sorted by time.
+
+Served at /metrics. Under gunicorn, PROMETHEUS_MULTIPROC_DIR makes every
+worker write its samples there and /metrics aggregate them (see
+gunicorn.conf.py).
+"""
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connection
+
+MULTIPROCESS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROCESS_DIR:
+    # Must exist before the first metric is created (e.g. manage.py commands)
+    os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+logger = logging.getLogger(__name__)
+
+METRICS_PATH = '/metrics'
+# Statements kept per request for the slow request log
+MAX_LOGGED_QUERIES = 1000
+# Known city ids are reloaded this often (seconds) to validate the city label
+CITY_REFRESH = 5 * 60
+
+LABELS = ['route', 'city']
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Request latency', LABELS,
+)
+REQUESTS = Counter(
+    'http_requests_total', 'Requests answered', LABELS + ['method', 'status'],
+)
+RESPONSE_BYTES = Histogram(
+    'http_response_size_bytes', 'Response body size', LABELS,
+    buckets=[256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, float('inf')],
+)
+SQL_QUERIES = Histogram(
+    'http_request_sql_queries', 'SQL statements per request', LABELS,
+    buckets=[0, 1, 2, 5, 10, 20, 50, 100, 200, 500, float('inf')],
+)
+SQL_SECONDS = Histogram(
+    'http_request_sql_duration_seconds', 'Time in SQL statements per request', LABELS,
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache reads by result (hit/miss)', LABELS + ['result'],
+)
+UPSTREAM_SECONDS = Histogram(
+    'upstream_request_duration_seconds', 'Calls to external APIs', ['service', 'outcome'] + LABELS,
+)
+
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+_current = ContextVar('request_stats', default=None)
+_cities = {'expires': 0.0, 'ids': frozenset()}
+
+
+def fingerprint(sql):
+    """Statement with IN lists collapsed, so the same query with other ids matches"""
+    return IN_LIST.sub('(...)', sql)
+
+
+class RequestStats:
+    """What one request spent, summed while it runs"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.queries = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.upstream = []
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sql_count += 1
+            self.sql_seconds += elapsed
+            if len(self.queries) < MAX_LOGGED_QUERIES:
+                self.queries.append((sql, elapsed))
+
+    def breakdown(self, limit=10):
+        """[(statement, count, seconds)] grouped by fingerprint, slowest first"""
+        grouped = defaultdict(lambda: [0, 0.0])
+        for sql, elapsed in self.queries:
+            entry = grouped[fingerprint(sql)]
+            entry[0] += 1
+            entry[1] += elapsed
+        ranked = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, count, seconds) for sql, (count, seconds) in ranked[:limit]]
+
+
+def cache_access(hits, misses):
+    """Count cache reads of the current request (called by the cache backend)"""
+    stats = _current.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+    else:
+        if hits:
+            CACHE_REQUESTS.labels('', '', 'hit').inc(hits)
+        if misses:
+            CACHE_REQUESTS.labels('', '', 'miss').inc(misses)
+
+
+@contextmanager
+def upstream(service):
+    """Time a call to an external API: with upstream('openweather'): ..."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        elapsed = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None:
+            stats.upstream.append((service, outcome, elapsed))
+        else:
+            # Celery tasks (e.g. weather prewarm)
+            UPSTREAM_SECONDS.labels(service, outcome, '', '').observe(elapsed)
+
+
+def city_label(value):
+    """X-City-ID if it's a known city ('' without one), so the label stays bounded"""
+    if not value:
+        return ''
+    if not value.isdigit():
+        return 'other'
+    now = time.monotonic()
+    if now >= _cities['expires']:
+        from apps.tenants.models import City
+
+        try:
+            _cities['ids'] = frozenset(str(pk) for pk in City.objects.values_list('id', flat=True))
+        except DatabaseError:
+            pass
+        _cities['expires'] = now + CITY_REFRESH
+    return value if value in _cities['ids'] else 'other'
+
+
+def record(request, response, stats):
+    elapsed = time.perf_counter() - stats.started
+    match = request.resolver_match
+    route = match.view_name if match else 'unmatched'
+    city = city_label(request.headers.get('X-City-ID'))
+
+    REQUEST_SECONDS.labels(route, city).observe(elapsed)
+    REQUESTS.labels(route, city, request.method, f'{response.status_code // 100}xx').inc()
+    if not response.streaming:
+        RESPONSE_BYTES.labels(route, city).observe(len(response.content))
+    SQL_QUERIES.labels(route, city).observe(stats.sql_count)
+    SQL_SECONDS.labels(route, city).observe(stats.sql_seconds)
+    if stats.cache_hits:
+        CACHE_REQUESTS.labels(route, city, 'hit').inc(stats.cache_hits)
+    if stats.cache_misses:
+        CACHE_REQUESTS.labels(route, city, 'miss').inc(stats.cache_misses)
+    for service, outcome, seconds in stats.upstream:
+        UPSTREAM_SECONDS.labels(service, outcome, route, city).observe(seconds)
+
+    threshold = settings.SLOW_REQUEST_THRESHOLD
+    if threshold and elapsed >= threshold:
+        log_slow_request(request, response, route, city, elapsed, stats)
+
+
+def log_slow_request(request, response, route, city, elapsed, stats):
+    upstream = defaultdict(float)
+    for service, _, seconds in stats.upstream:
+        upstream[service] += seconds
+    lines = [
+        f'{count:>5}x {seconds * 1000:>8.1f} ms  {sql[:300]}'
+        for sql, count, seconds in stats.breakdown()
+    ]
+    logger.warning(
+        'Slow request %s %s -> %s (%s, city %s): %.0f ms; %d queries in %.0f ms; '
+        'cache %d hits, %d misses; upstream %s\n%s',
+        request.method, request.get_full_path(), response.status_code, route, city or '-',
+        elapsed * 1000, stats.sql_count, stats.sql_seconds * 1000,
+        stats.cache_hits, stats.cache_misses,
+        ', '.join(f'{service} {seconds * 1000:.0f} ms' for service, seconds in upstream.items()) or '-',
+        '\n'.join(lines),
+    )
+
+
+class MetricsMiddleware:
+    """Measure every request (see module docstring); goes first in MIDDLEWARE"""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == METRICS_PATH:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            with connection.execute_wrapper(stats.execute):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        record(request, response, stats)
+        return response
+
+
+def exposition():
+    """Body and content type of the /metrics response"""
+    registry = REGISTRY
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
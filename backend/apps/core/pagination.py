@@ -0,0 +1,170 @@
+"""
+Keyset (cursor) pagination
+
+Large, append-mostly tables (impressions, sessions, route searches, news)
+are paged on their natural sort key plus the primary key as tie-breaker:
+each page is a `WHERE (key, id) < (last key, last id) ORDER BY key, id
+LIMIT n` that walks an index on (key, id), so page 1000 costs the same as
+page 1. COUNT(*) is only run when the client asks for it (?count=true).
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Subclasses set `ordering` to the sort key followed by the primary key,
+    both in the same direction, e.g. ('-displayed_at', '-id'). The key
+    fields must not be nullable.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = queryset.count()
+
+        ordering = self.reversed_ordering() if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        # One extra row tells whether there is another page in this direction
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    # Ordering helpers
+
+    @staticmethod
+    def field_name(term):
+        return term.lstrip('-')
+
+    def reversed_ordering(self):
+        return tuple(term[1:] if term.startswith('-') else f'-{term}' for term in self.ordering)
+
+    def after(self, ordering, position):
+        """Rows strictly after `position` in `ordering` (lexicographic)"""
+        first = ordering[0]
+        first_name = self.field_name(first)
+        # Bound on the leading column so the index range scan starts at the cursor
+        condition = Q(**{f'{first_name}__{"lte" if first.startswith("-") else "gte"}': position[0]})
+
+        after = Q()
+        for index, term in enumerate(ordering):
+            lookup = 'lt' if term.startswith('-') else 'gt'
+            step = Q(**{f'{self.field_name(term)}__{lookup}': position[index]})
+            for previous, value in zip(ordering[:index], position):
+                step &= Q(**{self.field_name(previous): value})
+            after |= step
+        return condition & after
+
+    def position_of(self, obj):
+        values = []
+        for term in self.ordering:
+            value = getattr(obj, self.field_name(term))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    # Cursor encoding
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            position = data['p']
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            for index, value in enumerate(position):
+                if isinstance(value, str) and parse_datetime(value) is not None:
+                    position[index] = parse_datetime(value)
+            return position, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError, json.JSONDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(data.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.position_of(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.position_of(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class DisplayedAtPagination(KeysetPagination):
+    ordering = ('-displayed_at', '-id')
+
+
+class SearchedAtPagination(KeysetPagination):
+    ordering = ('-searched_at', '-id')
+
+
+class StartedAtPagination(KeysetPagination):
+    ordering = ('-started_at', '-id')
+
+
+class PublishAtPagination(KeysetPagination):
+    ordering = ('-publish_at', '-id')
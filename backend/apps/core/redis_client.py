@@ -0,0 +1,41 @@
+"""
+Shared Redis connection for what the cache API can't express (hash
+counters, sorted sets, scripts). Uses the same server as the cache.
+"""
+import redis
+from django.conf import settings
+from redis.exceptions import ResponseError
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def pending_batches(key, size):
+    """
+    Take the pending values of a hash and yield them in lists of up to
+    `size` (field, value) pairs to be written to the database
+
+    The hash is moved to <key>:flushing first, so new values keep coming in
+    meanwhile. Each batch is removed from it once the caller asks for the
+    next one, i.e. after it was written: when a flush fails halfway, the
+    next one retries only the batches left, before taking new values.
+    """
+    client = get_redis()
+    flushing = f'{key}:flushing'
+    if not client.exists(flushing):
+        try:
+            client.rename(key, flushing)
+        except ResponseError:
+            # Nothing pending (RENAME of a missing key is an error)
+            return
+    items = list(client.hgetall(flushing).items())
+    for i in range(0, len(items), size):
+        batch = items[i:i + size]
+        yield batch
+        client.hdel(flushing, *[field for field, _ in batch])
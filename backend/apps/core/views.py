@@ -1,8 +1,15 @@
 """Core Views - Health checks and utilities"""
+import os
 from rest_framework import views, permissions
 from rest_framework.response import Response
+from django.conf import settings
 from django.db import connection
 from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, HttpResponseNotModified
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
 
 class HealthCheckView(views.APIView):
     permission_classes = [permissions.AllowAny]
@@ -37,3 +44,76 @@ class APIInfoView(views.APIView):
                 'weather': '/api/v1/weather/',
             }
         })
+
+
+def serve_immutable_media(request, path):
+    """
+    Serve content-addressed media (media/cas/...). The name is the SHA-256 of
+    the bytes, so the response never changes and can be cached for a year.
+    Streamed with FileResponse (sendfile under gunicorn) rather than read
+    into memory by django.views.static.serve, which is meant for DEBUG.
+    """
+    from apps.content.storage import media_storage
+
+    etag = '"%s"' % os.path.splitext(os.path.basename(path))[0]
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        try:
+            response = FileResponse(open(media_storage.path(path), 'rb'))
+        except (SuspiciousFileOperation, OSError):
+            raise Http404('Arquivo não encontrado')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+
+def serve_resized_media(request, width, height, path):
+    """
+    Serve /media/r/<w>x<h>/<path>: the image fitted into one of the allowed
+    sizes, generated on first request and kept in the derivative cache.
+    The format follows the Accept header (AVIF/WebP when supported).
+    """
+    from apps.content.derivatives import DerivativeCache, SOURCE_EXTENSIONS, allowed_sizes
+    from apps.content.storage import is_content_addressed
+
+    size = (int(width), int(height))
+    if size not in allowed_sizes() or os.path.splitext(path)[1].lower() not in SOURCE_EXTENSIONS:
+        raise Http404('Tamanho ou arquivo não suportado')
+
+    derivatives = DerivativeCache()
+    try:
+        if not os.path.isfile(derivatives.source_path(path)):
+            raise Http404('Arquivo não encontrado')
+        file_path, content_type = derivatives.get(path, size, request.headers.get('Accept', ''))
+    except SuspiciousFileOperation:
+        raise Http404('Arquivo não encontrado')
+    except OSError:
+        raise Http404('Imagem inválida')
+
+    etag = '"%s"' % os.path.splitext(os.path.basename(file_path))[0]
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+    response['ETag'] = etag
+    response['Vary'] = 'Accept'
+    if is_content_addressed(path):
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_RESIZE_MAX_AGE}'
+    return response
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint (see core/metrics.py). It lists every route,
+    the city IDs and upstream timings, so it is closed unless a bearer
+    token is configured (or METRICS_PUBLIC is set on purpose).
+    """
+    if not settings.METRICS_PUBLIC:
+        token = settings.METRICS_TOKEN
+        if not token or not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponseForbidden()
+    body, content_type = metrics.exposition()
+    return HttpResponse(body, content_type=content_type)
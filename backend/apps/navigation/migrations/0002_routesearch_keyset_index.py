@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation', '0001_initial'),
+        ('totems', '0007_totemsession_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='routesearch',
+            index=models.Index(fields=['searched_at', 'id'], name='routesearch_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:53
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built without locking writes on the (large) tables
+    atomic = False
+
+    dependencies = [
+        ('navigation', '0002_routesearch_keyset_index'),
+        ('totems', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='routesearch',
+            index=models.Index(fields=['totem', 'searched_at'], name='routesearch_totem_idx'),
+        ),
+    ]
@@ -3,6 +3,7 @@ Navigation Models and Route Service
 """
 from django.db import models
 from django.conf import settings
+from apps.core import metrics
 from apps.tenants.models import City
 from apps.totems.models import Totem
 import httpx
@@ -31,13 +32,16 @@ class RouteSearch(models.Model):
         verbose_name = 'Pesquisa de Rota'
         verbose_name_plural = 'Pesquisas de Rotas'
         ordering = ['-searched_at']
+        indexes = [
+            # Keyset pagination (see core/pagination.py)
+            models.Index(fields=['searched_at', 'id'], name='routesearch_keyset_idx'),
+            models.Index(fields=['totem', 'searched_at'], name='routesearch_totem_idx'),
+        ]
 
 
 class RouteService:
     """Service for route calculations using OpenRouteService"""
     
-    BASE_URL = "https://api.openrouteservice.org"
-    
     PROFILE_MAP = {
         'walking': 'foot-walking',
         'driving': 'driving-car',
@@ -46,6 +50,7 @@ class RouteService:
     
     def __init__(self):
         self.api_key = settings.OPENROUTESERVICE_API_KEY
+        self.base_url = settings.OPENROUTESERVICE_URL
     
     def get_route(self, origin: tuple, destination: tuple, mode: str = 'walking') -> dict:
         """
@@ -70,7 +75,7 @@ class RouteService:
         ]
 
         # Use GeoJSON endpoint for coordinates in response
-        url = f"{self.BASE_URL}/v2/directions/{profile}/geojson"
+        url = f"{self.base_url}/v2/directions/{profile}/geojson"
         headers = {
             'Authorization': self.api_key,
             'Content-Type': 'application/json'
@@ -84,7 +89,8 @@ class RouteService:
 
         try:
             with httpx.Client() as client:
-                response = client.post(url, json=body, headers=headers, timeout=10.0)
+                with metrics.upstream('openrouteservice'):
+                    response = client.post(url, json=body, headers=headers, timeout=10.0)
                 response.raise_for_status()
                 data = response.json()
 
@@ -137,7 +143,7 @@ class RouteService:
         Returns:
             List of matching places
         """
-        url = f"{self.BASE_URL}/geocode/search"
+        url = f"{self.base_url}/geocode/search"
         headers = {'Authorization': self.api_key}
         params = {
             'text': query,
@@ -152,7 +158,8 @@ class RouteService:
         
         try:
             with httpx.Client() as client:
-                response = client.get(url, params=params, headers=headers, timeout=10.0)
+                with metrics.upstream('openrouteservice'):
+                    response = client.get(url, params=params, headers=headers, timeout=10.0)
                 response.raise_for_status()
                 data = response.json()
                 
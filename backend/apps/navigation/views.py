@@ -1,9 +1,16 @@
 """Navigation Views"""
-from rest_framework import views, permissions, status
+import logging
+
+from redis.exceptions import RedisError
+from rest_framework import generics, serializers, views, permissions, status
 from rest_framework.response import Response
 from .models import RouteService, RouteSearch
+from apps.analytics import destinations
+from apps.core.pagination import SearchedAtPagination
 from apps.totems.models import Totem
 
+logger = logging.getLogger(__name__)
+
 
 class RouteView(views.APIView):
     """Calculate route between two points"""
@@ -57,6 +64,12 @@ class RouteView(views.APIView):
                 )
             except Totem.DoesNotExist:
                 pass
+            else:
+                # Popularity counts are best-effort, the route was already found
+                try:
+                    destinations.record_search(totem.city_id, dest_name, dest_lat, dest_lng)
+                except RedisError:
+                    logger.exception('Could not count route search of totem %s', totem.id)
         
         return Response(result)
 
@@ -135,3 +148,38 @@ class QRCodeView(views.APIView):
             'qr_code': f"data:image/png;base64,{qr_base64}",
             'maps_url': maps_url
         })
+
+
+class RouteSearchSerializer(serializers.ModelSerializer):
+    totem_name = serializers.CharField(source='totem.name', read_only=True)
+
+    class Meta:
+        model = RouteSearch
+        fields = [
+            'id', 'totem', 'totem_name', 'origin_lat', 'origin_lng',
+            'destination_lat', 'destination_lng', 'destination_name',
+            'transport_mode', 'distance_meters', 'duration_seconds', 'searched_at'
+        ]
+
+
+class RouteSearchListView(generics.ListAPIView):
+    """
+    Route search log, newest first, paged by cursor on (searched_at, id)
+    GET /api/v1/navigation/searches/?totem=&mode=&count=true
+    """
+    serializer_class = RouteSearchSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = SearchedAtPagination
+
+    def get_queryset(self):
+        queryset = RouteSearch.objects.select_related('totem')
+        city_id = self.request.headers.get('X-City-ID')
+        if city_id:
+            queryset = queryset.filter(totem__city_id=city_id)
+        totem_id = self.request.query_params.get('totem')
+        if totem_id:
+            queryset = queryset.filter(totem_id=totem_id)
+        mode = self.request.query_params.get('mode')
+        if mode:
+            queryset = queryset.filter(transport_mode=mode)
+        return queryset
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:10
+
+import apps.content.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('totems', '0005_contentblock_video'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contentblock',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=apps.content.storage.get_media_storage, upload_to='totems/blocks/', verbose_name='Imagem'),
+        ),
+        migrations.AlterField(
+            model_name='contentblock',
+            name='video',
+            field=models.FileField(blank=True, help_text='Arquivo de vídeo para blocos do tipo "video" (MP4 recomendado)', null=True, storage=apps.content.storage.get_media_storage, upload_to='totems/blocks/videos/', verbose_name='Vídeo'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('totems', '0006_contentblock_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='totemsession',
+            index=models.Index(fields=['started_at', 'id'], name='totemsession_keyset_idx'),
+        ),
+    ]
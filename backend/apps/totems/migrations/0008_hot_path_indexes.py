@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:53
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are built without locking writes on the (large) tables
+    atomic = False
+
+    dependencies = [
+        ('totems', '0007_totemsession_keyset_index'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='totemsession',
+            index=models.Index(fields=['totem', 'started_at'], name='totemsession_totem_idx'),
+        ),
+    ]
@@ -4,6 +4,7 @@ Totem Models
 from django.db import models
 from django.contrib.gis.db import models as gis_models
 from apps.tenants.models import City
+from apps.content.storage import get_media_storage
 
 
 class Totem(models.Model):
@@ -86,6 +87,11 @@ class TotemSession(models.Model):
         verbose_name = 'Sessão do Totem'
         verbose_name_plural = 'Sessões dos Totems'
         ordering = ['-started_at']
+        indexes = [
+            # Keyset pagination (see core/pagination.py)
+            models.Index(fields=['started_at', 'id'], name='totemsession_keyset_idx'),
+            models.Index(fields=['totem', 'started_at'], name='totemsession_totem_idx'),
+        ]
 
     def __str__(self):
         return f"Session {self.session_id} - {self.totem.name}"
@@ -123,8 +129,8 @@ class ContentBlock(models.Model):
     text_color = models.CharField('Cor do Texto', max_length=50, blank=True, default='#000000')
 
     # Content
-    image = models.ImageField('Imagem', upload_to='totems/blocks/', null=True, blank=True)
-    video = models.FileField('Vídeo', upload_to='totems/blocks/videos/', null=True, blank=True,
+    image = models.ImageField('Imagem', upload_to='totems/blocks/', storage=get_media_storage, null=True, blank=True)
+    video = models.FileField('Vídeo', upload_to='totems/blocks/videos/', storage=get_media_storage, null=True, blank=True,
                              help_text='Arquivo de vídeo para blocos do tipo "video" (MP4 recomendado)')
     content_html = models.TextField('Conteúdo HTML', blank=True, default='',
                                     help_text='HTML personalizado para blocos do tipo "custom"')
@@ -2,24 +2,33 @@
 Totem Serializers
 """
 from rest_framework import serializers
+from apps.content.serializers import MediaVariantsMixin, MediaVideoMixin, MediaVariantsListSerializer
 from .models import Totem, TotemSession, ContentBlock
 
 
-class ContentBlockSerializer(serializers.ModelSerializer):
+class ContentBlockSerializer(MediaVariantsMixin, MediaVideoMixin, serializers.ModelSerializer):
     position_display = serializers.CharField(source='get_position_display', read_only=True)
     block_type_display = serializers.CharField(source='get_block_type_display', read_only=True)
     image = serializers.ImageField(required=False, allow_null=True)
     video = serializers.FileField(required=False, allow_null=True)
+    image_variants = serializers.SerializerMethodField(method_name='get_variants')
+    image_srcset = serializers.SerializerMethodField(method_name='get_srcset')
+    image_best = serializers.SerializerMethodField(method_name='get_best')
+    video_renditions = serializers.SerializerMethodField(method_name='get_video')
 
     class Meta:
         model = ContentBlock
         fields = [
             'id', 'totem', 'position', 'position_display', 'block_type', 'block_type_display',
             'title', 'subtitle', 'background_color', 'text_color',
-            'image', 'video', 'content_html', 'link_url', 'config',
+            'image', 'image_variants', 'image_srcset', 'image_best',
+            'video', 'video_renditions', 'content_html', 'link_url', 'config',
             'is_active', 'order', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        list_serializer_class = MediaVariantsListSerializer
+        variants_source = 'image'
+        videos_source = 'video'
 
 
 class TotemSerializer(serializers.ModelSerializer):
@@ -0,0 +1,147 @@
+"""
+Totem session tracking
+
+Starting a session inserts its TotemSession row; everything after that
+happens in Redis. Each interaction bumps a pending counter and pushes the
+session's inactivity deadline (Totem.session_timeout) forward, ending a
+session records its end time, and both are written to the database in
+batches by flush_sessions. Sessions whose deadline passes without an
+explicit end are closed by the same job, ended at their last activity.
+
+Redis keys (session primary keys as fields/members):
+    totem_sessions:timeouts      hash  open session -> timeout (s)
+    totem_sessions:deadlines     zset  open session -> inactivity deadline
+    totem_sessions:interactions  hash  session -> interactions not flushed yet
+    totem_sessions:ended         hash  session -> end time not flushed yet
+"""
+import logging
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Case, DateTimeField, F, IntegerField, When
+
+from apps.core.redis_client import get_redis, pending_batches
+from .models import TotemSession
+
+logger = logging.getLogger(__name__)
+
+TIMEOUTS_KEY = 'totem_sessions:timeouts'
+DEADLINES_KEY = 'totem_sessions:deadlines'
+INTERACTIONS_KEY = 'totem_sessions:interactions'
+ENDED_KEY = 'totem_sessions:ended'
+
+# Rows per UPDATE when flushing
+FLUSH_BATCH = 500
+# Expired sessions closed per sweep
+SWEEP_BATCH = 1000
+
+# KEYS: timeouts, deadlines, interactions; ARGV: session, now, count
+INTERACTION_SCRIPT = """
+local timeout = redis.call('HGET', KEYS[1], ARGV[1])
+if not timeout then
+    return 0
+end
+redis.call('HINCRBY', KEYS[3], ARGV[1], ARGV[3])
+redis.call('ZADD', KEYS[2], tonumber(ARGV[2]) + tonumber(timeout), ARGV[1])
+return 1
+"""
+
+# KEYS: timeouts, deadlines, ended; ARGV: session, ended at, [max deadline]
+# With a max deadline (sweeper) the session is only closed if it hasn't
+# been touched since it was picked.
+END_SCRIPT = """
+if ARGV[3] then
+    local deadline = redis.call('ZSCORE', KEYS[2], ARGV[1])
+    if not deadline or tonumber(deadline) > tonumber(ARGV[3]) then
+        return 0
+    end
+end
+if redis.call('HDEL', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+return 1
+"""
+
+
+def new_session_id(totem_id):
+    return f'{totem_id}-{uuid.uuid4().hex}'
+
+
+def start(session, timeout):
+    """Register a just-created TotemSession as open"""
+    now = time.time()
+    pipe = get_redis().pipeline()
+    pipe.hset(TIMEOUTS_KEY, session.pk, timeout)
+    pipe.zadd(DEADLINES_KEY, {session.pk: now + timeout})
+    pipe.execute()
+
+
+def interact(session_pk, count=1):
+    """Count interactions on an open session; False if it isn't open"""
+    client = get_redis()
+    opened = client.eval(
+        INTERACTION_SCRIPT, 3, TIMEOUTS_KEY, DEADLINES_KEY, INTERACTIONS_KEY,
+        session_pk, time.time(), count,
+    )
+    return bool(opened)
+
+
+def end(session_pk, ended_at=None, max_deadline=None):
+    """Close an open session; False if it was already closed (or unknown)"""
+    args = [session_pk, ended_at or time.time()]
+    if max_deadline is not None:
+        args.append(max_deadline)
+    closed = get_redis().eval(END_SCRIPT, 3, TIMEOUTS_KEY, DEADLINES_KEY, ENDED_KEY, *args)
+    return bool(closed)
+
+
+def is_open(session_pk):
+    return bool(get_redis().hexists(TIMEOUTS_KEY, session_pk))
+
+
+def sweep(now=None):
+    """Close sessions past their inactivity deadline, ended at their last activity"""
+    now = now or time.time()
+    client = get_redis()
+    expired = client.zrangebyscore(DEADLINES_KEY, '-inf', now, start=0, num=SWEEP_BATCH, withscores=True)
+    if not expired:
+        return 0
+    timeouts = client.hmget(TIMEOUTS_KEY, [member for member, _ in expired])
+    closed = 0
+    for (member, deadline), timeout in zip(expired, timeouts):
+        last_activity = deadline - float(timeout or 0)
+        closed += end(member.decode(), ended_at=last_activity, max_deadline=deadline)
+    return closed
+
+
+def flush():
+    """
+    Write pending interaction counts and end times to TotemSession in
+    batched UPDATEs. Returns (sessions updated with interactions, ended).
+    """
+    interactions = 0
+    for batch in pending_batches(INTERACTIONS_KEY, FLUSH_BATCH):
+        counts = {int(pk): int(count) for pk, count in batch}
+        interactions += TotemSession.objects.filter(id__in=counts).update(
+            interactions_count=F('interactions_count') + Case(
+                *[When(id=pk, then=count) for pk, count in counts.items()],
+                output_field=IntegerField(),
+            )
+        )
+
+    ended = 0
+    for batch in pending_batches(ENDED_KEY, FLUSH_BATCH):
+        ended_at = {int(pk): datetime.fromtimestamp(float(ts), tz=dt_timezone.utc) for pk, ts in batch}
+        ended += TotemSession.objects.filter(id__in=ended_at, ended_at__isnull=True).update(
+            ended_at=Case(
+                *[When(id=pk, then=value) for pk, value in ended_at.items()],
+                output_field=DateTimeField(),
+            )
+        )
+
+    if interactions or ended:
+        logger.info('Flushed %s session counters and %s session ends', interactions, ended)
+    return interactions, ended
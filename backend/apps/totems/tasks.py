@@ -0,0 +1,20 @@
+"""
+Totem background tasks
+"""
+from celery import shared_task
+from django.core.cache import cache
+
+from . import sessions
+
+
+@shared_task
+def flush_sessions():
+    """Close abandoned sessions, then write pending counters and ends"""
+    if not cache.add('totem_sessions:flush_lock', 1, 5 * 60):
+        return None
+    try:
+        closed = sessions.sweep()
+        interactions, ended = sessions.flush()
+        return {'closed': closed, 'interactions': interactions, 'ended': ended}
+    finally:
+        cache.delete('totem_sessions:flush_lock')
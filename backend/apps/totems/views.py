@@ -5,6 +5,8 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.utils import timezone
 
+from apps.core.pagination import StartedAtPagination
+from . import sessions
 from .models import Totem, TotemSession, ContentBlock
 from .serializers import TotemSerializer, TotemSessionSerializer, ContentBlockSerializer
 
@@ -58,7 +60,19 @@ class TotemSessionViewSet(viewsets.ModelViewSet):
     queryset = TotemSession.objects.all()
     serializer_class = TotemSessionSerializer
     permission_classes = [permissions.AllowAny]  # Permitir criar sessões sem auth
-    
+    pagination_class = StartedAtPagination
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        city_id = self.request.headers.get('X-City-ID')
+        if city_id:
+            queryset = queryset.filter(totem__city_id=city_id)
+        totem_id = self.request.query_params.get('totem')
+        if totem_id:
+            queryset = queryset.filter(totem_id=totem_id)
+        return queryset
+
     def create(self, request, *args, **kwargs):
         totem_id = request.data.get('totem')
         language = request.data.get('language', 'pt-BR')
@@ -74,12 +88,35 @@ class TotemSessionViewSet(viewsets.ModelViewSet):
         session = TotemSession.objects.create(
             totem=totem,
             language=language,
-            session_id=str(totem.id) + '-' + str(int(__import__('time').time()))
+            session_id=sessions.new_session_id(totem.id)
         )
+        sessions.start(session, totem.session_timeout)
 
         serializer = self.get_serializer(session)
         return Response(serializer.data, status=201)
 
+    @action(detail=True, methods=['post'])
+    def interaction(self, request, pk=None):
+        """
+        Count taps on an open session (Redis only, flushed in batches).
+        Accepts {"count": n} so the totem can batch taps.
+        """
+        try:
+            count = min(max(int(request.data.get('count', 1)), 1), 100)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid count'}, status=400)
+
+        if not sessions.interact(pk, count):
+            return Response({'error': 'Session is not open'}, status=409)
+        return Response({'status': 'ok'})
+
+    @action(detail=True, methods=['post'])
+    def end(self, request, pk=None):
+        """End an open session (written to the database by the next flush)"""
+        if not sessions.end(pk):
+            return Response({'status': 'already ended'})
+        return Response({'status': 'ended'})
+
 
 class ContentBlockViewSet(viewsets.ModelViewSet):
     """Manage content blocks for totems"""
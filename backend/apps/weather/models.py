@@ -4,6 +4,7 @@ Weather Models and Service
 from django.db import models
 from django.conf import settings
 from django.core.cache import cache
+from apps.core import metrics
 from apps.tenants.models import City
 import httpx
 from datetime import datetime
@@ -71,11 +72,11 @@ class WeatherAlert(models.Model):
 class WeatherService:
     """Service for fetching weather data from OpenWeather"""
     
-    BASE_URL = "https://api.openweathermap.org/data/2.5"
     CACHE_TTL = 600  # 10 minutes
     
     def __init__(self):
         self.api_key = settings.OPENWEATHER_API_KEY
+        self.base_url = settings.OPENWEATHER_URL
     
     def get_current(self, city: City) -> dict:
         """Get current weather for a city"""
@@ -84,7 +85,7 @@ class WeatherService:
         if cached:
             return cached
         
-        url = f"{self.BASE_URL}/weather"
+        url = f"{self.base_url}/weather"
         params = {
             'lat': float(city.latitude),
             'lon': float(city.longitude),
@@ -95,7 +96,8 @@ class WeatherService:
         
         try:
             with httpx.Client() as client:
-                response = client.get(url, params=params, timeout=10.0)
+                with metrics.upstream('openweather'):
+                    response = client.get(url, params=params, timeout=10.0)
                 response.raise_for_status()
                 data = response.json()
                 
@@ -122,7 +124,7 @@ class WeatherService:
         if cached:
             return cached
         
-        url = f"{self.BASE_URL}/forecast"
+        url = f"{self.base_url}/forecast"
         params = {
             'lat': float(city.latitude),
             'lon': float(city.longitude),
@@ -134,7 +136,8 @@ class WeatherService:
         
         try:
             with httpx.Client() as client:
-                response = client.get(url, params=params, timeout=10.0)
+                with metrics.upstream('openweather'):
+                    response = client.get(url, params=params, timeout=10.0)
                 response.raise_for_status()
                 data = response.json()
                 
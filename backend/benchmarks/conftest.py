@@ -0,0 +1,212 @@
+"""
+API endpoint benchmarks
+
+Every endpoint a totem or the admin hits often is called against a small
+generate_load_fixture dataset (plus playlists and content blocks), with
+caches off so each request does all of its database work. For each one:
+
+- pytest-benchmark times the whole request (min/median/max per round);
+- a few profiled calls record the query count, ORM time, SQL time and
+  serialization time (see profiling.py);
+
+and both are compared with benchmarks/baseline.json. The test fails when
+the endpoint runs more queries than the baseline (a new N+1 in a
+serializer, a lost select_related...), listing the repeated statements,
+or when a time grows beyond --time-tolerance (and --time-floor ms).
+
+    pip install -r benchmarks/requirements.txt
+    pytest benchmarks                       # compare with the baseline
+    pytest benchmarks --update-baseline     # record the current numbers
+    pytest benchmarks -k advertising --benchmark-autosave
+
+An endpoint missing from the baseline fails until it is recorded. Query
+counts don't depend on the machine, and the shipped baseline has only
+those; times do, so they are compared once recorded with --update-baseline
+on the machine that runs the suite (the CI runner). The baseline is
+updated in the same commit as an intended change.
+"""
+import io
+import json
+import statistics
+from pathlib import Path
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, override_settings
+
+from apps.advertising.models import AdCreative, Campaign
+from apps.content.models import Playlist, PlaylistItem
+from apps.totems.models import ContentBlock, Totem, TotemSession
+from .profiling import Profile
+
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+# Small but with every relation populated; same seed, same rows
+DATASET = {
+    'seed': 42, 'days': 30, 'cities': 2, 'totems': 40, 'campaigns': 12, 'content': 60,
+    'impressions': 30_000, 'sessions': 10_000, 'route_searches': 5_000, 'rollup': True,
+}
+PROFILED_ROUNDS = 5
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('api benchmarks')
+    group.addoption('--update-baseline', action='store_true',
+                    help='Write the measured numbers to benchmarks/baseline.json instead of comparing')
+    group.addoption('--time-tolerance', type=float, default=0.5,
+                    help='Relative growth allowed for the times (default: 0.5, i.e. +50%%)')
+    group.addoption('--time-floor', type=float, default=5.0,
+                    help='Time growth under this many ms is never a regression (default: 5)')
+    group.addoption('--rounds', type=int, default=20, help='Timed rounds per endpoint (default: 20)')
+
+
+class Baseline:
+
+    def __init__(self, config):
+        self.update = config.getoption('update_baseline')
+        self.tolerance = config.getoption('time_tolerance')
+        self.floor = config.getoption('time_floor')
+        self.entries = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+        self.measured = {}
+
+    def check(self, name, result, profile):
+        self.measured[name] = result
+        expected = self.entries.get(name)
+        if self.update:
+            return []
+        if expected is None:
+            # New endpoints can't skip the gate
+            return ['not in benchmarks/baseline.json, record it with --update-baseline']
+
+        problems = []
+        if result['queries'] > expected['queries']:
+            problems.append(f'{result["queries"]} queries (baseline {expected["queries"]})')
+            problems += [f'    {count}x {sql}' for sql, count in profile.repeated()]
+        for key in ('median_ms', 'orm_ms', 'sql_ms', 'serialize_ms'):
+            before, now = expected.get(key), result[key]
+            if before is not None and now is not None and now > before * (1 + self.tolerance) and now - before > self.floor:
+                problems.append(f'{key} {now:.1f} (baseline {before:.1f}, +{now / before - 1:.0%})')
+        return problems
+
+    def save(self):
+        entries = {**self.entries, **self.measured}
+        BASELINE.write_text(json.dumps(dict(sorted(entries.items())), indent=2) + '\n')
+
+
+def pytest_configure(config):
+    config._api_baseline = Baseline(config)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    baseline = session.config._api_baseline
+    if baseline.update and baseline.measured:
+        baseline.save()
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        call_command('generate_load_fixture', stdout=io.StringIO(), **DATASET)
+        populate_screens()
+
+
+def populate_screens():
+    """Playlists and content blocks, which the load fixture doesn't create"""
+    for city_id in Totem.objects.values_list('city_id', flat=True).distinct():
+        playlist = Playlist.objects.create(city_id=city_id, name='Programação padrão', is_default=True)
+        PlaylistItem.objects.bulk_create([
+            PlaylistItem(playlist=playlist, item_type=item_type, name=item_type, order=order,
+                         image='playlist/carga.jpg' if item_type == 'image' else None)
+            for order, item_type in enumerate(['image', 'news', 'events', 'image', 'clock', 'image'])
+        ])
+    ContentBlock.objects.bulk_create([
+        ContentBlock(totem=totem, position=position, block_type='news')
+        for totem in Totem.objects.all() for position in (1, 2, 3, 4)
+    ])
+
+
+@pytest.fixture(scope='session')
+def targets(django_db_setup, django_db_blocker):
+    """Ids the endpoint URLs (and bodies) are formatted with"""
+    with django_db_blocker.unblock():
+        creative = AdCreative.objects.filter(campaign__status='active').order_by('id').first()
+        campaign = Campaign.objects.get(pk=creative.campaign_id)
+        totem = Totem.objects.filter(city_id=campaign.advertiser.city_id).order_by('id').first()
+        session = TotemSession.objects.filter(totem=totem).order_by('-id').first()
+        return {
+            'city': totem.city_id,
+            'totem': totem.pk,
+            'identifier': totem.identifier,
+            'campaign': campaign.pk,
+            'creative': creative.pk,
+            'playlist': Playlist.objects.filter(city_id=totem.city_id).values_list('id', flat=True)[0],
+            'session': session.pk,
+        }
+
+
+@pytest.fixture(scope='session', autouse=True)
+def no_caches():
+    # Every request must do all of its work; the metrics middleware's
+    # periodic city lookup would make query counts flaky
+    with override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        RESPONSE_CACHE_ENABLED=False,
+        METRICS_ENABLED=False,
+    ):
+        yield
+
+
+@pytest.fixture
+def api_client(db, targets):
+    user = get_user_model().objects.create_user(username='benchmark', password=None)
+    client = Client(HTTP_X_CITY_ID=str(targets['city']))
+    client.force_login(user)
+    return client
+
+
+@pytest.fixture
+def measure(request, benchmark, api_client, targets):
+    """measure(name, url, method='get', data=None): benchmark one endpoint against the baseline"""
+    baseline = request.config._api_baseline
+    rounds = request.config.getoption('rounds')
+
+    def run(name, url, method='get', data=None):
+        url = url.format(**targets)
+        data = {key: value.format(**targets) for key, value in (data or {}).items()}
+        benchmark.group = name.split('/')[0]
+
+        def call():
+            if method == 'get':
+                return api_client.get(url)
+            return getattr(api_client, method)(url, data, content_type='application/json')
+
+        response = call()
+        assert response.status_code in (200, 201), f'{url}: {response.status_code} {response.content[:200]!r}'
+
+        benchmark.pedantic(call, rounds=rounds, warmup_rounds=1)
+        # No stats with --benchmark-disable
+        timings = benchmark.stats.stats if benchmark.stats else None
+
+        profiles = []
+        for _ in range(PROFILED_ROUNDS):
+            with Profile() as profile:
+                call()
+            profiles.append(profile)
+        result = {
+            'queries': max(profile.summary['queries'] for profile in profiles),
+            'median_ms': timings.median * 1000 if timings else None,
+            **{
+                key: statistics.median(profile.summary[key] for profile in profiles)
+                for key in ('orm_ms', 'sql_ms', 'serialize_ms')
+            },
+        }
+        benchmark.extra_info.update(result)
+
+        worst = max(profiles, key=lambda profile: len(profile.queries))
+        problems = baseline.check(name, result, worst)
+        if problems:
+            pytest.fail(f'{name} ({url}):\n  ' + '\n  '.join(problems), pytrace=False)
+        return result
+
+    return run
@@ -0,0 +1,124 @@
+"""
+Per-request cost breakdown for the endpoint benchmarks
+
+While a Profile is active, the places where a request spends its time
+besides the view logic are timed:
+
+- orm: evaluating querysets (fetching rows, building instances or dicts,
+  prefetches, count/exists/aggregate) and raw SQL, database included;
+- sql: the part of it spent executing statements, with the statements
+  themselves (connection.execute_wrapper);
+- serialize: DRF serializers, the values() read serializers and the JSON
+  renderers.
+
+Times are exclusive: ORM work triggered from a serializer (a lazy relation
+read per item, which is what an N+1 looks like) pauses serialize and
+counts as orm, and its statements as queries.
+"""
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from unittest import mock
+
+from django.db import connection
+from django.db.models.query import QuerySet
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import BaseSerializer
+
+from apps.content.read_serializers import ValuesSerializer
+from apps.core.metrics import fingerprint
+
+# (class, method, category); subclasses that override the method are timed too
+TIMED = [
+    (QuerySet, '_fetch_all', 'orm'),
+    (QuerySet, 'count', 'orm'),
+    (QuerySet, 'exists', 'orm'),
+    (QuerySet, 'aggregate', 'orm'),
+    (BaseSerializer, 'to_representation', 'serialize'),
+    (ValuesSerializer, 'serialize', 'serialize'),
+    (ValuesSerializer, 'to_representation', 'serialize'),
+    (JSONRenderer, 'render', 'serialize'),
+]
+
+
+def _hierarchy(cls):
+    classes, pending = [], [cls]
+    while pending:
+        current = pending.pop()
+        classes.append(current)
+        pending.extend(current.__subclasses__())
+    return classes
+
+
+class Profile:
+    """
+    with Profile() as profile: ...
+    then profile.queries, profile.times (ms per category), profile.sql_ms
+    """
+
+    def __init__(self):
+        self.times = {'orm': 0.0, 'serialize': 0.0}
+        self.queries = []
+        self.sql_ms = 0.0
+        self._stack = []
+        self._patches = ExitStack()
+
+    def __enter__(self):
+        for base, name, category in TIMED:
+            for cls in _hierarchy(base):
+                if name in vars(cls):
+                    self._patches.enter_context(
+                        mock.patch.object(cls, name, self._timed(vars(cls)[name], category))
+                    )
+        self._patches.enter_context(connection.execute_wrapper(self._execute))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._patches.close()
+
+    @property
+    def summary(self):
+        return {
+            'queries': len(self.queries),
+            'orm_ms': self.times['orm'],
+            'sql_ms': self.sql_ms,
+            'serialize_ms': self.times['serialize'],
+        }
+
+    def repeated(self, minimum=2):
+        """Statements run `minimum` times or more, most repeated first"""
+        counts = Counter(fingerprint(sql) for sql in self.queries)
+        return [(sql, count) for sql, count in counts.most_common() if count >= minimum]
+
+    @contextmanager
+    def section(self, category):
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.times[outer[0]] += (now - outer[1]) * 1000
+        self._stack.append([category, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            category, started = self._stack.pop()
+            self.times[category] += (now - started) * 1000
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def _timed(self, method, category):
+        @wraps(method)
+        def timed(*args, **kwargs):
+            with self.section(category):
+                return method(*args, **kwargs)
+        return timed
+
+    def _execute(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        started = time.perf_counter()
+        try:
+            with self.section('orm'):
+                return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - started) * 1000
@@ -0,0 +1,18 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+ENDPOINTS = [
+    ('advertising/active', '/api/v1/advertising/active/?totem_id={totem}'),
+    ('advertising/advertisers', '/api/v1/advertising/advertisers/'),
+    ('advertising/campaigns', '/api/v1/advertising/campaigns/'),
+    ('advertising/campaigns/detail', '/api/v1/advertising/campaigns/{campaign}/'),
+    ('advertising/creatives', '/api/v1/advertising/creatives/?campaign={campaign}'),
+    ('advertising/impressions/totem', '/api/v1/advertising/impressions/?totem={totem}'),
+    ('advertising/impressions/campaign', '/api/v1/advertising/impressions/?campaign={campaign}&days=30'),
+]
+
+
+@pytest.mark.parametrize('name, url', ENDPOINTS, ids=[name for name, _ in ENDPOINTS])
+def test_advertising(measure, name, url):
+    measure(name, url)
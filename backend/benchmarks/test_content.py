@@ -0,0 +1,19 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+ENDPOINTS = [
+    ('content/categories', '/api/v1/content/categories/'),
+    ('content/news', '/api/v1/content/news/'),
+    ('content/news/featured', '/api/v1/content/news/featured/'),
+    ('content/events', '/api/v1/content/events/'),
+    ('content/events/upcoming', '/api/v1/content/events/upcoming/'),
+    ('content/events/featured', '/api/v1/content/events/featured/'),
+    ('content/pois', '/api/v1/content/pois/'),
+    ('content/gallery/active', '/api/v1/content/gallery/active/'),
+]
+
+
+@pytest.mark.parametrize('name, url', ENDPOINTS, ids=[name for name, _ in ENDPOINTS])
+def test_content(measure, name, url):
+    measure(name, url)
@@ -0,0 +1,15 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+ENDPOINTS = [
+    ('playlists/list', '/api/v1/content/playlists/'),
+    ('playlists/detail', '/api/v1/content/playlists/{playlist}/'),
+    ('playlists/current', '/api/v1/content/playlists/current/?totem_id={totem}'),
+    ('playlists/items', '/api/v1/content/playlist-items/?playlist={playlist}'),
+]
+
+
+@pytest.mark.parametrize('name, url', ENDPOINTS, ids=[name for name, _ in ENDPOINTS])
+def test_playlists(measure, name, url):
+    measure(name, url)
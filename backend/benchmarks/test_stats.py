@@ -0,0 +1,16 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+ENDPOINTS = [
+    ('stats/advertising', '/api/v1/advertising/stats/?days=30'),
+    ('stats/campaign', '/api/v1/advertising/stats/campaign/{campaign}/?days=30'),
+    ('stats/daily', '/api/v1/advertising/stats/daily/?days=30&exact=true'),
+    ('stats/dashboard', '/api/v1/analytics/dashboard/?days=30'),
+    ('stats/popular-destinations', '/api/v1/analytics/destinations/popular/'),
+]
+
+
+@pytest.mark.parametrize('name, url', ENDPOINTS, ids=[name for name, _ in ENDPOINTS])
+def test_stats(measure, name, url):
+    measure(name, url)
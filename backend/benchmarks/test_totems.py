@@ -0,0 +1,20 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+ENDPOINTS = [
+    ('totems/list', '/api/v1/totems/'),
+    ('totems/detail', '/api/v1/totems/{totem}/'),
+    ('totems/sessions', '/api/v1/totems/sessions/?totem={totem}'),
+    ('totems/sessions/detail', '/api/v1/totems/sessions/{session}/'),
+    ('totems/blocks/by_totem', '/api/v1/totems/blocks/by_totem/?totem_id={totem}'),
+]
+
+
+@pytest.mark.parametrize('name, url', ENDPOINTS, ids=[name for name, _ in ENDPOINTS])
+def test_totems(measure, name, url):
+    measure(name, url)
+
+
+def test_identify(measure):
+    measure('totems/identify', '/api/v1/totems/identify/', method='post', data={'identifier': '{identifier}'})
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -78,10 +79,12 @@ DATABASES = {
     }
 }
 
+REDIS_URL = config('REDIS_URL', default='redis://redis:6379/0')
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': config('REDIS_URL', default='redis://redis:6379/0'),
+        'BACKEND': 'apps.core.cache.InstrumentedRedisCache',
+        'LOCATION': REDIS_URL,
     }
 }
 
@@ -101,6 +104,20 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Content-addressed media (media/cas/) never changes, cache it for a year
+MEDIA_IMMUTABLE_MAX_AGE = config('MEDIA_IMMUTABLE_MAX_AGE', default=365 * 24 * 60 * 60, cast=int)
+# On-demand resized images (/media/r/<w>x<h>/<path>), evicted LRU above the budget
+MEDIA_DERIVATIVE_ROOT = config('MEDIA_DERIVATIVE_ROOT', default=str(MEDIA_ROOT / '.derivatives'))
+MEDIA_DERIVATIVE_CACHE_BYTES = config('MEDIA_DERIVATIVE_CACHE_BYTES', default=2 * 1024 ** 3, cast=int)
+# Cache lifetime for resized copies of media outside media/cas/ (may be replaced)
+MEDIA_RESIZE_MAX_AGE = config('MEDIA_RESIZE_MAX_AGE', default=7 * 24 * 60 * 60, cast=int)
+# Resumable uploads: chunks are appended to part files here until finalized
+UPLOAD_SESSION_ROOT = config('UPLOAD_SESSION_ROOT', default=str(MEDIA_ROOT / '.uploads'))
+UPLOAD_SESSION_TTL_HOURS = config('UPLOAD_SESSION_TTL_HOURS', default=24, cast=int)
+# Video transcoding (local ffmpeg, run by the media worker)
+FFMPEG_BINARY = config('FFMPEG_BINARY', default='ffmpeg')
+FFPROBE_BINARY = config('FFPROBE_BINARY', default='ffprobe')
+VIDEO_TRANSCODE_TIMEOUT = config('VIDEO_TRANSCODE_TIMEOUT', default=15 * 60, cast=int)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -108,7 +125,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_METHODS = ['DELETE', 'GET', 'OPTIONS', 'PATCH', 'POST', 'PUT']
-CORS_ALLOW_HEADERS = ['accept', 'accept-encoding', 'authorization', 'content-type', 'dnt', 'origin', 'user-agent', 'x-csrftoken', 'x-requested-with', 'x-totem-id', 'x-city-id']
+CORS_ALLOW_HEADERS = ['accept', 'accept-encoding', 'authorization', 'content-type', 'dnt', 'origin', 'user-agent', 'x-csrftoken', 'x-requested-with', 'x-totem-id', 'x-city-id', 'upload-offset']
+CORS_EXPOSE_HEADERS = ['location', 'upload-offset', 'upload-length']
 
 # REST Framework
 REST_FRAMEWORK = {
@@ -134,17 +152,113 @@ SIMPLE_JWT = {
 }
 
 # Celery
-CELERY_BROKER_URL = config('REDIS_URL', default='redis://redis:6379/0')
-CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://redis:6379/0')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+# Media processing runs on its own queue/worker so it can't starve other tasks;
+# tasks that touch files under MEDIA_ROOT go there too, only that worker mounts it
+CELERY_TASK_ROUTES = {
+    'apps.content.tasks.process_image_job': {'queue': 'media'},
+    'apps.content.tasks.process_video_job': {'queue': 'media'},
+    'apps.content.tasks.evict_media_derivatives': {'queue': 'media'},
+    'apps.content.tasks.expire_upload_sessions': {'queue': 'media'},
+}
+CELERY_BEAT_SCHEDULE = {
+    'evict-media-derivatives': {
+        'task': 'apps.content.tasks.evict_media_derivatives',
+        'schedule': 15 * 60,
+    },
+    'prewarm-dynamic-content': {
+        'task': 'apps.content.tasks.prewarm_dynamic_content',
+        'schedule': 2 * 60,
+    },
+    'refresh-visible-content': {
+        'task': 'apps.content.tasks.refresh_visible_content',
+        'schedule': 60,
+    },
+    'fetch-rss-feeds': {
+        'task': 'apps.content.tasks.fetch_due_feeds',
+        'schedule': 60,
+    },
+    'expire-upload-sessions': {
+        'task': 'apps.content.tasks.expire_upload_sessions',
+        'schedule': 60 * 60,
+    },
+    'flush-totem-sessions': {
+        'task': 'apps.totems.tasks.flush_sessions',
+        'schedule': 30,
+    },
+    'rollup-daily-stats': {
+        'task': 'apps.analytics.tasks.rollup_daily_stats',
+        'schedule': 15 * 60,
+    },
+    'flush-destination-counts': {
+        'task': 'apps.analytics.tasks.flush_destination_counts',
+        'schedule': 60,
+    },
+    'export-analytics': {
+        'task': 'apps.analytics.tasks.export_analytics',
+        'schedule': 60 * 60,
+    },
+}
+
+# DailyStats rollup: days touched up to this long before the last run are
+# recomputed (sessions are closed/flushed after they start)
+ANALYTICS_ROLLUP_SETTLE = config('ANALYTICS_ROLLUP_SETTLE', default=6 * 60 * 60, cast=int)
+ANALYTICS_ROLLUP_CHUNK_DAYS = config('ANALYTICS_ROLLUP_CHUNK_DAYS', default=7, cast=int)
+
+# Popular destinations: route searches grouped by coordinate cell (3 decimals ~ 110 m),
+# ranked with exponential decay (half-life in seconds), at most TOP_SIZE per city
+DESTINATION_SNAP_DECIMALS = config('DESTINATION_SNAP_DECIMALS', default=3, cast=int)
+DESTINATION_HALF_LIFE = config('DESTINATION_HALF_LIFE', default=7 * 24 * 60 * 60, cast=int)
+DESTINATION_TOP_SIZE = config('DESTINATION_TOP_SIZE', default=1000, cast=int)
+
+# Per-day partial aggregates of the stats dashboards (closed days don't change)
+DAILY_PARTIALS_TIMEOUT = config('DAILY_PARTIALS_TIMEOUT', default=100 * 24 * 60 * 60, cast=int)
+
+# Days of HyperLogLog sketches of distinct creatives/totems kept (daily ad stats)
+ADVERTISING_SKETCH_DAYS = config('ADVERTISING_SKETCH_DAYS', default=400, cast=int)
+
+# Parquet export for BI, written to its own volume (see docker-compose.yml): a UTC day is
+# exported once it has been closed for ANALYTICS_EXPORT_DELAY seconds; rows are read and
+# written in batches of ANALYTICS_EXPORT_BATCH
+ANALYTICS_EXPORT_ROOT = config('ANALYTICS_EXPORT_ROOT', default=str(BASE_DIR / 'exports'))
+ANALYTICS_EXPORT_DELAY = config('ANALYTICS_EXPORT_DELAY', default=24 * 60 * 60, cast=int)
+ANALYTICS_EXPORT_BATCH = config('ANALYTICS_EXPORT_BATCH', default=50000, cast=int)
+
+# Request metrics (Prometheus at /metrics, see apps/core/metrics.py). /metrics requires
+# "Authorization: Bearer <METRICS_TOKEN>" and answers 403 while no token is set, unless
+# METRICS_PUBLIC is turned on deliberately. Requests slower than SLOW_REQUEST_THRESHOLD
+# seconds are logged with their queries (0 turns it off)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_PUBLIC = config('METRICS_PUBLIC', default=False, cast=bool)
+SLOW_REQUEST_THRESHOLD = config('SLOW_REQUEST_THRESHOLD', default=1.0, cast=float)
+
+# Rendered JSON of the content endpoints, per city (dropped when content changes)
+RESPONSE_CACHE_ENABLED = config('RESPONSE_CACHE_ENABLED', default=True, cast=bool)
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# RSS ingestion (Celery only, totem requests never fetch)
+RSS_FETCH_INTERVAL = config('RSS_FETCH_INTERVAL', default=15 * 60, cast=int)
+RSS_MAX_BACKOFF = config('RSS_MAX_BACKOFF', default=24 * 60 * 60, cast=int)
+RSS_FETCH_TIMEOUT = config('RSS_FETCH_TIMEOUT', default=15, cast=int)
+RSS_FETCH_CONCURRENCY = config('RSS_FETCH_CONCURRENCY', default=8, cast=int)
+RSS_MAX_ITEMS = config('RSS_MAX_ITEMS', default=50, cast=int)
+RSS_MAX_BYTES = config('RSS_MAX_BYTES', default=5 * 1024 * 1024, cast=int)
+# Serve feeds from <dir>/<file name of the feed URL> instead of the network (tests)
+RSS_FIXTURES_DIR = config('RSS_FIXTURES_DIR', default='')
 
 # External APIs
 OPENWEATHER_API_KEY = config('OPENWEATHER_API_KEY', default='')
 OPENROUTESERVICE_API_KEY = config('OPENROUTESERVICE_API_KEY', default='')
+# API base URLs (pointed at the local stubs by the load tests, see loadtest/)
+OPENWEATHER_URL = config('OPENWEATHER_URL', default='https://api.openweathermap.org/data/2.5')
+OPENROUTESERVICE_URL = config('OPENROUTESERVICE_URL', default='https://api.openrouteservice.org')
 
 # Totem settings
 DEFAULT_SESSION_TIMEOUT = config('DEFAULT_SESSION_TIMEOUT', default=120, cast=int)
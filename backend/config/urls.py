@@ -2,10 +2,11 @@
 URL Configuration for Sanaris City Totem
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from apps.core.views import metrics_view, serve_immutable_media, serve_resized_media
 
 urlpatterns = [
     # Admin
@@ -24,6 +25,14 @@ urlpatterns = [
     path('api/v1/weather/', include('apps.weather.urls')),
     path('api/v1/analytics/', include('apps.analytics.urls')),
     path('api/v1/advertising/', include('apps.advertising.urls')),
+
+    # Prometheus metrics (see apps/core/metrics.py)
+    path('metrics', metrics_view, name='metrics'),
+
+    # Content-addressed media (immutable, long cache)
+    re_path(r'^media/(?P<path>cas/.+)$', serve_immutable_media, name='immutable-media'),
+    # On-demand resized images (allow-listed sizes, cached on disk)
+    re_path(r'^media/r/(?P<width>\d+)x(?P<height>\d+)/(?P<path>.+)$', serve_resized_media, name='resized-media'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,24 @@
+"""
+Gunicorn settings (read from the working directory, /app in the image)
+
+With PROMETHEUS_MULTIPROC_DIR set, every worker writes its metric samples
+there and /metrics aggregates them (see apps/core/metrics.py). The
+directory is emptied when the server starts, so counters of a previous
+run don't come back.
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
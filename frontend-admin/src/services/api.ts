@@ -63,7 +63,7 @@ export const navigationService = {
 export const contentService = {
   // News
   getNews: (limit = 10) =>
-    api.get(`/content/news/?limit=${limit}`),
+    api.get(`/content/news/?limit=${limit}&include_hidden=true`),
 
   getFeaturedNews: () =>
     api.get('/content/news/featured/'),
@@ -82,7 +82,7 @@ export const contentService = {
     api.get(`/content/events/upcoming/?limit=${limit}`),
 
   getAllEvents: () =>
-    api.get('/content/events/'),
+    api.get('/content/events/?include_hidden=true'),
 
   getFeaturedEvents: () =>
     api.get('/content/events/featured/'),
@@ -105,7 +105,7 @@ export const contentService = {
     api.get('/content/gallery/active/'),
 
   getAllGallery: () =>
-    api.get('/content/gallery/'),
+    api.get('/content/gallery/?include_hidden=true'),
 
   createGalleryImage: (data: any) =>
     api.post('/content/gallery/', data),
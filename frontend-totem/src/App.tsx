@@ -34,12 +34,18 @@ const HomeSelector: React.FC = () => {
 };
 
 function App() {
-  const { initialize } = useTotemStore();
+  const { initialize, recordInteraction } = useTotemStore();
 
   useEffect(() => {
     initialize();
   }, [initialize]);
 
+  // Every tap on any screen counts as an interaction of the current session
+  useEffect(() => {
+    document.addEventListener('pointerdown', recordInteraction, true);
+    return () => document.removeEventListener('pointerdown', recordInteraction, true);
+  }, [recordInteraction]);
+
   return (
     <BrowserRouter>
       <Routes>
@@ -38,8 +38,10 @@ export const totemService = {
   heartbeat: (id: number) => api.post(`/totems/${id}/heartbeat/`),
   startSession: (totemId: number, language: string) => 
     api.post('/totems/sessions/', { totem: totemId, language }),
+  sessionInteraction: (sessionId: number, count: number = 1) =>
+    api.post(`/totems/sessions/${sessionId}/interaction/`, { count }),
   endSession: (sessionId: number) => 
-    api.patch(`/totems/sessions/${sessionId}/`, { ended_at: new Date().toISOString() }),
+    api.post(`/totems/sessions/${sessionId}/end/`),
 };
 
 export const weatherService = {
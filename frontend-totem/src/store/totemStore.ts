@@ -1,5 +1,23 @@
 import { create } from 'zustand';
-import api from '../services/api';
+import api, { totemService } from '../services/api';
+
+// Taps are counted here and sent to the session in batches; the server
+// takes up to 100 per request
+const INTERACTION_FLUSH_MS = 5000;
+const MAX_INTERACTION_BATCH = 100;
+
+let pendingInteractions = 0;
+let interactionTimer: ReturnType<typeof setTimeout> | null = null;
+
+const takeInteractions = () => {
+  if (interactionTimer) {
+    clearTimeout(interactionTimer);
+    interactionTimer = null;
+  }
+  const count = Math.min(pendingInteractions, MAX_INTERACTION_BATCH);
+  pendingInteractions = 0;
+  return count;
+};
 
 interface TotemInfo {
   id: number;
@@ -25,6 +43,8 @@ interface TotemState {
   initialize: () => Promise<void>;
   setLanguage: (lang: string) => void;
   startSession: () => Promise<void>;
+  recordInteraction: () => void;
+  flushInteractions: () => Promise<void>;
   resetSession: () => void;
 }
 
@@ -79,12 +99,38 @@ export const useTotemStore = create<TotemState>((set, get) => ({
     }
   },
 
+  recordInteraction: () => {
+    if (!get().sessionId) return;
+    pendingInteractions += 1;
+    if (!interactionTimer) {
+      interactionTimer = setTimeout(() => get().flushInteractions(), INTERACTION_FLUSH_MS);
+    }
+  },
+
+  flushInteractions: async () => {
+    const { sessionId } = get();
+    const count = takeInteractions();
+    if (!sessionId || !count) return;
+
+    try {
+      await totemService.sessionInteraction(sessionId, count);
+    } catch (error: any) {
+      // Closed by inactivity on the server: the next taps go to a new session
+      if (error.response?.status === 409 && get().sessionId === sessionId) {
+        set({ sessionId: null });
+        get().startSession();
+      }
+    }
+  },
+
   resetSession: () => {
     const { sessionId } = get();
+    const count = takeInteractions();
     if (sessionId) {
-      api.patch(`/totems/sessions/${sessionId}/`, {
-        ended_at: new Date().toISOString(),
-      }).catch(() => {});
+      const sent = count
+        ? totemService.sessionInteraction(sessionId, count).catch(() => {})
+        : Promise.resolve();
+      sent.then(() => api.post(`/totems/sessions/${sessionId}/end/`).catch(() => {}));
     }
     set({ sessionId: null, language: 'pt-BR' });
     localStorage.setItem('language', 'pt-BR');
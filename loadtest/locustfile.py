@@ -0,0 +1,186 @@
+"""
+Totem fleet load test
+
+Each Locust user is one totem of the fleet behaving like frontend-totem:
+it identifies itself on boot, then keeps polling playlists, ads, weather
+and events, sends heartbeats, logs an impression for every ad it shows,
+and now and then a visitor opens a session, taps around, searches for a
+place and asks for a route. Totems are identified as <prefix>000001..,
+the identifiers made by `manage.py generate_load_fixture`.
+
+Users tick once a second and run whatever is due, so the request rate per
+totem follows the intervals below and not Locust's wait time; the first
+poll of each kind is staggered over its interval, as a real fleet is not
+booted in the same second.
+
+    locust -f loadtest/locustfile.py --host http://localhost:8000 -u 1000 -r 50
+
+(run_fleet.py runs the fleet sizes headless and keeps the reports)
+"""
+import itertools
+import random
+import time
+
+from locust import FastHttpUser, constant, events, task
+from locust.exception import StopUser
+
+# Seconds between polls of each kind (Player.tsx reloads content every 5 minutes)
+POLLS = {
+    'heartbeat': 60,
+    'playlist': 300,
+    'ads': 300,
+    'weather': 300,
+    'upcoming_events': 300,
+}
+
+# Seconds the clock slide stays on screen between ad rotations
+CLOCK_SLIDE = 8
+
+PLACES = ['Praia', 'Museu', 'Hospital', 'Rodoviária', 'Shopping', 'Prefeitura', 'Teatro', 'Parque']
+MODES = ['walking', 'walking', 'walking', 'driving', 'cycling']
+
+_numbers = itertools.count()
+_offset = random.randrange(1_000_000)
+
+
+@events.init_command_line_parser.add_listener
+def _(parser):
+    parser.add_argument('--totem-prefix', default='carga-', help='Prefixo dos identificadores dos totems')
+    parser.add_argument('--totems', type=int, default=2000,
+                        help='Totems existentes no banco; usuários além disso reutilizam os mesmos')
+    parser.add_argument('--visits-per-hour', type=float, default=4,
+                        help='Visitantes (sessões interativas) por totem por hora')
+    parser.add_argument('--geocode-ratio', type=float, default=0.4, help='Visitas que buscam um lugar')
+    parser.add_argument('--route-ratio', type=float, default=0.6, help='Buscas que pedem a rota')
+
+
+class TotemUser(FastHttpUser):
+    wait_time = constant(1)
+
+    def on_start(self):
+        options = self.environment.parsed_options
+        self.options = options
+        # Random start per process, so distributed workers don't all pick the same totems
+        number = (next(_numbers) + _offset) % options.totems + 1
+        identifier = f'{options.totem_prefix}{number:06d}'
+
+        with self.client.post('/api/v1/totems/identify/', json={'identifier': identifier},
+                              name='totems/identify', catch_response=True) as response:
+            if response.status_code != 200:
+                response.failure(f'{identifier}: {response.status_code}')
+                raise StopUser()
+            totem = response.json()
+
+        self.totem_id = totem['id']
+        self.latitude = float(totem['latitude'])
+        self.longitude = float(totem['longitude'])
+        self.headers = {'X-Totem-ID': str(self.totem_id), 'X-City-ID': str(totem['city'])}
+
+        now = time.monotonic()
+        self.due = {name: now + random.uniform(0, interval) for name, interval in POLLS.items()}
+        self.creatives = []
+        self.slide = 0
+        self.next_slide = now
+        self.visit = []
+        self.ads()
+
+    @task
+    def tick(self):
+        now = time.monotonic()
+        for name, interval in POLLS.items():
+            if now >= self.due[name]:
+                self.due[name] = now + interval
+                getattr(self, name)()
+
+        if now >= self.next_slide:
+            self.show_slide(now)
+
+        if self.visit:
+            while self.visit and now >= self.visit[0][0]:
+                _, step = self.visit.pop(0)
+                step()
+        elif random.random() < self.options.visits_per_hour / 3600:
+            self.start_visit(now)
+
+    # Polling
+
+    def get(self, url, name):
+        return self.client.get(url, name=name, headers=self.headers)
+
+    def post(self, url, name, data=None):
+        return self.client.post(url, name=name, json=data or {}, headers=self.headers)
+
+    def heartbeat(self):
+        self.post(f'/api/v1/totems/{self.totem_id}/heartbeat/', 'totems/heartbeat')
+
+    def playlist(self):
+        # 404 when the city has no playlist scheduled is a valid answer
+        with self.client.get(f'/api/v1/content/playlists/current/?totem_id={self.totem_id}',
+                             name='content/playlists/current', headers=self.headers,
+                             catch_response=True) as response:
+            if response.status_code == 404:
+                response.success()
+
+    def ads(self):
+        response = self.get(f'/api/v1/advertising/active/?totem_id={self.totem_id}', 'advertising/active')
+        if response.status_code == 200:
+            self.creatives = [(creative['id'], creative.get('duration') or 8) for creative in response.json()]
+
+    def weather(self):
+        self.get('/api/v1/weather/current/', 'weather/current')
+        self.get('/api/v1/weather/forecast/', 'weather/forecast')
+
+    def upcoming_events(self):
+        self.get('/api/v1/content/events/upcoming/', 'content/events/upcoming')
+
+    def show_slide(self, now):
+        """Rotate clock + ads; every ad that finishes on screen is an impression"""
+        slides = len(self.creatives) + 1
+        self.slide = (self.slide + 1) % slides
+        if self.slide == 0:
+            self.next_slide = now + CLOCK_SLIDE
+            return
+        creative, duration = self.creatives[self.slide - 1]
+        self.next_slide = now + duration
+        self.post(f'/api/v1/advertising/active/{creative}/impression/', 'advertising/impression',
+                  {'totem_id': self.totem_id, 'duration': duration})
+
+    # Visitors
+
+    def start_visit(self, now):
+        response = self.post('/api/v1/totems/sessions/', 'totems/sessions',
+                             {'totem': self.totem_id, 'language': random.choice(['pt-BR', 'pt-BR', 'en', 'es'])})
+        if response.status_code != 201:
+            return
+        session = response.json()['id']
+
+        at = now
+        for _ in range(random.randint(1, 5)):
+            at += random.uniform(3, 15)
+            self.visit.append((at, lambda: self.post(
+                f'/api/v1/totems/sessions/{session}/interaction/', 'totems/sessions/interaction',
+                {'count': random.randint(1, 5)},
+            )))
+        if random.random() < self.options.geocode_ratio:
+            at += random.uniform(5, 20)
+            self.visit.append((at, self.search))
+        at += random.uniform(10, 60)
+        self.visit.append((at, lambda: self.post(f'/api/v1/totems/sessions/{session}/end/', 'totems/sessions/end')))
+
+    def search(self):
+        query = random.choice(PLACES)
+        response = self.get(f'/api/v1/navigation/geocode/?q={query}', 'navigation/geocode')
+        results = response.json().get('results') if response.status_code == 200 else None
+        if not results or random.random() >= self.options.route_ratio:
+            return
+        place = random.choice(results)
+        self.post('/api/v1/navigation/route/', 'navigation/route', {
+            'origin_lat': self.latitude,
+            'origin_lng': self.longitude,
+            'destination_lat': place['latitude'],
+            'destination_lng': place['longitude'],
+            'destination_name': place['name'],
+            'mode': random.choice(MODES),
+            'totem_id': self.totem_id,
+        })
+
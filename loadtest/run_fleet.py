@@ -0,0 +1,222 @@
+"""
+Run the totem fleet load test at several fleet sizes and keep the results
+
+For each size Locust runs headless: the fleet is spawned, the stats are
+reset once it is complete and the steady state is measured for
+--duration. Per endpoint p50/p95/p99, throughput and failures are printed,
+appended to results/history.csv (with the commit and a --label, e.g. the
+server setup) and compared with the previous run of the same label, so
+improvements and regressions show up over time.
+
+A size "breaks" when failures go over --max-failures, the aggregated p95
+over --max-p95, or the throughput per totem falls below --min-throughput
+of the smallest size's (the server no longer keeps up with the offered
+load). With --find-break the sizes between the last good one and the
+first broken one are bisected until they are within --resolution.
+
+    python loadtest/run_fleet.py --host http://localhost:8000 --label "gunicorn 2 workers"
+"""
+import argparse
+import csv
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+HISTORY_FIELDS = [
+    'run', 'commit', 'label', 'size', 'endpoint', 'requests', 'failures',
+    'rps', 'p50', 'p95', 'p99', 'broken',
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Teste de carga da frota de totems em vários tamanhos')
+    parser.add_argument('--host', required=True, help='Backend testado, ex.: http://localhost:8000')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='Tamanhos de frota (padrão: 100 1000 10000)')
+    parser.add_argument('--duration', type=int, default=360,
+                        help='Segundos medidos depois da frota completa (padrão: 360)')
+    parser.add_argument('--spawn-rate', type=float, default=50, help='Totems iniciados por segundo (padrão: 50)')
+    parser.add_argument('--processes', type=int, default=-1,
+                        help='Processos do Locust (padrão: -1, um por núcleo)')
+    parser.add_argument('--label', default='', help='Configuração testada, ex.: "gunicorn 2 workers"')
+    parser.add_argument('--max-failures', type=float, default=0.01, help='Fração máxima de falhas (padrão: 0.01)')
+    parser.add_argument('--max-p95', type=float, default=2000, help='p95 agregado máximo em ms (padrão: 2000)')
+    parser.add_argument('--min-throughput', type=float, default=0.8,
+                        help='Vazão por totem mínima, relativa ao menor tamanho (padrão: 0.8)')
+    parser.add_argument('--find-break', action='store_true', help='Bisseção até achar o tamanho que quebra')
+    parser.add_argument('--resolution', type=float, default=0.1,
+                        help='Precisão relativa da bisseção (padrão: 0.1)')
+    parser.add_argument('--results', type=Path, default=HERE / 'results', help='Diretório dos resultados')
+    args, locust_args = parser.parse_known_args()
+    # Anything else (--totems, --visits-per-hour...) goes to Locust
+    args.locust_args = locust_args
+    return args
+
+
+def run_locust(args, size, prefix):
+    ramp = int(size / args.spawn_rate) + 1
+    command = [
+        sys.executable, '-m', 'locust', '-f', str(HERE / 'locustfile.py'),
+        '--headless', '--host', args.host,
+        '--users', str(size), '--spawn-rate', str(args.spawn_rate),
+        '--run-time', f'{ramp + args.duration}s', '--reset-stats',
+        '--csv', str(prefix), '--only-summary', '--loglevel', 'WARNING',
+        '--processes', str(args.processes),
+        *args.locust_args,
+    ]
+    # Locust exits 1 when there were failures; those are judged below
+    subprocess.run(command, check=False)
+    with open(f'{prefix}_stats.csv', newline='') as file:
+        return [row for row in csv.DictReader(file) if row['Name']]
+
+
+def number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize(rows):
+    """{endpoint: {...}} with 'Aggregated' for the whole run"""
+    summary = {}
+    for row in rows:
+        summary[row['Name']] = {
+            'requests': int(row['Request Count']),
+            'failures': int(row['Failure Count']),
+            'rps': number(row['Requests/s']) or 0.0,
+            'p50': number(row['50%']),
+            'p95': number(row['95%']),
+            'p99': number(row['99%']),
+        }
+    return summary
+
+
+def broken(args, size, total, baseline):
+    """Why this size breaks (empty if it holds)"""
+    reasons = []
+    if total['requests'] and total['failures'] / total['requests'] > args.max_failures:
+        reasons.append(f'falhas {total["failures"] / total["requests"]:.1%}')
+    if total['p95'] is not None and total['p95'] > args.max_p95:
+        reasons.append(f'p95 {total["p95"]:.0f} ms')
+    if baseline and total['rps'] / size < args.min_throughput * baseline:
+        reasons.append(f'vazão {total["rps"] / size:.3f} req/s por totem (base {baseline:.3f})')
+    return reasons
+
+
+def ms(value):
+    return '-' if value is None else f'{value:.0f}'
+
+
+def report(size, summary, reasons):
+    print(f'\nFrota de {size} totems' + (f' — QUEBROU: {", ".join(reasons)}' if reasons else ' — ok'))
+    print(f'  {"endpoint":<32} {"req":>8} {"falhas":>7} {"req/s":>8} {"p50":>6} {"p95":>6} {"p99":>6}')
+    for name, stats in sorted(summary.items(), key=lambda item: item[0] == 'Aggregated'):
+        print(f'  {name:<32} {stats["requests"]:>8} {stats["failures"]:>7} {stats["rps"]:>8.1f} '
+              f'{ms(stats["p50"]):>6} {ms(stats["p95"]):>6} {ms(stats["p99"]):>6}')
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def previous_runs(history, label):
+    """{size: aggregated row} of the last recorded run of this label"""
+    if not history.exists():
+        return {}
+    with open(history, newline='') as file:
+        rows = [row for row in csv.DictReader(file) if row['label'] == label and row['endpoint'] == 'Aggregated']
+    if not rows:
+        return {}
+    last = rows[-1]['run']
+    return {int(row['size']): row for row in rows if row['run'] == last}
+
+
+def record(history, run, commit, label, size, summary, reasons):
+    new = not history.exists()
+    with open(history, 'a', newline='') as file:
+        writer = csv.DictWriter(file, HISTORY_FIELDS)
+        if new:
+            writer.writeheader()
+        for name, stats in summary.items():
+            writer.writerow({
+                'run': run, 'commit': commit, 'label': label, 'size': size, 'endpoint': name,
+                'requests': stats['requests'], 'failures': stats['failures'], 'rps': f'{stats["rps"]:.2f}',
+                'p50': ms(stats['p50']), 'p95': ms(stats['p95']), 'p99': ms(stats['p99']),
+                'broken': int(bool(reasons)),
+            })
+
+
+def compare(size, total, previous):
+    if size not in previous:
+        return
+    before = previous[size]
+    p95_before, rps_before = number(before['p95']), number(before['rps'])
+    changes = []
+    if p95_before and total['p95'] is not None:
+        changes.append(f'p95 {p95_before:.0f} → {total["p95"]:.0f} ms ({total["p95"] / p95_before - 1:+.0%})')
+    if rps_before:
+        changes.append(f'req/s {rps_before:.1f} → {total["rps"]:.1f} ({total["rps"] / rps_before - 1:+.0%})')
+    print(f'  comparado a {before["run"]} ({before["commit"] or "?"}): {", ".join(changes)}')
+
+
+def main():
+    args = parse_args()
+    run = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    directory = args.results / run
+    directory.mkdir(parents=True, exist_ok=True)
+    history = args.results / 'history.csv'
+    previous = previous_runs(history, args.label)
+    commit = current_commit()
+
+    baseline = None
+    outcomes = {}
+
+    def measure(size):
+        nonlocal baseline
+        summary = summarize(run_locust(args, size, directory / f'fleet-{size}'))
+        total = summary.get('Aggregated')
+        if not total or not total['requests']:
+            print(f'Frota de {size}: nenhuma requisição medida', file=sys.stderr)
+            sys.exit(1)
+        reasons = broken(args, size, total, baseline)
+        if baseline is None:
+            baseline = total['rps'] / size
+        report(size, summary, reasons)
+        compare(size, total, previous)
+        record(history, run, commit, args.label, size, summary, reasons)
+        outcomes[size] = reasons
+        return not reasons
+
+    for size in sorted(args.sizes):
+        if not measure(size):
+            break
+
+    good = max((size for size, reasons in outcomes.items() if not reasons), default=None)
+    bad = min((size for size, reasons in outcomes.items() if reasons), default=None)
+    if args.find_break and good and bad:
+        while (bad - good) / good > args.resolution:
+            size = (good + bad) // 2
+            if measure(size):
+                good = size
+            else:
+                bad = size
+
+    print()
+    if bad is None:
+        print(f'Nenhum tamanho quebrou (até {good} totems)')
+    elif good is None:
+        print(f'Já quebra com {bad} totems')
+    else:
+        print(f'Aguenta {good} totems, quebra com {bad}')
+    print(f'Resultados em {directory}, histórico em {history}')
+
+
+if __name__ == '__main__':
+    main()
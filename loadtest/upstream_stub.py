@@ -0,0 +1,165 @@
+"""
+Local stand-in for OpenRouteService and OpenWeather during load tests
+
+Answers the endpoints the backend calls with canned responses shaped like
+the real ones, after a configurable latency (the real APIs answer in tens
+to hundreds of milliseconds, and a worker blocked on them is part of what
+is being measured). Point the backend at it with:
+
+    OPENROUTESERVICE_URL=http://<host>:8099/ors
+    OPENWEATHER_URL=http://<host>:8099/owm/data/2.5
+
+Standard library only, so it runs anywhere the load test does.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def route(body):
+    (origin_lng, origin_lat), (dest_lng, dest_lat) = body['coordinates'][:2]
+    steps = [
+        {'instruction': f'Siga pela Rua {i + 1}', 'distance': 120.0 + i, 'duration': 86.4 + i,
+         'type': i % 8, 'name': f'Rua {i + 1}'}
+        for i in range(8)
+    ]
+    coordinates = [
+        [origin_lng + (dest_lng - origin_lng) * i / 20, origin_lat + (dest_lat - origin_lat) * i / 20]
+        for i in range(21)
+    ]
+    return {
+        'type': 'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'geometry': {'type': 'LineString', 'coordinates': coordinates},
+            'properties': {
+                'summary': {'distance': 1000.0, 'duration': 720.0},
+                'segments': [{'distance': 1000.0, 'duration': 720.0, 'steps': steps}],
+            },
+        }],
+    }
+
+
+def geocode(params):
+    text = params.get('text', [''])[0]
+    lat = float(params.get('focus.point.lat', ['-22.9'])[0])
+    lon = float(params.get('focus.point.lon', ['-43.1'])[0])
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lon + i / 1000, lat + i / 1000]},
+                'properties': {'name': f'{text} {i + 1}', 'label': f'{text} {i + 1}, Centro', 'layer': 'venue'},
+            }
+            for i in range(int(params.get('size', ['5'])[0]))
+        ],
+    }
+
+
+def weather(params):
+    now = int(time.time())
+    return {
+        'coord': {'lat': float(params.get('lat', ['0'])[0]), 'lon': float(params.get('lon', ['0'])[0])},
+        'weather': [{'id': 802, 'main': 'Clouds', 'description': 'nuvens dispersas', 'icon': '03d'}],
+        'main': {'temp': 27.4, 'feels_like': 29.1, 'temp_min': 25.0, 'temp_max': 29.8,
+                 'pressure': 1013, 'humidity': 68},
+        'visibility': 10000,
+        'wind': {'speed': 3.6, 'deg': 140},
+        'clouds': {'all': 40},
+        'dt': now,
+        'sys': {'sunrise': now - 6 * 3600, 'sunset': now + 6 * 3600},
+    }
+
+
+def forecast(params):
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    items = []
+    for i in range(int(params.get('cnt', ['40'])[0])):
+        moment = start + timedelta(hours=3 * i)
+        items.append({
+            'dt': int(moment.timestamp()),
+            'dt_txt': moment.strftime('%Y-%m-%d %H:%M:%S'),
+            'main': {'temp': 24.0 + i % 8, 'feels_like': 25.0 + i % 8, 'temp_min': 22.0, 'temp_max': 30.0,
+                     'humidity': 60 + i % 20},
+            'weather': [{'description': 'céu limpo', 'icon': '01d'}],
+            'pop': (i % 5) / 10,
+        })
+    return {'cnt': len(items), 'list': items}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = (0.0, 0.0)
+    counts = {}
+    counts_lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        if url.path == '/ors/geocode/search':
+            self.respond('geocode', geocode(params))
+        elif url.path == '/owm/data/2.5/weather':
+            self.respond('weather', weather(params))
+        elif url.path == '/owm/data/2.5/forecast':
+            self.respond('forecast', forecast(params))
+        elif url.path == '/stats':
+            with self.counts_lock:
+                self.respond(None, dict(self.counts))
+        else:
+            self.respond(None, {'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        if url.path.startswith('/ors/v2/directions/') and url.path.endswith('/geojson'):
+            self.respond('directions', route(body))
+        else:
+            self.respond(None, {'error': 'not found'}, status=404)
+
+    def respond(self, name, payload, status=200):
+        if name:
+            with self.counts_lock:
+                self.counts[name] = self.counts.get(name, 0) + 1
+            low, high = self.latency
+            if high:
+                time.sleep(random.uniform(low, high))
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub do OpenRouteService e do OpenWeather para testes de carga')
+    parser.add_argument('--bind', default='0.0.0.0', help='Endereço (padrão: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=8099, help='Porta (padrão: 8099)')
+    parser.add_argument('--latency', default='50:150',
+                        help='Latência simulada em ms, "min:max" ou um valor fixo (padrão: 50:150)')
+    args = parser.parse_args()
+
+    low, _, high = args.latency.partition(':')
+    Handler.latency = (int(low) / 1000, int(high or low) / 1000)
+
+    server = ThreadingHTTPServer((args.bind, args.port), Handler)
+    server.daemon_threads = True
+    print(f'Stub em http://{args.bind}:{args.port} (ORS em /ors, OpenWeather em /owm/data/2.5, '
+          f'contagem em /stats), latência {args.latency} ms')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()